@@ -1,10 +1,10 @@
 import datetime
 import functools
 import os
+import contextlib
 
 import torch
 import torch.distributed as dist
-import timm.models.hub as timm_hub
 
 
 def setup_for_distributed(is_master):
@@ -100,6 +100,18 @@ def get_dist_info():
     return rank, world_size
 
 
+def no_sync(modules):
+    """
+    Context that skips the gradient all-reduce of the DDP modules in modules, for the backward passes of all but the
+    last micro-batch of gradient accumulation. The forward pass has to run inside it too.
+    """
+    ctxt = contextlib.ExitStack()
+    for module in modules:
+        if isinstance(module, torch.nn.parallel.DistributedDataParallel):
+            ctxt.enter_context(module.no_sync())
+    return ctxt
+
+
 def main_process(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
@@ -115,6 +127,7 @@ def download_cached_file(url, check_hash=True, progress=False):
     Download a file from a URL and cache it locally. If the file already exists, it is not downloaded again.
     If distributed, only the main process downloads the file, and the other processes wait for the file to be downloaded.
     """
+    import timm.models.hub as timm_hub
 
     def get_cached_file_path():
         # a hack to sync the file path across processes
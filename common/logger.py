@@ -177,6 +177,71 @@ class MetricLogger(object):
         )
 
 
+class StageTimer(object):
+    """
+    Wall-clock time per iteration of the named stages of a loop. start_iteration() charges the time since the previous
+    end_iteration() to "data_wait", and lap(stage) charges the time since the previous lap to the stage. Disabled, laps
+    are no-ops and only the data wait and the rest of the step ("step") are timed, which is enough to flag dataloader
+    starvation. W/ sync_cuda, CUDA is synchronized at every lap so that the stages are charged w/ their kernels instead
+    of their launches, at the cost of the overlap between the host and the device.
+    """
+    def __init__(self, enabled=False, sync_cuda=False):
+        self.enabled = enabled
+        self.sync_cuda = enabled and sync_cuda and torch.cuda.is_available()
+        self.reset()
+
+    def reset(self):
+        self.stage_2_times = {}
+        self.last_time = None
+        self.iteration_end = None
+
+    def get_time(self):
+        if self.sync_cuda:
+            torch.cuda.synchronize()
+        return time.perf_counter()
+
+    def add(self, stage, seconds):
+        if stage not in self.stage_2_times:
+            self.stage_2_times[stage] = []
+        self.stage_2_times[stage].append(seconds)
+
+    def start_iteration(self):
+        now = self.get_time()
+        if self.iteration_end is not None:
+            self.add("data_wait", now - self.iteration_end)
+        self.last_time = now
+
+    def lap(self, stage):
+        if not self.enabled:
+            return
+        now = self.get_time()
+        self.add(stage, now - self.last_time)
+        self.last_time = now
+
+    def end_iteration(self):
+        if self.enabled:
+            self.iteration_end = self.last_time
+        else:
+            self.iteration_end = time.perf_counter()
+            self.add("step", self.iteration_end - self.last_time)
+
+    def summarize(self):
+        """
+        :return: stage -> (mean ms per iteration, fraction of the total time)
+        """
+        ttl = max(sum(sum(tms) for tms in self.stage_2_times.values()), 1e-12)
+        return {stage: (1000 * sum(tms) / len(tms), sum(tms) / ttl) for stage, tms in self.stage_2_times.items()}
+
+    def is_starved(self, threshold):
+        smry = self.summarize()
+        return ("data_wait" in smry) and (smry["data_wait"][1] > threshold)
+
+    def log_tensorboard(self, writer, step, prefix="Stages"):
+        for stage, (_, frac) in self.summarize().items():
+            writer.add_histogram(f"{prefix}_ms/{stage}", 1000 * torch.tensor(self.stage_2_times[stage]), step)
+            writer.add_scalar(f"{prefix}_fraction/{stage}", frac, step)
+
+
 class AttrDict(dict):
     def __init__(self, *args, **kwargs):
         super(AttrDict, self).__init__(*args, **kwargs)
@@ -1,6 +1,10 @@
 import json
 import os
 import pickle
+import copy
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from collections import OrderedDict
 import torch
@@ -112,7 +116,8 @@ def saveModel_trainer(kwargs,
                       is_bestLoss=False,
                       best_captioningScores=[float('-inf')] * 1,
                       is_bestCaptioningScores=[False] * 1,
-                      task_type="classify_oneHot"):
+                      task_type="classify_oneHot",
+                      async_writer=None):
     checkpoint_paths = [os.path.join(ckpt_dir, 'valLastCkpt.pth')]
 
     egoVlpV2_vis2textSim_labler = kwargs["egoVlpV2_vis2textSim_labler"] if ("egoVlpV2_vis2textSim_labler" in kwargs) else False
@@ -125,22 +130,234 @@ def saveModel_trainer(kwargs,
         if is_bestCaptioningScore and (captioner_idx == 0):
             checkpoint_paths.append(os.path.join(ckpt_dir, f'valBestCkpt_maxCaptioningScore.pth'))
 
-    for checkpoint_path in checkpoint_paths:
-        ckpt_dct = {
-            'model': model.module.state_dict() if kwargs["distributed"] else model.state_dict(),
-            'optimizer': optimizer.state_dict(),
-            'args': kwargs,
-            'epoch': epoch,
-        }
-        if video_encoder is not None:
-            ckpt_dct["video_encoder"] = video_encoder.module.state_dict() if kwargs["distributed"] else video_encoder.state_dict()
-        ckpt_dct['max_acc'] = best_metric
-        ckpt_dct['min_loss'] = best_loss
+    ckpt_dct = {
+        'model': model.module.state_dict() if kwargs["distributed"] else model.state_dict(),
+        'optimizer': optimizer.state_dict(),
+        'args': kwargs,
+        'epoch': epoch,
+    }
+    if video_encoder is not None:
+        ckpt_dct["video_encoder"] = video_encoder.module.state_dict() if kwargs["distributed"] else video_encoder.state_dict()
+    ckpt_dct['max_acc'] = best_metric
+    ckpt_dct['min_loss'] = best_loss
+
+    ckpt_dct['max_captioningScores'] = best_captioningScores
+
+    save_inferenceCkpt = kwargs["save_inferenceCkpt"] if ("save_inferenceCkpt" in kwargs) else False
+    inferenceCkpt_fp16 = kwargs["inferenceCkpt_fp16"] if ("inferenceCkpt_fp16" in kwargs) else False
+    ckpt_fsync = kwargs["ckpt_fsync"] if ("ckpt_fsync" in kwargs) else "file"
+
+    if async_writer is not None:
+        # the models keep training while the write is in flight, so the thread gets its own CPU copy
+        async_writer.submit(write_checkpoints,
+                            snapshot_to_cpu(ckpt_dct),
+                            ckpt_dir,
+                            checkpoint_paths,
+                            save_inferenceCkpt=save_inferenceCkpt,
+                            inferenceCkpt_fp16=inferenceCkpt_fp16,
+                            fsync=ckpt_fsync)
+    else:
+        write_checkpoints(ckpt_dct,
+                          ckpt_dir,
+                          checkpoint_paths,
+                          save_inferenceCkpt=save_inferenceCkpt,
+                          inferenceCkpt_fp16=inferenceCkpt_fp16,
+                          fsync=ckpt_fsync)
 
-        ckpt_dct['max_captioningScores'] = best_captioningScores
 
+def write_checkpoints(ckpt_dct,
+                      ckpt_dir,
+                      checkpoint_paths,
+                      save_inferenceCkpt=False,
+                      inferenceCkpt_fp16=False,
+                      fsync="file"):
+    # all checkpoint paths of an epoch share the same content, so the weights are written once and linked
+
+    source_sha256 = save_checkpoint_contentAddressed(ckpt_dct, ckpt_dir, checkpoint_paths, fsync=fsync)
+
+    if save_inferenceCkpt and (len(checkpoint_paths) > 1):
+        save_checkpoint_contentAddressed(get_inferenceCkpt(ckpt_dct, fp16=inferenceCkpt_fp16, source_sha256=source_sha256),
+                                         ckpt_dir,
+                                         [get_inferenceCkpt_path(checkpoint_path) for checkpoint_path in checkpoint_paths[1:]],
+                                         fsync=fsync)
+
+
+def snapshot_to_cpu(obj):
+    if torch.is_tensor(obj):
+        return obj.detach().to("cpu", copy=True)
+    elif isinstance(obj, dict):
+        snapshot = type(obj)((k, snapshot_to_cpu(v)) for k, v in obj.items())
+        if hasattr(obj, "_metadata"):
+            # state dict versions, needed by load_state_dict
+            snapshot._metadata = copy.deepcopy(obj._metadata)
+        return snapshot
+    elif isinstance(obj, (list, tuple)):
+        return type(obj)(snapshot_to_cpu(v) for v in obj)
+    else:
+        return copy.deepcopy(obj)
 
-        torch.save(ckpt_dct, checkpoint_path)
+
+class AsyncCheckpointWriter(object):
+    """
+    Writes checkpoints on a single background thread, one write in flight at a time.
+    A failed write is re-raised by the next check() / submit() / close().
+    """
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+
+    def check(self):
+        if (self.pending is not None) and self.pending.done():
+            self.wait()
+
+    def wait(self):
+        if self.pending is not None:
+            pending = self.pending
+            self.pending = None
+            exc = pending.exception()
+            if exc is not None:
+                raise RuntimeError("Background checkpoint write failed") from exc
+
+    def submit(self, fn, *args, **kwargs):
+        self.wait()
+        self.pending = self.executor.submit(fn, *args, **kwargs)
+
+    def close(self):
+        try:
+            self.wait()
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+class HashingFileWriter(object):
+    def __init__(self, fo, hasher):
+        self.fo = fo
+        self.hasher = hasher
+
+    def write(self, b):
+        self.hasher.update(b)
+        return self.fo.write(b)
+
+    def flush(self):
+        self.fo.flush()
+
+
+def fsync_path(fp):
+    fd = os.open(fp, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def link_or_copy(src_fp, dst_fp, fsync="file"):
+    tmp_fp = f"{dst_fp}.tmp_{os.getpid()}"
+    if os.path.lexists(tmp_fp):
+        os.remove(tmp_fp)
+    try:
+        os.link(src_fp, tmp_fp)
+    except OSError:
+        # filesystem w/o hardlink support
+        shutil.copyfile(src_fp, tmp_fp)
+        if fsync in ["file", "all"]:
+            fsync_path(tmp_fp)
+    os.replace(tmp_fp, dst_fp)
+
+
+def save_checkpoint_contentAddressed(ckpt_dct, ckpt_dir, checkpoint_paths, fsync="file"):
+    """
+    Serializes ckpt_dct once into ckpt_dir/blobs/<sha256>.pth and hardlinks every path in checkpoint_paths to it.
+    Every file is written under a temporary name and renamed into place, so a crash never leaves a truncated checkpoint.
+    fsync: "none", "file" (fsync the written files) or "all" (also fsync the directories after renaming).
+    Blobs that no checkpoint path links to anymore are removed. Returns the sha256 of the serialized checkpoint.
+    """
+    assert fsync in ["none", "file", "all"], print(fsync)
+    blobs_dir = os.path.join(ckpt_dir, "blobs")
+    os.makedirs(blobs_dir, exist_ok=True)
+
+    hasher = hashlib.sha256()
+    tmp_fp = os.path.join(blobs_dir, f".tmp_{os.getpid()}.pth")
+    with open(tmp_fp, "wb") as fo:
+        torch.save(ckpt_dct, HashingFileWriter(fo, hasher))
+        if fsync in ["file", "all"]:
+            fo.flush()
+            os.fsync(fo.fileno())
+
+    blob_fp = os.path.join(blobs_dir, f"{hasher.hexdigest()}.pth")
+    if ospif(blob_fp):
+        os.remove(tmp_fp)
+    else:
+        os.replace(tmp_fp, blob_fp)
+
+    for checkpoint_path in checkpoint_paths:
+        link_or_copy(blob_fp, checkpoint_path, fsync=fsync)
+    if fsync == "all":
+        fsync_path(blobs_dir)
+        for dir_ in set([os.path.dirname(os.path.abspath(checkpoint_path)) for checkpoint_path in checkpoint_paths]):
+            fsync_path(dir_)
+
+    for blob_fn in os.listdir(blobs_dir):
+        if blob_fn.startswith("."):
+            continue
+        if os.stat(os.path.join(blobs_dir, blob_fn)).st_nlink == 1:
+            os.remove(os.path.join(blobs_dir, blob_fn))
+
+    return hasher.hexdigest()
+
+
+def get_checkpoint_sha256(fp):
+    # a checkpoint written by save_checkpoint_contentAddressed is a hardlink to blobs/<sha256>.pth, so its hash is the
+    # name of the blob w/ the same inode; otherwise (copied or legacy checkpoint) the file is hashed
+    fp_stat = os.stat(fp)
+    blobs_dir = os.path.join(os.path.dirname(os.path.abspath(fp)), "blobs")
+    if ospid(blobs_dir):
+        for blob_fn in os.listdir(blobs_dir):
+            if blob_fn.startswith(".") or (not blob_fn.endswith(".pth")):
+                continue
+            blob_stat = os.stat(os.path.join(blobs_dir, blob_fn))
+            if (blob_stat.st_ino == fp_stat.st_ino) and (blob_stat.st_dev == fp_stat.st_dev):
+                return blob_fn[:-len(".pth")]
+
+    hasher = hashlib.sha256()
+    with open(fp, "rb") as fi:
+        for chunk in iter(lambda: fi.read(1 << 24), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def get_inferenceCkpt_path(checkpoint_path):
+    assert checkpoint_path.endswith(".pth"), print(checkpoint_path)
+    return checkpoint_path[:-len(".pth")] + "__inference.pth"
+
+
+def get_inferenceCkpt(ckpt_dct, fp16=False, source_sha256=None):
+    # weights + args only, no optimizer state. source_sha256 is the hash of the full checkpoint it's exported from, to
+    # tell when it's gone stale
+    inference_ckpt_dct = {}
+    for k in ["model", "video_encoder"]:
+        if k not in ckpt_dct:
+            continue
+        inference_ckpt_dct[k] = OrderedDict()
+        for param_nm, param in ckpt_dct[k].items():
+            if fp16 and torch.is_floating_point(param):
+                param = param.half()
+            inference_ckpt_dct[k][param_nm] = param
+    for k in ["args", "epoch"]:
+        if k in ckpt_dct:
+            inference_ckpt_dct[k] = ckpt_dct[k]
+    inference_ckpt_dct["is_inferenceCkpt"] = True
+    inference_ckpt_dct["source_sha256"] = source_sha256
+
+    return inference_ckpt_dct
+
+
+def load_checkpoint_file(fp):
+    # mmap avoids reading the whole file into memory up front; only the tensors that get used are paged in
+    try:
+        return torch.load(fp, map_location="cpu", mmap=True)
+    except RuntimeError:
+        # legacy (non-zipfile) checkpoints can't be mmapped
+        return torch.load(fp, map_location="cpu")
 
 
 def loadModel_trainer(checkpoint,
@@ -218,3 +435,39 @@ def state_dict_data_parallel_fix(load_state_dict, curr_state_dict):
     else:
         new_state_dict = load_state_dict
     return new_state_dict
+
+
+def quantize_linearLayers_int8(module):
+    # dynamic int8 quantization of all nn.Linear layers (weights int8, activations quantized on the fly), CPU only
+    # except the FFN linears of nn.TransformerEncoderLayer (pol_v1's view transformer): the layer's eval fast path
+    # reads linear1.weight / linear2.weight as tensors, which is a method on a dynamically quantized linear
+    module = module.cpu().eval()
+    lst_transformerLayerNms = [nm for nm, sub_module in module.named_modules()
+                               if isinstance(sub_module, torch.nn.TransformerEncoderLayer)]
+    qconfig_spec = {}
+    for nm, sub_module in module.named_modules():
+        if type(sub_module) is not torch.nn.Linear:
+            continue
+        if any([nm.startswith(transformerLayer_nm + ".") for transformerLayer_nm in lst_transformerLayerNms]):
+            continue
+        qconfig_spec[nm] = torch.ao.quantization.default_dynamic_qconfig
+    return torch.ao.quantization.quantize_dynamic(module,
+                                                  qconfig_spec,
+                                                  dtype=torch.qint8,
+                                                  inplace=False)
+
+
+def compile_module(module, mode=None, dynamic=False):
+    """
+    torch.compile of a module in place, so its state dict keys, the optimizer's parameters and DDP wrapping stay as
+    they are (a DataParallel / DDP wrapper is unwrapped and its module compiled). The models branch on flags stored as
+    python attributes, which dynamo specializes on rather than breaking the graph. Shapes are static: the batch size
+    only changes on the last test batch (one recompile), and dynamic shapes would guard on every python int that
+    EgoVLPv2's reshapes compute from a size. W/ view masks (--allow-missingViews), videoEncoder only encodes the present
+    views of a batch (boolean indexing), so it recompiles for every new number of present views and falls back to eager
+    once torch._dynamo.config.cache_size_limit is reached; batches w/ every view present keep the unmasked graph.
+    """
+    if isinstance(module, (torch.nn.DataParallel, torch.nn.parallel.DistributedDataParallel)):
+        module = module.module
+    module.compile(mode=mode, dynamic=dynamic)
+    return module
@@ -1,32 +1,102 @@
 import os
+import json
 import pickle
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 import numpy as np
-from scipy.spatial.transform import Rotation
-from PIL import Image
-import cv2 as cv
-from scipy.io import wavfile
 
 import torch
 from torch.utils.data import Dataset
-import torchvision
-from torchvision import transforms
-from torchvision.transforms._transforms_video import RandomCropVideo, RandomResizedCropVideo,CenterCropVideo, NormalizeVideo,ToTensorVideo,RandomHorizontalFlipVideo
 
-import decord
-from decord import VideoReader
+# decord, cv2, scipy, PIL and torchvision are imported where they are used so that importing this module
+# (e.g. from test.py, or in every DataLoader worker) does not pay for them unless they are needed
 
-from datasets.utils import frame_normalize
+from datasets.utils import frame_normalize, SharedFramesRing, get_sharedFramesRing_numSlots
 from common.utils import *
 from common.dist_utils import *
 
 
+# overhead of a seek (demuxer reset + decoder flush) in number of decoded frames, for picking between seeking to every
+# sampled frame and decoding the clip sequentially once (see scripts/benchmarks/video_decode.py)
+SEEK_COST_NUM_FRAMES = 8
+
+
+def get_videoDecodeCosts(frm_idxs, key_idxs, seek_cost=SEEK_COST_NUM_FRAMES):
+	"""
+	:param frm_idxs: sorted unique indices of the frames to decode
+	:param key_idxs: sorted indices of the clip's keyframes
+	:return: cost (in decoded frames) of seeking to every frame, and of decoding sequentially from the first frame's keyframe 
+	"""
+	key_idxs = np.asarray(key_idxs)
+	frm_keyIdxs = key_idxs[np.searchsorted(key_idxs, frm_idxs, side="right") - 1]
+
+	seek_cst = 0
+	pos = -1
+	for frm_idx, key_idx in zip(frm_idxs, frm_keyIdxs):
+		if key_idx <= pos < frm_idx:
+			# same GOP and ahead of the decoder, the reader decodes forward w/o seeking
+			seek_cst += frm_idx - pos
+		else:
+			seek_cst += seek_cost + frm_idx - key_idx + 1
+		pos = frm_idx
+
+	seq_cst = seek_cost + frm_idxs[-1] - frm_keyIdxs[0] + 1
+
+	return int(seek_cst), int(seq_cst)
+
+
+def decode_videoFrames(vrs, indices, keyframe_aware=True):
+	"""
+	Decodes every unique frame once and repeats frames for repeated indices
+	:return: T, H, W, C uint8 tensor w/ the frames at indices 
+	"""
+	unq_idxs = sorted(set(indices))
+
+	decode_sequentially = False
+	if keyframe_aware and (len(unq_idxs) > 1):
+		try:
+			key_idxs = sorted(vrs.get_key_indices())
+		except:
+			key_idxs = []
+		if (len(key_idxs) > 0) and (key_idxs[0] <= unq_idxs[0]):
+			seek_cst, seq_cst = get_videoDecodeCosts(unq_idxs, key_idxs)
+			decode_sequentially = seq_cst < seek_cst
+
+	if decode_sequentially:
+		vrs.seek_accurate(unq_idxs[0])
+		lst_frms = [vrs.next()]
+		pos = unq_idxs[0]
+		for idx in unq_idxs[1:]:
+			if idx - pos > 1:
+				# skipped frames are decoded but not converted / resized
+				vrs.skip_frames(idx - pos - 1)
+			lst_frms.append(vrs.next())
+			pos = idx
+		unq_frms = torch.stack([torch.from_numpy(frm) if (type(frm) is not torch.Tensor) else frm for frm in lst_frms])
+	else:
+		""" get_batch -> T, H, W, C """
+		temp_frms = vrs.get_batch(unq_idxs)	# vrs[indices], vrs.get_batch(indices), torch.stack([vrs[idx] for idx in indices])
+		unq_frms = torch.from_numpy(temp_frms) if (type(temp_frms) is not torch.Tensor) else temp_frms
+
+	if len(unq_idxs) == len(indices):
+		return unq_frms
+
+	idx_2_unqIdx = {idx: unq_idx for unq_idx, idx in enumerate(unq_idxs)}
+	return unq_frms[torch.LongTensor([idx_2_unqIdx[idx] for idx in indices])]
+
+
 def load_datapointVideo_egoExoNarrate(video_path,
 										n_frms=8,
 										height=-1,
 										width=-1,
 										sampling="uniform",
-										dont_square_frames=False,):
+										dont_square_frames=False,
+										keyframe_aware=True,
+										return_uint8=False,):
+	import decord
+	from decord import VideoReader
 
 	decord.bridge.set_bridge("torch")
 
@@ -40,6 +110,7 @@ def load_datapointVideo_egoExoNarrate(video_path,
 			assert height == width
 			vrs = VideoReader(uri=video_path, height=height, width=width, num_threads=1)
 	except:
+		import cv2 as cv
 		cap = cv.VideoCapture(video_path)
 		assert int(cap.get(cv.CAP_PROP_FRAME_COUNT)) == 0
 		cap.release()
@@ -68,17 +139,89 @@ def load_datapointVideo_egoExoNarrate(video_path,
 			indices = indices + ([indices[-1]] * (orig_n_frms - len(indices)))
 		assert len(indices) == orig_n_frms, print(len(indices), orig_n_frms, vlen, n_frms)
 
-		""" get_batch -> T, H, W, C """
-		temp_frms = vrs.get_batch(indices)	# vrs[indices], vrs.get_batch(indices), torch.stack([vrs[idx] for idx in indices])
-		tensor_frms = torch.from_numpy(temp_frms) if (type(temp_frms) is not torch.Tensor) else temp_frms
+		tensor_frms = decode_videoFrames(vrs, indices, keyframe_aware=keyframe_aware)
 	else:
 		tensor_frms = torch.zeros((n_frms, height, width, 3))
 		
-	frms = tensor_frms.float() / 255  # .byte(), (T, H, W, C)
+	if return_uint8:
+		frms = tensor_frms.byte()	# (T, H, W, C)
+	else:
+		frms = tensor_frms.float() / 255  # .byte(), (T, H, W, C)
 
 	return frms, indices
 
 
+class LemmaImageCache(object):
+	"""
+	On-disk cache of resized uint8 LEMMA frames, one .npy per image under a dir per size, read back memory-mapped. 
+	Files are written to a temp path and renamed, so dataloader workers can share the cache.
+	"""
+	def __init__(self, cache_dir, size, draft_decode=False):
+		self.dr = f"{cache_dir}/{size}x{size}" + ("_draft" if draft_decode else "")
+		if not os.path.isdir(self.dr):
+			os.makedirs(self.dr, exist_ok=True)
+
+	def get_path(self, img_sffx):
+		return f"{self.dr}/{hashlib.sha1(img_sffx.encode('utf-8')).hexdigest()}.npy"
+
+	def get(self, img_sffx):
+		img_fp = self.get_path(img_sffx)
+		if not ospif(img_fp):
+			return None
+		return np.load(img_fp, mmap_mode="r")
+
+	def put(self, img_sffx, img):
+		img_fp = self.get_path(img_sffx)
+		tmp_fp = f"{img_fp}.tmp_{os.getpid()}_{threading.get_ident()}.npy"
+		np.save(tmp_fp, img)
+		os.replace(tmp_fp, img_fp)
+
+
+def load_image_lemma(img_fp, size, draft_decode=False):
+	from PIL import Image
+
+	img = Image.open(img_fp)
+	if draft_decode:
+		# JPEGs are decoded at the smallest 1/2, 1/4 or 1/8 scale that's still at least size x size
+		img.draft(img.mode, (size, size))
+	img = np.array(img.resize((size, size), resample=Image.BICUBIC))
+	assert img.dtype == np.uint8
+	return img
+
+
+def load_datapointImages_lemma(img_dir,
+								lst_imgSffxs,
+								size,
+								draft_decode=False,
+								image_cache=None,
+								num_threads=4,
+								return_uint8=False):
+	def load_image(img_sffx):
+		if image_cache is not None:
+			img = image_cache.get(img_sffx)
+			if img is not None:
+				return img
+
+		img_fp = f"{img_dir}/{img_sffx}"
+		assert os.path.isfile(img_fp), print(img_fp)
+		img = load_image_lemma(img_fp, size, draft_decode=draft_decode)
+		if image_cache is not None:
+			image_cache.put(img_sffx, img)
+		return img
+
+	# PIL releases the GIL while decoding, so the frames of a datapoint are decoded concurrently
+	if (num_threads > 1) and (len(lst_imgSffxs) > 1):
+		with ThreadPoolExecutor(max_workers=min(num_threads, len(lst_imgSffxs))) as executor:
+			lst_imgs = list(executor.map(load_image, lst_imgSffxs))
+	else:
+		lst_imgs = [load_image(img_sffx) for img_sffx in lst_imgSffxs]
+
+	frms = torch.from_numpy(np.stack(lst_imgs))
+	if return_uint8:
+		return frms
+	return frms.float() / 255
+
+
 def get_rel_ce(ce1, 
 				ce2, 
 				return_coord_angles=False, 
@@ -86,6 +229,8 @@ def get_rel_ce(ce1,
 				return_angles=False, 
 				return_quarts=False, 
 				return_onlyRotation=False):
+	from scipy.spatial.transform import Rotation
+
 	rot1 = np.array([ce1[0][:-1], ce1[1][:-1], ce1[2][:-1]])
 	rot2 = np.array([ce2[0][:-1], ce2[1][:-1], ce2[2][:-1]])
 	""" 2 wrt 1 """
@@ -268,10 +413,193 @@ def compute_classWeights(num_views,
 	return np.array(all_prcnts)
 
 
+# views the per-view scores of the Ego-Exo4D datapoints are over, in order
+EGO_EXO_VIEWS = ['aria', '1', '2', '3', '4']
+
+
+def select_viewScores(scores, all_views):
+	"""
+	per-view scores of a datapoint (over EGO_EXO_VIEWS, in the last axis) -> scores of all_views, in their order. Scores 
+	over other views (e.g. LEMMA's) are returned as is
+	"""
+	if (all_views == EGO_EXO_VIEWS) or (not set(all_views).issubset(EGO_EXO_VIEWS)):
+		return scores
+	return np.array(scores)[..., [EGO_EXO_VIEWS.index(vw) for vw in all_views]].tolist()
+
+
+def get_datapointViewMask(dtpnt,
+						  all_views,
+						  camId2featName=None,
+						  videoLlama_feats_dir=None,
+						  lemma_index=None,
+						  datapoint_videoClips_dir=None,
+						  videoClips_dir=None):
+	"""
+	num_views bool mask of the views a datapoint has inputs for, False for the cameras missing in its take. Looks up the
+	inputs __getitem__ loads, i.e. the first of: the take's video feature names, videoLlama features, LEMMA image
+	suffixes, datapoint clips or full clips
+	"""
+	tk_nm = dtpnt['take_name']
+	strt_clpNm, end_clpNm = dtpnt['startNend_clipName']
+	strt_frmIdx, end_frmIdx = dtpnt['startNend_frameIdx']
+	strt_tmstmp, end_tmstmp = dtpnt['startNend_timestamp'][-2:]
+
+	vw_msk = []
+	for vw in all_views:
+		if camId2featName is not None:
+			has_vw = vw in camId2featName
+		elif videoLlama_feats_dir is not None:
+			has_vw = ospif(f"{videoLlama_feats_dir}/{vw}/{tk_nm}/{strt_clpNm}_{end_clpNm}__{strt_frmIdx}_{end_frmIdx}.pt")
+		elif lemma_index is not None:
+			has_vw = len(lemma_index.get_imageSuffixes(dtpnt['lemmaIndex_row'], vw)) > 0
+		elif datapoint_videoClips_dir is not None:
+			has_vw = ospif(f"{datapoint_videoClips_dir}/{vw}/{tk_nm}/"+\
+							f"{strt_clpNm}_{end_clpNm}__{strt_frmIdx}_{end_frmIdx}__{strt_tmstmp}_{end_tmstmp}.mp4")
+		else:
+			has_vw = os.path.isdir(f"{videoClips_dir}/{vw}/{tk_nm}")
+		vw_msk.append(has_vw)
+	vw_msk = np.array(vw_msk)
+	assert vw_msk.any(), print(tk_nm, dtpnt['startNend_timestamp'], "has none of the views", all_views)
+
+	return vw_msk
+
+
+def fill_missingViews(al_vwInpts, fill_fn):
+	# inputs of the missing views (None) -> fill_fn of a present view's inputs, so they stack; the models skip them
+	prsnt_vwInpts = next(vw_inpts for vw_inpts in al_vwInpts if vw_inpts is not None)
+	return [fill_fn(prsnt_vwInpts) if (vw_inpts is None) else vw_inpts for vw_inpts in al_vwInpts]
+
+
+def mask_missingViewScores(scrs, vw_msk):
+	# -inf scores for the missing views (over the last axis), so they're never a label and get no mass in softmaxes
+	if vw_msk.all():
+		return scrs
+	return np.where(vw_msk, np.array(scrs, dtype=np.float64), -np.inf)
+
+
+def drop_missingBestExoViews(lst_dtpnts, view_masks):
+	# best exo views (1-indexed into all_views) that are missing can't be labels, their logits are MASKED_VIEW_LOGIT
+	for dtpnt, vw_msk in zip(lst_dtpnts, view_masks):
+		dtpnt['best_exo_views'] = [bst_ex_vw for bst_ex_vw in dtpnt['best_exo_views'] if vw_msk[int(bst_ex_vw) - 1]]
+		assert len(dtpnt['best_exo_views']) > 0, print(dtpnt['take_name'], dtpnt['startNend_timestamp'], "has none of its best exo views")
+
+
+LEMMA_INDEX_FILE_PREFIX = "data/lemma/v1/misc/take__2__startNendEgoImageSuffix__2__timestamp_n_startNendClipName_n_startNendFrameIdx_n_listAtomicDescriptions_n_listImageSuffixes"
+
+
+class LemmaIndex(object):
+	"""
+	Image suffixes of the LEMMA datapoints (take -> (start, end) -> list_egoNexoSuffixes in the index pickle) as flat 
+	numpy arrays. Datapoints keep a row of the index instead of their own lists, so dataloader workers inherit the 
+	index through fork w/o touching (and so copying) per-datapoint python objects.
+	"""
+	def __init__(self, index_fp):
+		assert ospif(index_fp), print(index_fp)
+		tkNm_2_strtNendTmstmp_2_dscs = pkl_ld(index_fp)
+
+		self.tkNm_2_rowRange = {}
+		lst_strtNendTmstmps = []
+		lst_rowSffxOffsets = [0]
+		lst_sffxs = []
+		for tk_nm, strtNendTmstmp_2_dscs in tkNm_2_strtNendTmstmp_2_dscs.items():
+			strt_row = len(lst_strtNendTmstmps)
+			for strtNendTmstmp, dscs in strtNendTmstmp_2_dscs.items():
+				lst_strtNendTmstmps.append(strtNendTmstmp)
+				for egoNexo_sffx in dscs["list_egoNexoSuffixes"]:
+					assert len(egoNexo_sffx) == 2
+					lst_sffxs += [egoNexo_sffx[0], egoNexo_sffx[1]]
+				lst_rowSffxOffsets.append(len(lst_sffxs) // 2)
+			self.tkNm_2_rowRange[tk_nm] = (strt_row, len(lst_strtNendTmstmps))
+
+		self.strtNendTmstmps = np.array(lst_strtNendTmstmps, dtype=np.float64).reshape(-1, 2)
+		self.row_sffxOffsets = np.array(lst_rowSffxOffsets, dtype=np.int64)
+		lst_sffxBytes = [sffx.encode("utf-8") for sffx in lst_sffxs]
+		self.sffx_bytes = np.frombuffer(b"".join(lst_sffxBytes), dtype=np.uint8)
+		self.sffx_offsets = np.zeros(len(lst_sffxBytes) + 1, dtype=np.int64)
+		self.sffx_offsets[1:] = np.cumsum([len(ele) for ele in lst_sffxBytes])
+
+	def get_row(self, tk_nm, strtNend_tmstmp):
+		# row of a datapoint, None if it's not in the index
+		if tk_nm not in self.tkNm_2_rowRange:
+			return None
+		strt_row, end_row = self.tkNm_2_rowRange[tk_nm]
+		rows = np.flatnonzero((self.strtNendTmstmps[strt_row: end_row, 0] == strtNend_tmstmp[0]) &\
+								(self.strtNendTmstmps[strt_row: end_row, 1] == strtNend_tmstmp[1]))
+		if len(rows) == 0:
+			return None
+		return strt_row + int(rows[0])
+
+	def get_imageSuffixes(self, row, vw):
+		# image suffix of every frame of the datapoint for the ego (fpv1) or exo (master) view
+		if vw == "fpv1":
+			egoNexo_idx = 0
+		elif vw == "master":
+			egoNexo_idx = 1
+		else:
+			raise ValueError
+		lst_imgSffxs = []
+		for sffx_idx in range(self.row_sffxOffsets[row], self.row_sffxOffsets[row + 1]):
+			sffx_idx = 2 * sffx_idx + egoNexo_idx
+			lst_imgSffxs.append(self.sffx_bytes[self.sffx_offsets[sffx_idx]: self.sffx_offsets[sffx_idx + 1]].tobytes().decode("utf-8"))
+		return lst_imgSffxs
+
+
+# LEMMA indexes loaded by this process, shared by all datasets that use the same index file
+LEMMA_INDEXES = {}
+
+
+def get_lemmaIndex(index_fp):
+	if index_fp not in LEMMA_INDEXES:
+		LEMMA_INDEXES[index_fp] = LemmaIndex(index_fp)
+	return LEMMA_INDEXES[index_fp]
+
+
+VAL_CACHE_VERSION = 1
+
+
+class ValCache(object):
+	"""
+	Preprocessed inputs of all val datapoints (uint8 frames, or features of the frozen video encoder) in one memory-mapped 
+	.npy per config. It's written once in datapoint order (see trainer.build_valCache) and renamed into place when complete, 
+	after which val_dataset reads its rows instead of decoding the clips. Other per-datapoint inputs (e.g. the relative 
+	camera pose labels) are named .npy's next to it, renamed into place before it.
+	"""
+	def __init__(self, cache_dir, config):
+		if not os.path.isdir(cache_dir):
+			os.makedirs(cache_dir, exist_ok=True)
+		self.fp = f"{cache_dir}/valCache_{hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:16]}.npy"
+		self.arrs = {}
+		self.tmp_arrs = {}
+
+	def get_fp(self, name=None):
+		return self.fp if (name is None) else f"{self.fp[:-len('.npy')]}_{name}.npy"
+
+	def is_complete(self):
+		return ospif(self.fp)
+
+	def get(self, idx, name=None):
+		if name not in self.arrs:
+			self.arrs[name] = np.load(self.get_fp(name), mmap_mode="r")
+		return torch.from_numpy(np.array(self.arrs[name][idx]))
+
+	def put(self, strt_idx, rows, num_rows, name=None):
+		if name not in self.tmp_arrs:
+			self.tmp_arrs[name] = np.lib.format.open_memmap(f"{self.get_fp(name)}.tmp{os.getpid()}",
+															mode="w+",
+															dtype=rows.dtype,
+															shape=(num_rows,) + tuple(rows.shape[1:]))
+		self.tmp_arrs[name][strt_idx: strt_idx + len(rows)] = rows
+
+	def finish(self):
+		# the frames (or features) last, they mark the cache as complete
+		for name in sorted(self.tmp_arrs, key=lambda name: name is None):
+			self.tmp_arrs[name].flush()
+			os.replace(self.tmp_arrs[name].filename, self.get_fp(name))
+		self.tmp_arrs = {}
+
+
 class train_dataset(object):
 	def __init__(self, args, **kwargs):
-		self.lemmaDataset_dct = pkl_ld("/vision/sagnik/RA/av_bvs/AV-bestView-selection-in-multiView-videos/data/lemma/v1/misc/take__2__startNendEgoImageSuffix__2__timestamp_n_startNendClipName_n_startNendFrameIdx_n_listAtomicDescriptions_n_listImageSuffixes__train.pkl")
-
 		self.args = args
 		self.kwargs = kwargs
 		self.distributed = kwargs["distributed"]
@@ -285,8 +613,14 @@ class train_dataset(object):
 		self.frame_horizontalFlip = kwargs["frame_horizontalFlip"] if ("frame_horizontalFlip" in kwargs) else False
 		self.frame_colorJitter = kwargs["frame_colorJitter"] if ("frame_colorJitter" in kwargs) else [0, 0, 0]
 		self.dont_square_frames = kwargs["dont_square_frames"] if ("dont_square_frames" in kwargs) else False
+		self.keyframeAware_decode = not (kwargs["dont_keyframeAware_decode"] if ("dont_keyframeAware_decode" in kwargs) else False)
+		self.sharedMemory_uint8Frames = kwargs["sharedMemory_uint8Frames"] if ("sharedMemory_uint8Frames" in kwargs) else False
 		self.videoClips_dir = kwargs["videoClips_dir"] if ("videoClips_dir" in kwargs) else None
 		self.datapoint_videoClips_dir = kwargs["datapoint_videoClips_dir"] if ("datapoint_videoClips_dir" in kwargs) else None
+		self.lemmaImages_numThreads = kwargs["lemmaImages_numThreads"] if ("lemmaImages_numThreads" in kwargs) else 4
+		self.lemmaImages_draftDecode = kwargs["draftDecode_lemmaImages"] if ("draftDecode_lemmaImages" in kwargs) else False
+		self.lemmaImages_cacheDir = kwargs["lemmaImages_cacheDir"] if ("lemmaImages_cacheDir" in kwargs) else None
+		self.lemmaImage_cache = None
 		datapoints_filePath = kwargs["trainDatapoints_filePath"]
 		datapoints_captioner_filePath = kwargs["trainDatapoints_captioner_filePath"] if ("trainDatapoints_captioner_filePath" in kwargs) else False
 		self.recog_arc = kwargs['recog_arc']
@@ -296,6 +630,7 @@ class train_dataset(object):
 				else False
 		self.randomize_trainViewOrder = kwargs["randomize_trainViewOrder"] if ("randomize_trainViewOrder" in kwargs) else False
 		self.use_datapointVideoClips = kwargs["use_datapointVideoClips"] if ("use_datapointVideoClips" in kwargs) else False
+		self.allow_missingViews = kwargs["allow_missingViews"] if ("allow_missingViews" in kwargs) else False
 
 		self.use_egoVlpV2_takeVideoFeats_usingStartNendTime = kwargs["use_egoVlpV2_takeVideoFeats_usingStartNendTime"]\
 																if ("use_egoVlpV2_takeVideoFeats_usingStartNendTime" in kwargs) else\
@@ -337,11 +672,19 @@ class train_dataset(object):
 			assert ospid(self.cameraPose_dir)
 
 		self.isLemma_dataset = kwargs["isLemma_dataset"] if ("isLemma_dataset" in kwargs) else False
+		self.lemma_index = None
+		if self.isLemma_dataset:
+			lemmaIndex_filePath = kwargs["trainLemmaIndex_filePath"] if ("trainLemmaIndex_filePath" in kwargs) else\
+									f"{LEMMA_INDEX_FILE_PREFIX}__train.pkl"
+			self.lemma_index = get_lemmaIndex(lemmaIndex_filePath)
 
 		self.total_num_samples = self.num_samples
 
 		self.transforms = None
 		if self.use_datapointVideoClips:
+			from torchvision import transforms
+			from torchvision.transforms._transforms_video import NormalizeVideo, RandomHorizontalFlipVideo
+
 			assert self.frame_height == self.frame_width
 
 			frame_mean, frame_std = frame_normalize(None, 
@@ -365,11 +708,17 @@ class train_dataset(object):
 																saturation=self.frame_colorJitter[1],
 																hue=self.frame_colorJitter[2])
 				self.transforms_normalize = frame_normalize_
-			else:
+			elif not self.sharedMemory_uint8Frames:
 				trn_trnsfrms.append(frame_normalize_)
 
 			self.transforms = transforms.Compose(trn_trnsfrms)
 
+		self.frames_ring = None
+		if self.sharedMemory_uint8Frames:
+			assert self.use_datapointVideoClips and (not self.dont_square_frames) and (not self.use_videoLlama_feats)
+			self.frames_ring = SharedFramesRing(get_sharedFramesRing_numSlots(kwargs["batch_size"], kwargs["num_workers"]),
+												(len(self.all_views), self.num_frames, self.frame_height, self.frame_width, 3))
+
 		self.is_multiPseudolabler = False
 		self.topK_multiPseudolabler = kwargs["topK_multiPseudolabler"] if ("topK_multiPseudolabler" in kwargs) else 1
 		self.bordaCount_multiPseudolabler = kwargs["bordaCount_multiPseudolabler"] if ("bordaCount_multiPseudolabler" in kwargs) else False
@@ -441,9 +790,9 @@ class train_dataset(object):
 											'timestamp': v2['timestamp']})
 
 				if  self.isLemma_dataset:
-					assert k1 in self.lemmaDataset_dct
-					assert (k2[1], k2[2]) in self.lemmaDataset_dct[k1], print(k2, (k2[1], k2[2]), list(self.lemmaDataset_dct[k1].keys())[:2])
-					self.lst_dtpnts[-1]["list_egoNexoSuffixes"] = self.lemmaDataset_dct[k1][(k2[1], k2[2])]["list_egoNexoSuffixes"]
+					lemmaIndex_row = self.lemma_index.get_row(k1, (k2[1], k2[2]))
+					assert lemmaIndex_row is not None, print(k1, k2, (k2[1], k2[2]))
+					self.lst_dtpnts[-1]["lemmaIndex_row"] = lemmaIndex_row
 				else:
 					if len(k2) == 2:
 						if ospif(f"{self.datapoint_videoClips_dir}/aria/{k1}/"+\
@@ -486,28 +835,17 @@ class train_dataset(object):
 						for ele__tkNm_2_strtNendTmstmp_2_tmstmpNstrtNendClpnmNstrtNendFrmIdxNscrs in\
 								lst__tkNm_2_strtNendTmstmp_2_tmstmpNstrtNendClpnmNstrtNendFrmIdxNscrs:
 							self.lst_dtpnts[-1]['scores'].append(
-										ele__tkNm_2_strtNendTmstmp_2_tmstmpNstrtNendClpnmNstrtNendFrmIdxNscrs[k1][k2]['scores']
+										select_viewScores(ele__tkNm_2_strtNendTmstmp_2_tmstmpNstrtNendClpnmNstrtNendFrmIdxNscrs[k1][k2]['scores'],
+														  self.all_views)
 									)
-							if self.all_views == ['1', '2', '3', '4', ]:
-								self.lst_dtpnts[-1]['scores'][-1] = self.lst_dtpnts[-1]['scores'][-1][1:]
-							elif self.all_views in [['aria', '1'], ['aria', '2'], ['aria', '3'], ['aria', '4']]:
-								exo_strtIdx = int(self.all_views[-1])
-								self.lst_dtpnts[-1]['scores'][-1] = self.lst_dtpnts[-1]['scores'][-1][:1] +\
-																	self.lst_dtpnts[-1]['scores'][-1][exo_strtIdx: (exo_strtIdx + 1)]
 					else:
 						if self.egoVlpV2_vis2textSim_labler:
-							if self.all_views != ['aria', '1', '2', '3', '4', ]:
-								raise NotImplementedError
-							self.lst_dtpnts[-1]['scores'] = v2['scores'][0]
-							self.lst_dtpnts[-1]['scores_captioner'] = tkNm_2_strtNendTmstmp_cptnrScrs[k1][(round(k2[0], 4), round(k2[1], 4), round(k2[2], 4))]['scores']# , print(tkNm_2_strtNendTmstmp_cptnrScrs[k1].keys())
+							self.lst_dtpnts[-1]['scores'] = select_viewScores(v2['scores'][0], self.all_views)
+							self.lst_dtpnts[-1]['scores_captioner'] =\
+								select_viewScores(tkNm_2_strtNendTmstmp_cptnrScrs[k1][(round(k2[0], 4), round(k2[1], 4), round(k2[2], 4))]['scores'],
+												  self.all_views)
 						else:
-							self.lst_dtpnts[-1]['scores'] = v2['scores']
-							if self.all_views == ['1', '2', '3', '4',]:
-								self.lst_dtpnts[-1]['scores'] = self.lst_dtpnts[-1]['scores'][1:]
-							elif self.all_views in [['aria', '1'], ['aria', '2'], ['aria', '3'], ['aria', '4']]:
-								exo_strtIdx = int(self.all_views[-1])
-								self.lst_dtpnts[-1]['scores'][-1] = self.lst_dtpnts[-1]['scores'][-1][:1] +\
-																	self.lst_dtpnts[-1]['scores'][-1][exo_strtIdx: (exo_strtIdx + 1)]
+							self.lst_dtpnts[-1]['scores'] = select_viewScores(v2['scores'], self.all_views)
 
 		self.egoVlpV2_takeVideoFeats_takeName2camId2featName = None
 		if self.use_egoVlpV2_takeVideoFeats:
@@ -516,6 +854,21 @@ class train_dataset(object):
 			assert ospif(self.egoVlpV2_takeVideoFeats_takeName2camId2featName_fp)
 			self.egoVlpV2_takeVideoFeats_takeName2camId2featName = pkl_ld(self.egoVlpV2_takeVideoFeats_takeName2camId2featName_fp)
 
+		self.view_masks = None
+		if self.allow_missingViews:
+			# num_datapoints x num_views, views w/o inputs (cameras missing in a take) are masked out in __getitem__
+			self.view_masks = np.stack([get_datapointViewMask(dtpnt,
+															  self.all_views,
+															  camId2featName=self.egoVlpV2_takeVideoFeats_takeName2camId2featName.get(dtpnt['take_name'], {})\
+																				if self.use_egoVlpV2_takeVideoFeats else None,
+															  videoLlama_feats_dir=self.videoLlama_feats_dir if self.use_videoLlama_feats else None,
+															  lemma_index=self.lemma_index if (self.use_datapointVideoClips and self.isLemma_dataset) else None,
+															  datapoint_videoClips_dir=self.datapoint_videoClips_dir if self.use_datapointVideoClips else None,
+															  videoClips_dir=self.videoClips_dir)
+										for dtpnt in tqdm(self.lst_dtpnts, desc="View masks")])
+			if self.task_type in ["classify_oneHot_bestExoPred", "classify_multiHot_bestExoPred"]:
+				drop_missingBestExoViews(self.lst_dtpnts, self.view_masks)
+
 		if self.task_type != "classify_oneHot_bestExoPred":
 			self.class_weights = compute_classWeights(len(self.all_views),
 													  self.lst_dtpnts,
@@ -537,7 +890,14 @@ class train_dataset(object):
 		al_cameraPoses = None
 		if self.use_relativeCameraPoseLoss:
 			al_cameraPoses = []
-		for vw in self.all_views:
+		vw_msk = self.view_masks[dtpnt_idx] if (self.view_masks is not None) else np.ones(len(self.all_views), dtype=bool)
+		for vw_idx, vw in enumerate(self.all_views):
+			if not vw_msk[vw_idx]:
+				# camera missing in the take, filled in once the present views are loaded
+				al_frms.append(None)
+				if self.use_relativeCameraPoseLoss:
+					al_cameraPoses.append(None)
+				continue
 			tk_nm = dtpnt['take_name']
 			if len(dtpnt['startNend_timestamp']) == 3:
 				cntr_tmstmp = dtpnt['startNend_timestamp'][0]
@@ -623,27 +983,20 @@ class train_dataset(object):
 				if self.use_datapointVideoClips:
 
 					if self.isLemma_dataset:
-						lst_egoNexoSffxs = dtpnt['list_egoNexoSuffixes']
-						lst_imgSffxs = []
-						for egoNexo_sffx in lst_egoNexoSffxs:
-							if vw == "fpv1":
-								lst_imgSffxs.append(egoNexo_sffx[0])
-							elif vw == "master":
-								lst_imgSffxs.append(egoNexo_sffx[1])
-							else:
-								raise ValueError
+						lst_imgSffxs = self.lemma_index.get_imageSuffixes(dtpnt['lemmaIndex_row'], vw)
 
 						assert self.frame_height == self.frame_width
 
-						frms = []
-						for img_sffx in lst_imgSffxs:
-							img_fp = f"{self.datapoint_videoClips_dir}/{img_sffx}"
-							assert os.path.isfile(img_fp)
-							tmp_img = np.array(Image.open(img_fp).resize((self.frame_height, self.frame_width), resample=Image.BICUBIC))
-							assert tmp_img.dtype == np.uint8
-							frms.append(torch.from_numpy(tmp_img))
+						if (self.lemmaImages_cacheDir is not None) and (self.lemmaImage_cache is None):
+							self.lemmaImage_cache = LemmaImageCache(self.lemmaImages_cacheDir, self.frame_height, draft_decode=self.lemmaImages_draftDecode)
 
-						frms = torch.stack(frms).float() / 255
+						frms = load_datapointImages_lemma(self.datapoint_videoClips_dir,
+															lst_imgSffxs,
+															self.frame_height,
+															draft_decode=self.lemmaImages_draftDecode,
+															image_cache=self.lemmaImage_cache,
+															num_threads=self.lemmaImages_numThreads,
+															return_uint8=self.sharedMemory_uint8Frames)
 
 					else:
 						strt_clpNm = dtpnt['startNend_clipName'][0]
@@ -658,7 +1011,9 @@ class train_dataset(object):
 																			n_frms=self.num_frames,
 																			height=self.frame_height,
 																			width=self.frame_width,
-																			dont_square_frames=self.dont_square_frames,)
+																			dont_square_frames=self.dont_square_frames,
+																			keyframe_aware=self.keyframeAware_decode,
+																			return_uint8=self.sharedMemory_uint8Frames,)
 					if self.use_relativeCameraPoseLoss:
 						if self.isLemma_dataset:
 							raise NotImplementedError
@@ -726,6 +1081,10 @@ class train_dataset(object):
 					frms = frame_normalize(frms, input_frame_norm_type=self.recog_arc)
 
 			al_frms.append(frms)	
+		al_frms = fill_missingViews(al_frms, torch.zeros_like)
+		if self.use_relativeCameraPoseLoss:
+			# placeholder poses, the pose loss masks out the view pairs w/ a missing view
+			al_cameraPoses = fill_missingViews(al_cameraPoses, lambda cameraPoses: cameraPoses)
 
 		ref_camerPoses = None
 		if self.use_relativeCameraPoseLoss:
@@ -744,6 +1103,7 @@ class train_dataset(object):
 
 			al_frms = al_frms_nw
 			al_cameraPoses = al_cameraPoses_nw
+			vw_msk = vw_msk[vw_idxs]
 
 			if self.task_type in ["classify_oneHot", "match_dist"]:
 				if self.is_multiPseudolabler:
@@ -765,6 +1125,11 @@ class train_dataset(object):
 			if self.egoVlpV2_vis2textSim_labler:
 				dtpnt_cptnr_scrs = dtpnt['scores_captioner']
 
+		if self.task_type in ["classify_oneHot", "match_dist"]:
+			dtpnt_scrs = mask_missingViewScores(dtpnt_scrs, vw_msk)
+			if self.egoVlpV2_vis2textSim_labler:
+				dtpnt_cptnr_scrs = mask_missingViewScores(dtpnt_cptnr_scrs, vw_msk)
+
 		if isinstance(dtpnt_scrs[0], str):
 			dtpnt_scrs_tmp = [0, 0, 0, 0]
 			dtpnt_scrs_tmp[int(dtpnt_scrs[0]) - 1] = 1
@@ -780,7 +1145,11 @@ class train_dataset(object):
 				dtpnt_cptnr_scrs_tnsr = dtpnt_cptnr_scrs_tnsr.unsqueeze(0)
 
 		al_frms = torch.stack(al_frms)
+		if self.frames_ring is not None:
+			# only the slot index is sent to the main process, see SharedFramesLoader
+			al_frms = torch.tensor(self.frames_ring.put(al_frms)).long()
 		class_weights = torch.from_numpy(class_weights).float()
+		vw_msk = torch.from_numpy(vw_msk)
 
 		al_rel_cameraPoses = None
 		if self.use_relativeCameraPoseLoss:
@@ -950,33 +1319,29 @@ class train_dataset(object):
 		if self.task_type in ["classify_oneHot", "match_dist", "classify_oneHot_bestExoPred"]:
 			if self.use_relativeCameraPoseLoss:
 				if self.egoVlpV2_vis2textSim_labler:
-					return al_frms, lbl, lbl_multiHot, dtpnt_scrs_tnsr, dtpnt_cptnr_scrs_tnsr, class_weights, al_rel_cameraPoses, has_cameraPose
+					return al_frms, vw_msk, lbl, lbl_multiHot, dtpnt_scrs_tnsr, dtpnt_cptnr_scrs_tnsr, class_weights, al_rel_cameraPoses, has_cameraPose
 				else:
-					return al_frms, lbl, lbl_multiHot, dtpnt_scrs_tnsr, class_weights, al_rel_cameraPoses, has_cameraPose
+					return al_frms, vw_msk, lbl, lbl_multiHot, dtpnt_scrs_tnsr, class_weights, al_rel_cameraPoses, has_cameraPose
 			else:
 				if self.egoVlpV2_vis2textSim_labler:
-					return al_frms, lbl, lbl_multiHot, dtpnt_scrs_tnsr, dtpnt_cptnr_scrs_tnsr, class_weights
+					return al_frms, vw_msk, lbl, lbl_multiHot, dtpnt_scrs_tnsr, dtpnt_cptnr_scrs_tnsr, class_weights
 				else:
-					return al_frms, lbl, lbl_multiHot, dtpnt_scrs_tnsr, class_weights
+					return al_frms, vw_msk, lbl, lbl_multiHot, dtpnt_scrs_tnsr, class_weights
 		else:
 			if self.use_relativeCameraPoseLoss:
 				if self.egoVlpV2_vis2textSim_labler:
-					return al_frms, lbl, dtpnt_scrs_tnsr, dtpnt_cptnr_scrs_tnsr, class_weights, al_rel_cameraPoses, has_cameraPose
+					return al_frms, vw_msk, lbl, dtpnt_scrs_tnsr, dtpnt_cptnr_scrs_tnsr, class_weights, al_rel_cameraPoses, has_cameraPose
 				else:
-					return al_frms, lbl, dtpnt_scrs_tnsr, class_weights, al_rel_cameraPoses, has_cameraPose
+					return al_frms, vw_msk, lbl, dtpnt_scrs_tnsr, class_weights, al_rel_cameraPoses, has_cameraPose
 			else:
 				if self.egoVlpV2_vis2textSim_labler:
-					return al_frms, lbl, dtpnt_scrs_tnsr, dtpnt_cptnr_scrs_tnsr, class_weights
+					return al_frms, vw_msk, lbl, dtpnt_scrs_tnsr, dtpnt_cptnr_scrs_tnsr, class_weights
 				else:
-					return al_frms, lbl, dtpnt_scrs_tnsr, class_weights
+					return al_frms, vw_msk, lbl, dtpnt_scrs_tnsr, class_weights
 
 
 class val_dataset(object):
 	def __init__(self, args, **kwargs):
-		self.lemmaDataset_dct =\
-			pkl_ld("./data/lemma/v1/misc/"+\
-				  "take__2__startNendEgoImageSuffix__2__timestamp_n_startNendClipName_n_startNendFrameIdx_n_listAtomicDescriptions_n_listImageSuffixes__val.pkl")
-
 		self.args = args
 		self.kwargs = kwargs
 		self.distributed = kwargs["distributed"]
@@ -988,13 +1353,26 @@ class val_dataset(object):
 		self.frame_height = kwargs['frame_height']
 		self.frame_width = kwargs['frame_width']
 		self.dont_square_frames = kwargs["dont_square_frames"] if ("dont_square_frames" in kwargs) else False
+		self.keyframeAware_decode = not (kwargs["dont_keyframeAware_decode"] if ("dont_keyframeAware_decode" in kwargs) else False)
+		self.sharedMemory_uint8Frames = kwargs["sharedMemory_uint8Frames"] if ("sharedMemory_uint8Frames" in kwargs) else False
+		self.valCache_dir = kwargs["valCache_dir"] if ("valCache_dir" in kwargs) else None
+		# set by trainer.build_valCache
+		self.val_cache = None
+		# cached frames are decoded to uint8 and normalized downstream, like frames sent through shared memory
+		self.uint8_frames = self.sharedMemory_uint8Frames or (self.valCache_dir is not None)
 		self.videoClips_dir = kwargs["videoClips_dir"] if ("videoClips_dir" in kwargs) else None
 		self.datapoint_videoClips_dir = kwargs["datapoint_videoClips_dir"] if ("datapoint_videoClips_dir" in kwargs) else None
+		self.lemmaImages_numThreads = kwargs["lemmaImages_numThreads"] if ("lemmaImages_numThreads" in kwargs) else 4
+		self.lemmaImages_draftDecode = kwargs["draftDecode_lemmaImages"] if ("draftDecode_lemmaImages" in kwargs) else False
+		self.lemmaImages_cacheDir = kwargs["lemmaImages_cacheDir"] if ("lemmaImages_cacheDir" in kwargs) else None
+		self.lemmaImage_cache = None
 		datapoints_filePath = kwargs["valDatapoints_filePath"]
+		self.datapoints_filePath = datapoints_filePath
 		datapoints_captioner_filePath = kwargs["valDatapoints_captioner_filePath"] if ("valDatapoints_captioner_filePath" in kwargs) else None
 		self.recog_arc = kwargs['recog_arc']
 		self.task_type = kwargs['task_type']
 		self.use_datapointVideoClips = kwargs["use_datapointVideoClips"] if ("use_datapointVideoClips" in kwargs) else False
+		self.allow_missingViews = kwargs["allow_missingViews"] if ("allow_missingViews" in kwargs) else False
 		self.use_egoVlpV2_takeVideoFeats_usingStartNendTime = kwargs["use_egoVlpV2_takeVideoFeats_usingStartNendTime"]\
 																if ("use_egoVlpV2_takeVideoFeats_usingStartNendTime" in kwargs) else\
 																	False
@@ -1034,11 +1412,19 @@ class val_dataset(object):
 			assert ospid(self.cameraPose_dir)
 
 		self.isLemma_dataset = kwargs["isLemma_dataset"] if ("isLemma_dataset" in kwargs) else False
+		self.lemma_index = None
+		if self.isLemma_dataset:
+			lemmaIndex_filePath = kwargs["valLemmaIndex_filePath"] if ("valLemmaIndex_filePath" in kwargs) else\
+									f"{LEMMA_INDEX_FILE_PREFIX}__val.pkl"
+			self.lemma_index = get_lemmaIndex(lemmaIndex_filePath)
 
 		self.total_num_samples = self.num_samples
 
 		self.transforms = None
 		if self.use_datapointVideoClips:
+			from torchvision import transforms
+			from torchvision.transforms._transforms_video import NormalizeVideo, RandomHorizontalFlipVideo
+
 			assert self.frame_height == self.frame_width
 
 			frame_mean, frame_std = frame_normalize(None, 
@@ -1046,11 +1432,22 @@ class val_dataset(object):
 													return_meanNstd=True)
 			frame_normalize_ = NormalizeVideo(mean=frame_mean, std=frame_std)
 
-			self.transforms = transforms.Compose([
+			trnsfrms = [
 			    transforms.Resize(self.frame_height),
 			    transforms.CenterCrop(self.frame_height),
-			    frame_normalize_,
-			])
+			]
+			# uint8 frames are normalized downstream (see prepare_frames)
+			if not self.uint8_frames:
+				trnsfrms.append(frame_normalize_)
+
+			self.transforms = transforms.Compose(trnsfrms)
+
+		self.frames_ring = None
+		if self.uint8_frames:
+			assert self.use_datapointVideoClips and (not self.dont_square_frames) and (not self.use_videoLlama_feats)
+		if self.sharedMemory_uint8Frames:
+			self.frames_ring = SharedFramesRing(get_sharedFramesRing_numSlots(kwargs["batch_size"], kwargs["num_workers"]),
+												(len(self.all_views), self.num_frames, self.frame_height, self.frame_width, 3))
 
 		self.is_multiPseudolabler = False
 		self.topK_multiPseudolabler = kwargs["topK_multiPseudolabler"] if ("topK_multiPseudolabler" in kwargs) else 1
@@ -1123,9 +1520,9 @@ class val_dataset(object):
 											'timestamp': v2['timestamp']})
 
 				if  self.isLemma_dataset:
-					assert k1 in self.lemmaDataset_dct
-					assert (k2[1], k2[2]) in self.lemmaDataset_dct[k1], print(k2, (k2[1], k2[2]), list(self.lemmaDataset_dct[k1].keys())[:2])
-					self.lst_dtpnts[-1]["list_egoNexoSuffixes"] = self.lemmaDataset_dct[k1][(k2[1], k2[2])]["list_egoNexoSuffixes"]
+					lemmaIndex_row = self.lemma_index.get_row(k1, (k2[1], k2[2]))
+					assert lemmaIndex_row is not None, print(k1, k2, (k2[1], k2[2]))
+					self.lst_dtpnts[-1]["lemmaIndex_row"] = lemmaIndex_row
 				else:
 					if len(k2) == 2:
 						if ospif(f"{self.datapoint_videoClips_dir}/aria/{k1}/"+\
@@ -1168,29 +1565,17 @@ class val_dataset(object):
 						for ele__tkNm_2_strtNendTmstmp_2_tmstmpNstrtNendClpnmNstrtNendFrmIdxNscrs in\
 								lst__tkNm_2_strtNendTmstmp_2_tmstmpNstrtNendClpnmNstrtNendFrmIdxNscrs:
 							self.lst_dtpnts[-1]['scores'].append(
-										ele__tkNm_2_strtNendTmstmp_2_tmstmpNstrtNendClpnmNstrtNendFrmIdxNscrs[k1][k2]['scores']
+										select_viewScores(ele__tkNm_2_strtNendTmstmp_2_tmstmpNstrtNendClpnmNstrtNendFrmIdxNscrs[k1][k2]['scores'],
+														  self.all_views)
 									)
-							if self.all_views == ['1', '2', '3', '4', ]:
-								self.lst_dtpnts[-1]['scores'][-1] = self.lst_dtpnts[-1]['scores'][-1][1:]
-							elif self.all_views in [['aria', '1'], ['aria', '2'], ['aria', '3'], ['aria', '4']]:
-								exo_strtIdx = int(self.all_views[-1])
-								self.lst_dtpnts[-1]['scores'][-1] = self.lst_dtpnts[-1]['scores'][-1][:1] +\
-																	self.lst_dtpnts[-1]['scores'][-1][exo_strtIdx: (exo_strtIdx + 1)]
 					else:
 						if self.egoVlpV2_vis2textSim_labler:
-							if self.all_views == ['1', '2', '3', '4', ]:
-								raise NotImplementedError
-
-							self.lst_dtpnts[-1]['scores'] = v2['scores'][0]
-							self.lst_dtpnts[-1]['scores_captioner'] = tkNm_2_strtNendTmstmp_cptnrScrs[k1][(round(k2[0], 4), round(k2[1], 4), round(k2[2], 4) )]['scores']
+							self.lst_dtpnts[-1]['scores'] = select_viewScores(v2['scores'][0], self.all_views)
+							self.lst_dtpnts[-1]['scores_captioner'] =\
+								select_viewScores(tkNm_2_strtNendTmstmp_cptnrScrs[k1][(round(k2[0], 4), round(k2[1], 4), round(k2[2], 4))]['scores'],
+												  self.all_views)
 						else:
-							self.lst_dtpnts[-1]['scores'] = v2['scores']
-							if self.all_views == ['1', '2', '3', '4', ]:
-								self.lst_dtpnts[-1]['scores'] = self.lst_dtpnts[-1]['scores'][1:]
-							elif self.all_views in [['aria', '1'], ['aria', '2'], ['aria', '3'], ['aria', '4']]:
-								exo_strtIdx = int(self.all_views[-1])
-								self.lst_dtpnts[-1]['scores'][-1] = self.lst_dtpnts[-1]['scores'][-1][:1] +\
-																	self.lst_dtpnts[-1]['scores'][-1][exo_strtIdx: (exo_strtIdx + 1)]
+							self.lst_dtpnts[-1]['scores'] = select_viewScores(v2['scores'], self.all_views)
 
 		self.egoVlpV2_takeVideoFeats_takeName2camId2featName = None
 		if self.use_egoVlpV2_takeVideoFeats:
@@ -1201,6 +1586,21 @@ class val_dataset(object):
 
 		self.total_num_samples = min(self.total_num_samples, len(self.lst_dtpnts))
 
+		self.view_masks = None
+		if self.allow_missingViews:
+			# num_datapoints x num_views, views w/o inputs (cameras missing in a take) are masked out in __getitem__
+			self.view_masks = np.stack([get_datapointViewMask(dtpnt,
+															  self.all_views,
+															  camId2featName=self.egoVlpV2_takeVideoFeats_takeName2camId2featName.get(dtpnt['take_name'], {})\
+																				if self.use_egoVlpV2_takeVideoFeats else None,
+															  videoLlama_feats_dir=self.videoLlama_feats_dir if self.use_videoLlama_feats else None,
+															  lemma_index=self.lemma_index if (self.use_datapointVideoClips and self.isLemma_dataset) else None,
+															  datapoint_videoClips_dir=self.datapoint_videoClips_dir if self.use_datapointVideoClips else None,
+															  videoClips_dir=self.videoClips_dir)
+										for dtpnt in tqdm(self.lst_dtpnts[:self.total_num_samples], desc="View masks")])
+			if self.task_type in ["classify_oneHot_bestExoPred", "classify_multiHot_bestExoPred"]:
+				drop_missingBestExoViews(self.lst_dtpnts, self.view_masks)
+
 		if self.task_type != "classify_oneHot_bestExoPred":
 			self.class_weights = compute_classWeights(len(self.all_views),
 													  self.lst_dtpnts,
@@ -1214,6 +1614,30 @@ class val_dataset(object):
 	def __len__(self):
 		return self.total_num_samples	# 2, 6, 24, self.total_num_samples
 
+	def get_valCacheConfig(self, vidEncoder_key=None):
+		# everything the cached inputs depend on, vidEncoder_key is set for features of the frozen video encoder
+		lst_datapointsFps = self.datapoints_filePath if isinstance(self.datapoints_filePath, list) else [self.datapoints_filePath]
+		return {"version": VAL_CACHE_VERSION,
+				"datapoints": [[fp, os.path.getsize(fp), os.path.getmtime(fp)] for fp in lst_datapointsFps if ospif(fp)],
+				"num_samples": self.total_num_samples,
+				"all_views": self.all_views,
+				"num_frames": self.num_frames,
+				"frame_size": [self.frame_height, self.frame_width],
+				"datapoint_videoClips_dir": self.datapoint_videoClips_dir,
+				"isLemma_dataset": self.isLemma_dataset,
+				"lemmaImages_draftDecode": self.lemmaImages_draftDecode,
+				"vidEncoder_key": vidEncoder_key,
+				# the relative camera pose labels are cached too
+				"relativeCameraPose": {"cameraPose_dir": self.cameraPose_dir,
+									   "rotationOnly": self.relativeCameraPoseLoss_rotationOnly,
+									   "rotationInAngles": self.relativeCameraPoseLoss_rotationInAngles,
+									   "rotationInQuarts": self.relativeCameraPoseLoss_rotationInQuarts,
+									   "coordsInAngles": self.relativeCameraPoseLoss_coordsInAngles,
+									   "coordsNormalized": self.relativeCameraPoseLoss_coordsNormalized,
+									   "refType": self.relativeCameraPoseLoss_refType,
+									   "frameType": self.relativeCameraPoseLoss_frameType}\
+										if self.use_relativeCameraPoseLoss else None}
+
 	def __getitem__(self, index):
 		dtpnt_idx = index
 		dtpnt = self.lst_dtpnts[dtpnt_idx]
@@ -1221,195 +1645,211 @@ class val_dataset(object):
 		al_cameraPoses = None
 		if self.use_relativeCameraPoseLoss:
 			al_cameraPoses = []
-		for vw in self.all_views:
-			tk_nm = dtpnt['take_name']
-			if len(dtpnt['startNend_timestamp']) == 3:
-				cntr_tmstmp = dtpnt['startNend_timestamp'][0]
-				strt_tmstmp = dtpnt['startNend_timestamp'][1]
-				end_tmstmp = dtpnt['startNend_timestamp'][2]
-			else:
-				cntr_tmstmp = dtpnt['timestamp'] if ('timestamp' in dtpnt) else None
-				strt_tmstmp = dtpnt['startNend_timestamp'][0]
-				end_tmstmp = dtpnt['startNend_timestamp'][1]
-			if self.use_egoVlpV2_takeVideoFeats:
-				if self.use_relativeCameraPoseLoss:
-					raise NotImplementedError
+		al_rel_cameraPoses = None
+		vw_msk = self.view_masks[dtpnt_idx] if (self.view_masks is not None) else np.ones(len(self.all_views), dtype=bool)
+		if (self.val_cache is not None) and self.val_cache.is_complete():
+			# uint8 frames, or features of the frozen video encoder, see trainer.build_valCache
+			al_frms = self.val_cache.get(dtpnt_idx)
+			if self.use_relativeCameraPoseLoss:
+				al_rel_cameraPoses = self.val_cache.get(dtpnt_idx, name="gt_relCameraPose")
+				has_cameraPose = bool(self.val_cache.get(dtpnt_idx, name="has_relCameraPose"))
+		else:
+			for vw_idx, vw in enumerate(self.all_views):
+				if not vw_msk[vw_idx]:
+					# camera missing in the take, filled in once the present views are loaded
+					al_frms.append(None)
+					if self.use_relativeCameraPoseLoss:
+						al_cameraPoses.append(None)
+					continue
+				tk_nm = dtpnt['take_name']
+				if len(dtpnt['startNend_timestamp']) == 3:
+					cntr_tmstmp = dtpnt['startNend_timestamp'][0]
+					strt_tmstmp = dtpnt['startNend_timestamp'][1]
+					end_tmstmp = dtpnt['startNend_timestamp'][2]
+				else:
+					cntr_tmstmp = dtpnt['timestamp'] if ('timestamp' in dtpnt) else None
+					strt_tmstmp = dtpnt['startNend_timestamp'][0]
+					end_tmstmp = dtpnt['startNend_timestamp'][1]
+				if self.use_egoVlpV2_takeVideoFeats:
+					if self.use_relativeCameraPoseLoss:
+						raise NotImplementedError
 
-				assert tk_nm in self.egoVlpV2_takeVideoFeats_takeName2camId2featName
-				egoVlpV2_takeVideoFeats_camId2featName = self.egoVlpV2_takeVideoFeats_takeName2camId2featName[tk_nm]
+					assert tk_nm in self.egoVlpV2_takeVideoFeats_takeName2camId2featName
+					egoVlpV2_takeVideoFeats_camId2featName = self.egoVlpV2_takeVideoFeats_takeName2camId2featName[tk_nm]
 
-				assert vw in egoVlpV2_takeVideoFeats_camId2featName
-				ft_nm = egoVlpV2_takeVideoFeats_camId2featName[vw]
+					assert vw in egoVlpV2_takeVideoFeats_camId2featName
+					ft_nm = egoVlpV2_takeVideoFeats_camId2featName[vw]
 
-				ft_fp = f"{self.egoVlpV2_takeVideoFeats_dir}/{ft_nm}"
-				ft = torch.load(ft_fp, map_location="cpu")
+					ft_fp = f"{self.egoVlpV2_takeVideoFeats_dir}/{ft_nm}"
+					ft = torch.load(ft_fp, map_location="cpu")
 
-				srt_tmstmp_int = int(strt_tmstmp)
-				end_tmstmp_int = int(end_tmstmp)
-				assert 0 <= end_tmstmp_int - srt_tmstmp_int <= self.maxStartNendTimeDiff_use_egoVlpV2_takeVideoFeats
+					srt_tmstmp_int = int(strt_tmstmp)
+					end_tmstmp_int = int(end_tmstmp)
+					assert 0 <= end_tmstmp_int - srt_tmstmp_int <= self.maxStartNendTimeDiff_use_egoVlpV2_takeVideoFeats
 
-				if self.use_egoVlpV2_takeVideoFeats_usingCenterTime:
-					srt_tmstmp_int = end_tmstmp_int = int(cntr_tmstmp)
+					if self.use_egoVlpV2_takeVideoFeats_usingCenterTime:
+						srt_tmstmp_int = end_tmstmp_int = int(cntr_tmstmp)
 				
-				frms = None
-				ft_slc = None
-				tmstmp_cnt = 0
-				for tmstmp_int in range(srt_tmstmp_int, end_tmstmp_int + 1):
-					if tmstmp_int < len(ft):
-						ft_slc = ft[tmstmp_int]
-						if frms is None:
-							frms = ft_slc
+					frms = None
+					ft_slc = None
+					tmstmp_cnt = 0
+					for tmstmp_int in range(srt_tmstmp_int, end_tmstmp_int + 1):
+						if tmstmp_int < len(ft):
+							ft_slc = ft[tmstmp_int]
+							if frms is None:
+								frms = ft_slc
+							else:
+								frms = torch.cat((frms, ft_slc))
 						else:
-							frms = torch.cat((frms, ft_slc))
-					else:
-						break
-					tmstmp_cnt += 1
-
-				if frms is None:
-					assert ft_slc is None
-					ft_slc = torch.zeros(4096)
-					frms = torch.zeros(0)
-				else:
-					assert ft_slc is not None
+							break
+						tmstmp_cnt += 1
 
-				if self.use_egoVlpV2_takeVideoFeats_usingCenterTime:
-					frms = ft_slc
-					assert len(frms) == 4096
-				elif self.use_egoVlpV2_takeVideoFeats_usingStartNendTime:
-					if self.padFeatWithZero_use_egoVlpV2_takeVideoFeats_usingStartNendTime:
-						frms = torch.cat((frms, 
-											torch.zeros(4096 * (self.maxStartNendTimeDiff_use_egoVlpV2_takeVideoFeats + 1 - tmstmp_cnt))))
+					if frms is None:
+						assert ft_slc is None
+						ft_slc = torch.zeros(4096)
+						frms = torch.zeros(0)
 					else:
-						frms = torch.cat([frms] +\
-											([ft_slc] * (self.maxStartNendTimeDiff_use_egoVlpV2_takeVideoFeats + 1 - tmstmp_cnt)))
-					assert len(frms) == (self.maxStartNendTimeDiff_use_egoVlpV2_takeVideoFeats + 1) * 4096
-			elif self.use_videoLlama_feats:
-				if self.use_relativeCameraPoseLoss:
-					raise NotImplementedError
-
-				strt_clpNm = dtpnt['startNend_clipName'][0]
-				end_clpNm = dtpnt['startNend_clipName'][1]
-				strt_frmIdx = dtpnt['startNend_frameIdx'][0]
-				end_frmIdx = dtpnt['startNend_frameIdx'][1]
-
-				ft_fp = f"{self.videoLlama_feats_dir}/{vw}/{tk_nm}/{strt_clpNm}_{end_clpNm}__{strt_frmIdx}_{end_frmIdx}.pt"
-				assert ospif(ft_fp), print(ft_fp)
-
-				ft = torch.load(ft_fp, map_location="cpu")
-				if self.videoLlama_feats_seqAggregation == "mean":
-					ft = torch.mean(ft, dim=0).unsqueeze(0)
-				frms = ft.reshape((ft.shape[0] * ft.shape[1]))
-			else:
-				if self.use_datapointVideoClips:
-					if self.isLemma_dataset:
-						lst_egoNexoSffxs = dtpnt['list_egoNexoSuffixes']
-						lst_imgSffxs = []
-						for egoNexo_sffx in lst_egoNexoSffxs:
-							if vw == "fpv1":
-								lst_imgSffxs.append(egoNexo_sffx[0])
-							elif vw == "master":
-								lst_imgSffxs.append(egoNexo_sffx[1])
-							else:
-								raise ValueError
+						assert ft_slc is not None
+
+					if self.use_egoVlpV2_takeVideoFeats_usingCenterTime:
+						frms = ft_slc
+						assert len(frms) == 4096
+					elif self.use_egoVlpV2_takeVideoFeats_usingStartNendTime:
+						if self.padFeatWithZero_use_egoVlpV2_takeVideoFeats_usingStartNendTime:
+							frms = torch.cat((frms, 
+												torch.zeros(4096 * (self.maxStartNendTimeDiff_use_egoVlpV2_takeVideoFeats + 1 - tmstmp_cnt))))
+						else:
+							frms = torch.cat([frms] +\
+												([ft_slc] * (self.maxStartNendTimeDiff_use_egoVlpV2_takeVideoFeats + 1 - tmstmp_cnt)))
+						assert len(frms) == (self.maxStartNendTimeDiff_use_egoVlpV2_takeVideoFeats + 1) * 4096
+				elif self.use_videoLlama_feats:
+					if self.use_relativeCameraPoseLoss:
+						raise NotImplementedError
 
-						assert self.frame_height == self.frame_width
+					strt_clpNm = dtpnt['startNend_clipName'][0]
+					end_clpNm = dtpnt['startNend_clipName'][1]
+					strt_frmIdx = dtpnt['startNend_frameIdx'][0]
+					end_frmIdx = dtpnt['startNend_frameIdx'][1]
 
-						frms = []
-						for img_sffx in lst_imgSffxs:
-							img_fp = f"{self.datapoint_videoClips_dir}/{img_sffx}"
-							assert os.path.isfile(img_fp)
-							tmp_img = np.array(Image.open(img_fp).resize((self.frame_height, self.frame_width), resample=Image.BICUBIC))
-							assert tmp_img.dtype == np.uint8
-							frms.append(torch.from_numpy(tmp_img))
+					ft_fp = f"{self.videoLlama_feats_dir}/{vw}/{tk_nm}/{strt_clpNm}_{end_clpNm}__{strt_frmIdx}_{end_frmIdx}.pt"
+					assert ospif(ft_fp), print(ft_fp)
 
-						frms = torch.stack(frms).float() / 255
-					else:
-						strt_clpNm = dtpnt['startNend_clipName'][0]
-						end_clpNm = dtpnt['startNend_clipName'][1]
-						strt_frmIdx = dtpnt['startNend_frameIdx'][0]
-						end_frmIdx = dtpnt['startNend_frameIdx'][1]
+					ft = torch.load(ft_fp, map_location="cpu")
+					if self.videoLlama_feats_seqAggregation == "mean":
+						ft = torch.mean(ft, dim=0).unsqueeze(0)
+					frms = ft.reshape((ft.shape[0] * ft.shape[1]))
+				else:
+					if self.use_datapointVideoClips:
+						if self.isLemma_dataset:
+							lst_imgSffxs = self.lemma_index.get_imageSuffixes(dtpnt['lemmaIndex_row'], vw)
 
-						clp_pth = f"{self.datapoint_videoClips_dir}/{vw}/{tk_nm}/"+\
-									f"{strt_clpNm}_{end_clpNm}__{strt_frmIdx}_{end_frmIdx}__{strt_tmstmp}_{end_tmstmp}.mp4"
+							assert self.frame_height == self.frame_width
 
-						frms, frm_idxs = load_datapointVideo_egoExoNarrate(clp_pth,
-																n_frms=self.num_frames,
-																height=self.frame_height,
-																width=self.frame_width,
-																dont_square_frames=self.dont_square_frames,)
+							if (self.lemmaImages_cacheDir is not None) and (self.lemmaImage_cache is None):
+								self.lemmaImage_cache = LemmaImageCache(self.lemmaImages_cacheDir, self.frame_height, draft_decode=self.lemmaImages_draftDecode)
 
-					if self.use_relativeCameraPoseLoss:
-						if tk_nm in self.tkNm2cameraPose:
-							has_cameraPose = True
-							cameraPose_thisTake = self.tkNm2cameraPose[tk_nm]
+							frms = load_datapointImages_lemma(self.datapoint_videoClips_dir,
+																lst_imgSffxs,
+																self.frame_height,
+																draft_decode=self.lemmaImages_draftDecode,
+																image_cache=self.lemmaImage_cache,
+																num_threads=self.lemmaImages_numThreads,
+																return_uint8=self.uint8_frames)
 						else:
-							has_cameraPose = False
-							cameraPose_thisTake = self.tkNm2cameraPose[list(self.tkNm2cameraPose.keys())[0]]
+							strt_clpNm = dtpnt['startNend_clipName'][0]
+							end_clpNm = dtpnt['startNend_clipName'][1]
+							strt_frmIdx = dtpnt['startNend_frameIdx'][0]
+							end_frmIdx = dtpnt['startNend_frameIdx'][1]
+
+							clp_pth = f"{self.datapoint_videoClips_dir}/{vw}/{tk_nm}/"+\
+										f"{strt_clpNm}_{end_clpNm}__{strt_frmIdx}_{end_frmIdx}__{strt_tmstmp}_{end_tmstmp}.mp4"
+
+							frms, frm_idxs = load_datapointVideo_egoExoNarrate(clp_pth,
+																	n_frms=self.num_frames,
+																	height=self.frame_height,
+																	width=self.frame_width,
+																	dont_square_frames=self.dont_square_frames,
+																	keyframe_aware=self.keyframeAware_decode,
+																	return_uint8=self.uint8_frames,)
+
+						if self.use_relativeCameraPoseLoss:
+							if tk_nm in self.tkNm2cameraPose:
+								has_cameraPose = True
+								cameraPose_thisTake = self.tkNm2cameraPose[tk_nm]
+							else:
+								has_cameraPose = False
+								cameraPose_thisTake = self.tkNm2cameraPose[list(self.tkNm2cameraPose.keys())[0]]
 
-						relativeCameraPoseLoss_global_frameIdxs = []
+							relativeCameraPoseLoss_global_frameIdxs = []
 
-						if self.relativeCameraPoseLoss_frameType == "center":
-							if has_cameraPose:
-								relativeCameraPoseLoss_frameIdx = frm_idxs[len(frm_idxs) // 2]
-								relativeCameraPoseLoss_global_frameIdxs = [(int(strt_clpNm) * 900) + int(strt_frmIdx) + int(relativeCameraPoseLoss_frameIdx)]
-							else:
-								relativeCameraPoseLoss_global_frameIdxs = [0]
-						elif self.relativeCameraPoseLoss_frameType == "all":
-							if has_cameraPose:						
-								for relativeCameraPoseLoss_frameIdx in frm_idxs:
-									relativeCameraPoseLoss_global_frameIdx = (int(strt_clpNm) * 900) + int(strt_frmIdx) + int(relativeCameraPoseLoss_frameIdx)
-									relativeCameraPoseLoss_global_frameIdxs.append(relativeCameraPoseLoss_global_frameIdx)
+							if self.relativeCameraPoseLoss_frameType == "center":
+								if has_cameraPose:
+									relativeCameraPoseLoss_frameIdx = frm_idxs[len(frm_idxs) // 2]
+									relativeCameraPoseLoss_global_frameIdxs = [(int(strt_clpNm) * 900) + int(strt_frmIdx) + int(relativeCameraPoseLoss_frameIdx)]
+								else:
+									relativeCameraPoseLoss_global_frameIdxs = [0]
+							elif self.relativeCameraPoseLoss_frameType == "all":
+								if has_cameraPose:						
+									for relativeCameraPoseLoss_frameIdx in frm_idxs:
+										relativeCameraPoseLoss_global_frameIdx = (int(strt_clpNm) * 900) + int(strt_frmIdx) + int(relativeCameraPoseLoss_frameIdx)
+										relativeCameraPoseLoss_global_frameIdxs.append(relativeCameraPoseLoss_global_frameIdx)
+								else:
+									relativeCameraPoseLoss_global_frameIdxs = [0] * len(frm_idxs)
 							else:
-								relativeCameraPoseLoss_global_frameIdxs = [0] * len(frm_idxs)
-						else:
-							raise NotImplementedError
-
-						cameraPoses_thisVw = []
-						if vw == 'aria':
-							assert 'ego' in cameraPose_thisTake
+								raise NotImplementedError
 
-							for relativeCameraPoseLoss_global_frameIdx in relativeCameraPoseLoss_global_frameIdxs:
-								assert str(relativeCameraPoseLoss_global_frameIdx) in cameraPose_thisTake['ego']
-								cameraPose_thisVw = cameraPose_thisTake['ego'][str(relativeCameraPoseLoss_global_frameIdx)]
-								cameraPoses_thisVw.append(cameraPose_thisVw)
+							cameraPoses_thisVw = []
+							if vw == 'aria':
+								assert 'ego' in cameraPose_thisTake
 
-						else:
-							assert vw in cameraPose_thisTake
+								for relativeCameraPoseLoss_global_frameIdx in relativeCameraPoseLoss_global_frameIdxs:
+									assert str(relativeCameraPoseLoss_global_frameIdx) in cameraPose_thisTake['ego']
+									cameraPose_thisVw = cameraPose_thisTake['ego'][str(relativeCameraPoseLoss_global_frameIdx)]
+									cameraPoses_thisVw.append(cameraPose_thisVw)
 
-							for relativeCameraPoseLoss_global_frameIdx in relativeCameraPoseLoss_global_frameIdxs:
-								cameraPose_thisVw = cameraPose_thisTake[vw]
-								cameraPoses_thisVw.append(cameraPose_thisVw)
+							else:
+								assert vw in cameraPose_thisTake
 
-						al_cameraPoses.append(cameraPoses_thisVw)
+								for relativeCameraPoseLoss_global_frameIdx in relativeCameraPoseLoss_global_frameIdxs:
+									cameraPose_thisVw = cameraPose_thisTake[vw]
+									cameraPoses_thisVw.append(cameraPose_thisVw)
 
-					frms = frms.permute(3, 0, 1, 2) # (T, H, W, C -> C, T, H, W)
-					assert self.transforms is not None
-					frms = self.transforms(frms)
-					frms = frms.permute(1, 2, 3, 0)
-				else:
-					if self.use_relativeCameraPoseLoss:
-						raise NotImplementedError
+							al_cameraPoses.append(cameraPoses_thisVw)
 
-					clp_dr = f"{self.videoClips_dir}/{vw}/{tk_nm}"
-					assert os.path.isdir(clp_dr)
-					frms = load_video_egoExoNarrate(clp_dr,
-													dtpnt['startNend_clipName'],
-													dtpnt['startNend_frameIdx'],
-													n_frms=self.num_frames,
-													height=self.frame_height,
-													width=self.frame_width)
-					frms = frame_normalize(frms, input_frame_norm_type=self.recog_arc)
+						frms = frms.permute(3, 0, 1, 2) # (T, H, W, C -> C, T, H, W)
+						assert self.transforms is not None
+						frms = self.transforms(frms)
+						frms = frms.permute(1, 2, 3, 0)
+					else:
+						if self.use_relativeCameraPoseLoss:
+							raise NotImplementedError
 
-			al_frms.append(frms)
+						clp_dr = f"{self.videoClips_dir}/{vw}/{tk_nm}"
+						assert os.path.isdir(clp_dr)
+						frms = load_video_egoExoNarrate(clp_dr,
+														dtpnt['startNend_clipName'],
+														dtpnt['startNend_frameIdx'],
+														n_frms=self.num_frames,
+														height=self.frame_height,
+														width=self.frame_width)
+						frms = frame_normalize(frms, input_frame_norm_type=self.recog_arc)
+
+				al_frms.append(frms)
+			al_frms = fill_missingViews(al_frms, torch.zeros_like)
+			if self.use_relativeCameraPoseLoss:
+				# placeholder poses, the pose loss masks out the view pairs w/ a missing view
+				al_cameraPoses = fill_missingViews(al_cameraPoses, lambda cameraPoses: cameraPoses)
+			al_frms = torch.stack(al_frms)
 
 		ref_camerPoses = None
-		if self.use_relativeCameraPoseLoss:
+		if self.use_relativeCameraPoseLoss and (al_rel_cameraPoses is None):
 			ref_camerPoses = al_cameraPoses[0]
 
-		al_frms = torch.stack(al_frms)
+		if (self.frames_ring is not None) and (al_frms.dtype == torch.uint8):
+			# only the slot index is sent to the main process, see SharedFramesLoader (cached encoder features are sent as is)
+			al_frms = torch.tensor(self.frames_ring.put(al_frms)).long()
 
-		al_rel_cameraPoses = None
-		if self.use_relativeCameraPoseLoss:
+		if self.use_relativeCameraPoseLoss and (al_rel_cameraPoses is None):
 			al_rel_cameraPoses = []
 			for camera_poses in al_cameraPoses:
 
@@ -1449,16 +1889,16 @@ class val_dataset(object):
 			dtpnt_scrs_tmp[int(dtpnt['best_exo_views'][0]) - 1] = 1
 			dtpnt_scrs_tnsr = torch.tensor(dtpnt_scrs_tmp).float()
 		else:
-			dtpnt_scrs_tnsr = torch.tensor(dtpnt['scores']).float()
+			dtpnt_scrs_tnsr = torch.tensor(mask_missingViewScores(dtpnt['scores'], vw_msk)).float()
 		if len(dtpnt_scrs_tnsr.shape) == 1:
 			dtpnt_scrs_tnsr = dtpnt_scrs_tnsr.unsqueeze(0)
 		if self.egoVlpV2_vis2textSim_labler:
-			dtpnt_cptnr_scrs_tnsr = torch.tensor(dtpnt['scores_captioner']).float()
+			dtpnt_cptnr_scrs_tnsr = torch.tensor(mask_missingViewScores(dtpnt['scores_captioner'], vw_msk)).float()
 			if len(dtpnt_cptnr_scrs_tnsr.shape) == 1:
 				dtpnt_cptnr_scrs_tnsr = dtpnt_cptnr_scrs_tnsr.unsqueeze(0)
 
 		if self.task_type in ["classify_oneHot", "match_dist"]:
-			dtpnt_scrs = dtpnt['scores']
+			dtpnt_scrs = mask_missingViewScores(dtpnt['scores'], vw_msk)
 			if self.task_type == "classify_oneHot":
 				if self.is_multiPseudolabler:
 					if self.multiBestViewAggregator_multiPseudoLabler:
@@ -1577,36 +2017,33 @@ class val_dataset(object):
 		else:
 			raise NotImplementedError
 
+		vw_msk = torch.from_numpy(vw_msk)
 		if self.task_type in ["classify_oneHot", "match_dist", "classify_oneHot_bestExoPred"]:
 			if self.use_relativeCameraPoseLoss:
 				if self.egoVlpV2_vis2textSim_labler:
-					return al_frms, lbl, lbl_multiHot, dtpnt_scrs_tnsr, dtpnt_cptnr_scrs_tnsr, class_weights, al_rel_cameraPoses, has_cameraPose
+					return al_frms, vw_msk, lbl, lbl_multiHot, dtpnt_scrs_tnsr, dtpnt_cptnr_scrs_tnsr, class_weights, al_rel_cameraPoses, has_cameraPose
 				else:
-					return al_frms, lbl, lbl_multiHot, dtpnt_scrs_tnsr, class_weights, al_rel_cameraPoses, has_cameraPose
+					return al_frms, vw_msk, lbl, lbl_multiHot, dtpnt_scrs_tnsr, class_weights, al_rel_cameraPoses, has_cameraPose
 			else:
 				if self.egoVlpV2_vis2textSim_labler:
-					return al_frms, lbl, lbl_multiHot, dtpnt_scrs_tnsr, dtpnt_cptnr_scrs_tnsr, class_weights
+					return al_frms, vw_msk, lbl, lbl_multiHot, dtpnt_scrs_tnsr, dtpnt_cptnr_scrs_tnsr, class_weights
 				else:
-					return al_frms, lbl, lbl_multiHot, dtpnt_scrs_tnsr, class_weights
+					return al_frms, vw_msk, lbl, lbl_multiHot, dtpnt_scrs_tnsr, class_weights
 		else:
 			if self.use_relativeCameraPoseLoss:
 				if self.egoVlpV2_vis2textSim_labler:
-					return al_frms, lbl, dtpnt_scrs_tnsr, dtpnt_cptnr_scrs_tnsr, class_weights, al_rel_cameraPoses, has_cameraPose
+					return al_frms, vw_msk, lbl, dtpnt_scrs_tnsr, dtpnt_cptnr_scrs_tnsr, class_weights, al_rel_cameraPoses, has_cameraPose
 				else:
-					return al_frms, lbl, dtpnt_scrs_tnsr, class_weights, al_rel_cameraPoses, has_cameraPose
+					return al_frms, vw_msk, lbl, dtpnt_scrs_tnsr, class_weights, al_rel_cameraPoses, has_cameraPose
 			else:
 				if self.egoVlpV2_vis2textSim_labler:
-					return al_frms, lbl, dtpnt_scrs_tnsr, dtpnt_cptnr_scrs_tnsr, class_weights
+					return al_frms, vw_msk, lbl, dtpnt_scrs_tnsr, dtpnt_cptnr_scrs_tnsr, class_weights
 				else:
-					return al_frms, lbl, dtpnt_scrs_tnsr, class_weights
+					return al_frms, vw_msk, lbl, dtpnt_scrs_tnsr, class_weights
 
 
 class test_dataset(object):
 	def __init__(self, args, **kwargs):
-		self.lemmaDataset_dct =\
-			pkl_ld("data/lemma/v1/misc/"+\
-				   "take__2__startNendEgoImageSuffix__2__timestamp_n_startNendClipName_n_startNendFrameIdx_n_listAtomicDescriptions_n_listImageSuffixes__val.pkl")
-
 		self.args = args
 		self.kwargs = kwargs
 		self.batch_size = kwargs["batch_size"]
@@ -1615,17 +2052,32 @@ class test_dataset(object):
 		self.frame_height = kwargs['frame_height']
 		self.frame_width = kwargs['frame_width']
 		self.dont_square_frames = kwargs["dont_square_frames"] if ("dont_square_frames" in kwargs) else False
+		self.keyframeAware_decode = not (kwargs["dont_keyframeAware_decode"] if ("dont_keyframeAware_decode" in kwargs) else False)
+		self.sharedMemory_uint8Frames = kwargs["sharedMemory_uint8Frames"] if ("sharedMemory_uint8Frames" in kwargs) else False
 		self.videoClips_dir = kwargs["videoClips_dir"] if ("videoClips_dir" in kwargs) else None
 		self.datapoint_videoClips_dir = kwargs["datapoint_videoClips_dir"] if ("datapoint_videoClips_dir" in kwargs) else None
+		self.lemmaImages_numThreads = kwargs["lemmaImages_numThreads"] if ("lemmaImages_numThreads" in kwargs) else 4
+		self.lemmaImages_draftDecode = kwargs["draftDecode_lemmaImages"] if ("draftDecode_lemmaImages" in kwargs) else False
+		self.lemmaImages_cacheDir = kwargs["lemmaImages_cacheDir"] if ("lemmaImages_cacheDir" in kwargs) else None
+		self.lemmaImage_cache = None
 		datapoints_filePath = kwargs["testDatapoints_filePath"]
 		self.recog_arc = kwargs['recog_arc']
 		self.task_type = kwargs['task_type']
 		self.use_datapointVideoClips = kwargs["use_datapointVideoClips"] if ("use_datapointVideoClips" in kwargs) else False
+		self.allow_missingViews = kwargs["allow_missingViews"] if ("allow_missingViews" in kwargs) else False
 
 		self.isLemma_dataset = kwargs["isLemma_dataset"] if ("isLemma_dataset" in kwargs) else False
+		self.lemma_index = None
+		if self.isLemma_dataset:
+			lemmaIndex_filePath = kwargs["testLemmaIndex_filePath"] if ("testLemmaIndex_filePath" in kwargs) else\
+									f"{LEMMA_INDEX_FILE_PREFIX}__val.pkl"
+			self.lemma_index = get_lemmaIndex(lemmaIndex_filePath)
 
 		self.transforms = None
 		if self.use_datapointVideoClips:
+			from torchvision import transforms
+			from torchvision.transforms._transforms_video import NormalizeVideo, RandomHorizontalFlipVideo
+
 			assert self.frame_height == self.frame_width
 
 			frame_mean, frame_std = frame_normalize(None, 
@@ -1634,11 +2086,21 @@ class test_dataset(object):
 
 			frame_normalize_ = NormalizeVideo(mean=frame_mean, std=frame_std)
 
-			self.transforms = transforms.Compose([
+			trnsfrms = [
 			    transforms.Resize(self.frame_height),
 			    transforms.CenterCrop(self.frame_height),
-			    frame_normalize_,
-			])
+			]
+			# uint8 frames are normalized downstream (see prepare_frames)
+			if not self.sharedMemory_uint8Frames:
+				trnsfrms.append(frame_normalize_)
+
+			self.transforms = transforms.Compose(trnsfrms)
+
+		self.frames_ring = None
+		if self.sharedMemory_uint8Frames:
+			assert self.use_datapointVideoClips and (not self.dont_square_frames)
+			self.frames_ring = SharedFramesRing(get_sharedFramesRing_numSlots(kwargs["batch_size"], kwargs["num_workers"]),
+												(len(self.all_views), self.num_frames, self.frame_height, self.frame_width, 3))
 
 		assert os.path.isfile(datapoints_filePath), print(datapoints_filePath)
 		with open(datapoints_filePath, "rb") as fi:
@@ -1655,20 +2117,26 @@ class test_dataset(object):
 										'timestamp': v2['timestamp']})
 
 				if self.isLemma_dataset:
-					assert k1 in self.lemmaDataset_dct
-					assert (k2[1], k2[2]) in self.lemmaDataset_dct[k1], print(k2, (k2[1], k2[2]), list(self.lemmaDataset_dct[k1].keys())[:2])
-					self.lst_dtpnts[-1]["list_egoNexoSuffixes"] = self.lemmaDataset_dct[k1][(k2[1], k2[2])]["list_egoNexoSuffixes"]
+					lemmaIndex_row = self.lemma_index.get_row(k1, (k2[1], k2[2]))
+					assert lemmaIndex_row is not None, print(k1, k2, (k2[1], k2[2]))
+					self.lst_dtpnts[-1]["lemmaIndex_row"] = lemmaIndex_row
 
 				if self.task_type in ["classify_oneHot_bestExoPred", "classify_multiHot_bestExoPred"]:
 					self.lst_dtpnts[-1]['best_exo_views'] = v2['best_exo_views']
 				else:
-					self.lst_dtpnts[-1]['scores'] = v2['scores']
-					if self.all_views == ['1', '2', '3', '4', ]:
-						self.lst_dtpnts[-1]['scores'] = self.lst_dtpnts[-1]['scores'][1:]
-					elif self.all_views in [['aria', '1'], ['aria', '2'], ['aria', '3'], ['aria', '4']]:
-						exo_strtIdx = int(self.all_views[-1])
-						self.lst_dtpnts[-1]['scores'] = self.lst_dtpnts[-1]['scores'][:1] +\
-															self.lst_dtpnts[-1]['scores'][exo_strtIdx: (exo_strtIdx + 1)]
+					self.lst_dtpnts[-1]['scores'] = select_viewScores(v2['scores'], self.all_views)
+
+		self.view_masks = None
+		if self.allow_missingViews:
+			# num_datapoints x num_views, views w/o inputs (cameras missing in a take) are masked out in __getitem__
+			self.view_masks = np.stack([get_datapointViewMask(dtpnt,
+															  self.all_views,
+															  lemma_index=self.lemma_index if (self.use_datapointVideoClips and self.isLemma_dataset) else None,
+															  datapoint_videoClips_dir=self.datapoint_videoClips_dir if self.use_datapointVideoClips else None,
+															  videoClips_dir=self.videoClips_dir)
+										for dtpnt in tqdm(self.lst_dtpnts, desc="View masks")])
+			if self.task_type in ["classify_oneHot_bestExoPred", "classify_multiHot_bestExoPred"]:
+				drop_missingBestExoViews(self.lst_dtpnts, self.view_masks)
 
 	def __len__(self):
 		return self.total_num_samples   # 2, 6, self.total_num_samples
@@ -1677,7 +2145,12 @@ class test_dataset(object):
 		dtpnt_idx = index
 		dtpnt = self.lst_dtpnts[dtpnt_idx]
 		al_frms = []
-		for vw in self.all_views:
+		vw_msk = self.view_masks[dtpnt_idx] if (self.view_masks is not None) else np.ones(len(self.all_views), dtype=bool)
+		for vw_idx, vw in enumerate(self.all_views):
+			if not vw_msk[vw_idx]:
+				# camera missing in the take, filled in once the present views are loaded
+				al_frms.append(None)
+				continue
 			tk_nm = dtpnt['take_name']
 			if len(dtpnt['startNend_timestamp']) == 3:
 				cntr_tmstmp = dtpnt['startNend_timestamp'][0]
@@ -1690,27 +2163,20 @@ class test_dataset(object):
 
 			if self.use_datapointVideoClips:
 				if self.isLemma_dataset:
-					lst_egoNexoSffxs = dtpnt['list_egoNexoSuffixes']
-					lst_imgSffxs = []
-					for egoNexo_sffx in lst_egoNexoSffxs:
-						if vw == "fpv1":
-							lst_imgSffxs.append(egoNexo_sffx[0])
-						elif vw == "master":
-							lst_imgSffxs.append(egoNexo_sffx[1])
-						else:
-							raise ValueError
+					lst_imgSffxs = self.lemma_index.get_imageSuffixes(dtpnt['lemmaIndex_row'], vw)
 
 					assert self.frame_height == self.frame_width
 
-					frms = []
-					for img_sffx in lst_imgSffxs:
-						img_fp = f"{self.datapoint_videoClips_dir}/{img_sffx}"
-						assert os.path.isfile(img_fp), print(img_fp)
-						tmp_img = np.array(Image.open(img_fp).resize((self.frame_height, self.frame_width), resample=Image.BICUBIC))
-						assert tmp_img.dtype == np.uint8
-						frms.append(torch.from_numpy(tmp_img))
+					if (self.lemmaImages_cacheDir is not None) and (self.lemmaImage_cache is None):
+						self.lemmaImage_cache = LemmaImageCache(self.lemmaImages_cacheDir, self.frame_height, draft_decode=self.lemmaImages_draftDecode)
 
-					frms = torch.stack(frms).float() / 255
+					frms = load_datapointImages_lemma(self.datapoint_videoClips_dir,
+														lst_imgSffxs,
+														self.frame_height,
+														draft_decode=self.lemmaImages_draftDecode,
+														image_cache=self.lemmaImage_cache,
+														num_threads=self.lemmaImages_numThreads,
+														return_uint8=self.sharedMemory_uint8Frames)
 				else:
 					strt_clpNm = dtpnt['startNend_clipName'][0]
 					end_clpNm = dtpnt['startNend_clipName'][1]
@@ -1724,7 +2190,9 @@ class test_dataset(object):
 															n_frms=self.num_frames,
 															height=self.frame_height,
 															width=self.frame_width,
-															dont_square_frames=self.dont_square_frames,)
+															dont_square_frames=self.dont_square_frames,
+															keyframe_aware=self.keyframeAware_decode,
+															return_uint8=self.sharedMemory_uint8Frames,)
 
 				frms = frms.permute(3, 0, 1, 2) # (T, H, W, C -> C, T, H, W)
 				assert self.transforms is not None
@@ -1741,12 +2209,16 @@ class test_dataset(object):
 												width=self.frame_width)
 				frms = frame_normalize(frms, input_frame_norm_type=self.recog_arc)
 			al_frms.append(frms)
+		al_frms = fill_missingViews(al_frms, torch.zeros_like)
 		al_frms = torch.stack(al_frms)
+		if self.frames_ring is not None:
+			# only the slot index is sent to the main process, see SharedFramesLoader
+			al_frms = torch.tensor(self.frames_ring.put(al_frms)).long()
 
 		if self.task_type == "classify_oneHot":
-			lbl = torch.tensor([np.argmax(dtpnt['scores'])]).long()
+			lbl = torch.tensor([np.argmax(mask_missingViewScores(dtpnt['scores'], vw_msk))]).long()
 		elif self.task_type == "match_dist":
-			lbl = torch.tensor(dtpnt['scores']).float()
+			lbl = torch.tensor(mask_missingViewScores(dtpnt['scores'], vw_msk)).float()
 		elif self.task_type in ["classify_oneHot_bestExoPred", "classify_multiHot_bestExoPred"]:
 			lbl = torch.zeros((len(self.all_views))).float()
 			for bst_ex_vw in dtpnt['best_exo_views']:
@@ -1758,7 +2230,8 @@ class test_dataset(object):
 		else:
 			raise NotImplementedError
 
+		vw_msk = torch.from_numpy(vw_msk)
 		if self.task_type == "classify_oneHot_bestExoPred":
-			return al_frms, lbl, index, lbl_multiHot
+			return al_frms, vw_msk, lbl, index, lbl_multiHot
 		else:
-			return al_frms, lbl, index
+			return al_frms, vw_msk, lbl, index
@@ -1,4 +1,5 @@
 import time
+import multiprocessing
 import numpy as np
 
 import torch
@@ -88,6 +89,99 @@ def frame_unnormalize(tensor, input_frame_norm_type="egovlp_v2", ):
     return tensor_unnorm
 
 
+def prepare_frames(frames, input_frame_norm_type="egovlp_v2", normalize=True):
+    """
+    uint8 frames (e.g. from SharedFramesLoader) -> float frames in [0, 1], normalized unless the caller normalizes them
+    later (e.g. after color jitter). Float frames were already prepared by the dataset and are returned as is.
+    """
+    if frames.dtype != torch.uint8:
+        return frames
+
+    frames = frames.float() / 255.0
+    if normalize:
+        frames = frame_normalize(frames, input_frame_norm_type=input_frame_norm_type, dont_scale=True)
+
+    return frames
+
+
+def get_sharedFramesRing_numSlots(batch_size, num_workers, prefetch_factor=2):
+    # samples the DataLoader can have in flight (prefetch_factor batches per worker), plus the batch being read
+    return (max(num_workers, 1) * prefetch_factor + 2) * batch_size
+
+
+class SharedFramesRing(object):
+    """
+    Slots of uint8 frames in shared memory. DataLoader workers write a sample's frames into a free slot and return the
+    slot index instead of the frames, so only the index is pickled to the main process, where SharedFramesLoader
+    copies the slots out and frees them. Workers complete batches out of order, so slots are tracked w/ a shared in-use
+    flag instead of being handed out round robin, and the ring must hold all the samples the DataLoader can have in
+    flight (see get_sharedFramesRing_numSlots).
+    """
+    def __init__(self, num_slots, frames_shape):
+        self.num_slots = num_slots
+        self.frames = torch.zeros((num_slots,) + tuple(frames_shape), dtype=torch.uint8).share_memory_()
+        self.slots_inUse = torch.zeros(num_slots, dtype=torch.bool).share_memory_()
+        self.lock = multiprocessing.Lock()
+
+    def reset(self):
+        # frees the slots of an abandoned DataLoader iterator
+        with self.lock:
+            self.slots_inUse.fill_(False)
+
+    def put(self, frames):
+        assert frames.dtype == torch.uint8, print(frames.dtype)
+        slot_idx = None
+        while slot_idx is None:
+            with self.lock:
+                free_slotIdxs = torch.nonzero(~self.slots_inUse)
+                if len(free_slotIdxs) > 0:
+                    slot_idx = int(free_slotIdxs[0])
+                    self.slots_inUse[slot_idx] = True
+            if slot_idx is None:
+                time.sleep(0.001)
+        self.frames[slot_idx].copy_(frames)
+        return slot_idx
+
+    def get(self, slot_idxs, pin_memory=False):
+        frames = torch.empty((len(slot_idxs),) + tuple(self.frames.shape[1:]),
+                             dtype=torch.uint8,
+                             pin_memory=pin_memory and torch.cuda.is_available())
+        torch.index_select(self.frames, 0, slot_idxs.long(), out=frames)
+        with self.lock:
+            self.slots_inUse[slot_idxs.long()] = False
+        return frames
+
+
+class SharedFramesLoader(object):
+    """
+    Wraps a DataLoader over a dataset w/ a SharedFramesRing and replaces the slot indices in the first element of every
+    batch w/ the slots' uint8 frames (pinned if the DataLoader pins memory). The frames are normalized downstream w/
+    prepare_frames.
+    """
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.frames_ring = loader.dataset.frames_ring
+        assert self.frames_ring is not None
+
+    def __iter__(self):
+        self.frames_ring.reset()
+        for batch in self.loader:
+            if batch[0].dtype != torch.int64:
+                # not slot indices, e.g. features from the val cache
+                yield batch
+                continue
+            frames = self.frames_ring.get(batch[0], pin_memory=self.loader.pin_memory)
+            yield [frames] + list(batch[1:])
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __getattr__(self, name):
+        method = self.loader.__getattribute__(name)
+        return method
+
+
 def apply_to_sample(f, sample):
     if len(sample) == 0:
         return {}
@@ -237,3 +331,20 @@ class IterLoader:
 
     def __len__(self):
         return len(self._dataloader)
+
+
+def iter_microBatches(loader, micro_batch_size=None):
+    """
+    Splits every batch of a loader into micro-batches of at most micro_batch_size datapoints for gradient accumulation.
+    :return: generator of (batch index, micro-batch, whole batch, whether it's the batch's last micro-batch)
+    """
+    for btch_idx, batch in enumerate(loader):
+        btch_sz = len(batch[0])
+        if (micro_batch_size is None) or (micro_batch_size >= btch_sz):
+            yield btch_idx, batch, batch, True
+            continue
+        for strt_idx in range(0, btch_sz, micro_batch_size):
+            yield btch_idx,\
+                    [ele[strt_idx: strt_idx + micro_batch_size] for ele in batch],\
+                    batch,\
+                    strt_idx + micro_batch_size >= btch_sz
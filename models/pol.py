@@ -9,6 +9,10 @@ from models.video_transformer_egovlp import EgoVLPv2
 from common.utils import *
 
 
+# logit of the views missing in a take, low enough that they're never picked but finite, so the KL loss stays finite
+MASKED_VIEW_LOGIT = -1e4
+
+
 class videoEncoder(nn.Module):
 	def __init__(self, kwargs):
 		super().__init__()
@@ -29,7 +33,12 @@ class videoEncoder(nn.Module):
 										kwargs=kwargs)
 		assert self.vid_encoder
 
-	def forward(self, frms, ):
+	def forward(self, frms, view_mask=None):
+		"""
+		:param frms: B x num_views x T x H x W x C
+		:param view_mask: optional B x num_views bool, False for the views missing in a take. Only the present views are
+		encoded, the features of the missing ones are zeros and their relative camera pose predictions are undefined
+		"""
 		B, nm_vws, t = frms.shape[0], frms.shape[1], frms.shape[2]
 		frms = frms.permute((0, 1, 2, 5, 3, 4))
 		frms = frms.reshape((frms.shape[0] * frms.shape[1], 
@@ -37,14 +46,21 @@ class videoEncoder(nn.Module):
 							 frms.shape[3],
 							 frms.shape[4],
 							 frms.shape[5]))
+		if view_mask is not None:
+			view_mask = view_mask.bool()
+			frms = frms[view_mask.reshape(-1)]
 
 		if self.use_relativeCameraPoseLoss:
-			fts, fts_relCameraPose = self.vid_encoder(frms)
+			fts, fts_relCameraPose = self.vid_encoder(frms, view_mask=view_mask)
 			
 		else:
 			fts = self.vid_encoder(frms)
 
 		assert len(fts.shape) == 2		
+		if view_mask is not None:
+			al_fts = fts.new_zeros((B * nm_vws, fts.shape[1]))
+			al_fts[view_mask.reshape(-1)] = fts
+			fts = al_fts
 		fts = fts.reshape((B , nm_vws, fts.shape[1]))
 		fts = fts.reshape((B, fts.shape[1] * fts.shape[2]))
 		if self.use_relativeCameraPoseLoss:
@@ -115,13 +131,19 @@ class pol_v1(nn.Module):
 				self.num_inFeats = 768
 
 			self.transformer_pol = None
-			self.pos_embed = None
+			pos_embed = None
 			if self.use_transformerPol:
-				encoder_layer = nn.TransformerEncoderLayer(d_model=self.num_inFeats, nhead=8, dropout=self.transformerPol_dropout)
-				self.transformer_pol = nn.TransformerEncoder(encoder_layer, num_layers=self.numLayers_transformerPol)
+				# batch_first doesn't change the parameters (state dicts of seq-first checkpoints load as is), but lets 
+				# inference take the fused SDPA fast path
+				encoder_layer = nn.TransformerEncoderLayer(d_model=self.num_inFeats, nhead=8, dropout=self.transformerPol_dropout,
+														   batch_first=True)
+				self.transformer_pol = nn.TransformerEncoder(encoder_layer, num_layers=self.numLayers_transformerPol,
+															 enable_nested_tensor=False)
 
 				if self.addPE_transformerPol:
-					self.pos_embed = torch.from_numpy(get_1d_sincos_pos_embed(self.num_inFeats, len(self.all_views))).float()
+					pos_embed = torch.from_numpy(get_1d_sincos_pos_embed(self.num_inFeats, len(self.all_views))).float().unsqueeze(0)
+			# 1 x num_views x num_inFeats, follows the module across devices; non-persistent since it's deterministic
+			self.register_buffer("pos_embed", pos_embed, persistent=False)
 
 			self.num_inFeats *= len(self.all_views)
 			self.classifier = nn.Sequential()
@@ -135,22 +157,31 @@ class pol_v1(nn.Module):
 				in_feats = linearLayer_dim
 			self.classifier.append(nn.Linear(in_feats, self.num_classes))
 
-	def forward(self, feats, ):
+	def forward(self, feats, view_mask=None):
+		"""
+		:param view_mask: optional B x num_views bool, False for the views missing in a take. Missing views are masked
+		out of the transformer's attention and get MASKED_VIEW_LOGIT as their logits
+		"""
 		if self.use_preExtractedFeats:
 			feats = feats.reshape((feats.shape[0], feats.shape[1] * feats.shape[2]))
 		if self.use_videoLlama_feats:
 			feats = feats.float()
 
 		if self.transformer_pol is not None:
-			feats = feats.reshape((feats.shape[0], len(self.all_views), -1)).permute((1, 0, 2))
+			feats = feats.reshape((feats.shape[0], len(self.all_views), -1))
 
 			if self.pos_embed is not None:
-				self.pos_embed = self.pos_embed.to(feats.device).unsqueeze(1).repeat((1, feats.shape[1], 1))
 				feats = feats + self.pos_embed
 
-			feats = self.transformer_pol(feats).permute((1, 0, 2))
+			if view_mask is not None:
+				feats = self.transformer_pol(feats, src_key_padding_mask=~view_mask.bool())
+				feats = feats * view_mask.unsqueeze(-1).to(feats.dtype)
+			else:
+				feats = self.transformer_pol(feats)
 			feats = feats.reshape((feats.shape[0], -1))
 
 		out = self.classifier(feats)
+		if view_mask is not None:
+			out = out.masked_fill(~view_mask.bool(), MASKED_VIEW_LOGIT)
 
 		return out
@@ -9,6 +9,7 @@ from torch import einsum, nn
 import torch.nn.functional as F
 
 from models.vision_transformer_dinov2 import vit_base_custom
+from common.utils import load_checkpoint_file
 
 
 def state_dict_data_parallel_fix(load_state_dict, curr_state_dict):
@@ -700,7 +701,8 @@ class EgoVLPv2(nn.Module):
                 new_state_dict['model.temporal_embed'] = new_temporal_embed
 
     def load_ckpt(self, ckpt_path):
-        checkpoint = torch.load(ckpt_path, map_location='cpu')
+        # mmapped, so only the tensors that get copied are paged in
+        checkpoint = load_checkpoint_file(ckpt_path)
         if self.egovlpV2_encodeWdinoV2:
             state_dict = checkpoint
             missing_keys, unexpected_keys = self.model.load_state_dict(state_dict, strict=False)
@@ -715,8 +717,13 @@ class EgoVLPv2(nn.Module):
             missing_keys, unexpected_keys = self.load_state_dict(new_state_dict, strict=False)
         print(f"Loading pretrained model from {ckpt_path}, missing keys are {missing_keys}, unexpected keys are {unexpected_keys}")
 
-    def forward(self, x):
+    def forward(self, x, view_mask=None):
+        """
+        :param view_mask: optional B x num_views bool, False for the views missing in a take, which aren't in x. The
+        pose head pairs up the views of a take, so it fills the missing ones w/ zeros
+        """
         if self.use_relativeCameraPoseLoss:
+            num_views = self.num_views if (view_mask is None) else view_mask.shape[1]
             video_embeddings, video_embeddings_finegrained = self.model(x)
 
             if self.use_egovlpV2_patchLevelVisualFeats:
@@ -751,9 +758,15 @@ class EgoVLPv2(nn.Module):
             video_embeddings = self.pred_conv(video_embeddings_shared)
             video_embeddings = video_embeddings.reshape((B, -1))
 
+            if view_mask is not None:
+                video_embeddings_shared = video_embeddings_shared.reshape((B, num_frames) + tuple(video_embeddings_shared.shape[1:]))
+                al_video_embeddings_shared = video_embeddings_shared.new_zeros((view_mask.numel(),) + tuple(video_embeddings_shared.shape[1:]))
+                al_video_embeddings_shared[view_mask.reshape(-1)] = video_embeddings_shared
+                video_embeddings_shared = al_video_embeddings_shared.reshape((-1,) + tuple(video_embeddings_shared.shape[2:]))
+
             if self.relativeCameraPoseLoss_refType in ["first_view", "all_views"]:
                 video_embeddings_cameraPose = video_embeddings_shared.reshape((-1,
-                                                                                    self.num_views, 
+                                                                                    num_views, 
                                                                                     num_frames,
                                                                                     video_embeddings_shared.shape[1],
                                                                                     video_embeddings_shared.shape[2],
@@ -761,13 +774,13 @@ class EgoVLPv2(nn.Module):
                 B_actl = video_embeddings_cameraPose.shape[0]
                 video_embeddings_cameraPose = video_embeddings_cameraPose.permute((0, 2, 1, 3, 4, 5))
                 if self.relativeCameraPoseLoss_refType == "first_view":
-                    video_embeddings_cameraPose_ref = torch.cat([video_embeddings_cameraPose[:, :, :1]] * self.num_views, dim=2)
+                    video_embeddings_cameraPose_ref = torch.cat([video_embeddings_cameraPose[:, :, :1]] * num_views, dim=2)
                 elif self.relativeCameraPoseLoss_refType == "all_views":
                     video_embeddings_cameraPose_ref = []
-                    for vw_idx in range(self.num_views):
-                        video_embeddings_cameraPose_ref += ([video_embeddings_cameraPose[:, :, vw_idx: vw_idx + 1]] * self.num_views)
+                    for vw_idx in range(num_views):
+                        video_embeddings_cameraPose_ref += ([video_embeddings_cameraPose[:, :, vw_idx: vw_idx + 1]] * num_views)
                     video_embeddings_cameraPose_ref = torch.cat(video_embeddings_cameraPose_ref, dim=2)
-                    video_embeddings_cameraPose = torch.cat([video_embeddings_cameraPose] * self.num_views, dim=2)
+                    video_embeddings_cameraPose = torch.cat([video_embeddings_cameraPose] * num_views, dim=2)
 
                 if self.relativeCameraPoseLoss_stopGradientRefPose:
                     video_embeddings_cameraPose_ref = video_embeddings_cameraPose_ref.detach()
@@ -785,13 +798,13 @@ class EgoVLPv2(nn.Module):
                 video_embeddings_cameraPose = video_embeddings_cameraPose.reshape((dm1, dm2, dm3, video_embeddings_cameraPose.shape[-1]))
 
                 if self.relativeCameraPoseLoss_refType == "first_view":
-                    video_embeddings_cameraPose = video_embeddings_cameraPose.reshape((B_actl * self.num_views * num_frames, video_embeddings_cameraPose.shape[3]))
+                    video_embeddings_cameraPose = video_embeddings_cameraPose.reshape((B_actl * num_views * num_frames, video_embeddings_cameraPose.shape[3]))
                     video_embeddings_cameraPose = self.pose_lin(video_embeddings_cameraPose)
-                    video_embeddings_cameraPose = video_embeddings_cameraPose.reshape((B_actl * self.num_views, num_frames, video_embeddings_cameraPose.shape[1]))
+                    video_embeddings_cameraPose = video_embeddings_cameraPose.reshape((B_actl * num_views, num_frames, video_embeddings_cameraPose.shape[1]))
                 elif self.relativeCameraPoseLoss_refType == "all_views":
-                    video_embeddings_cameraPose = video_embeddings_cameraPose.reshape((B_actl * (self.num_views ** 2) * num_frames, video_embeddings_cameraPose.shape[3]))
+                    video_embeddings_cameraPose = video_embeddings_cameraPose.reshape((B_actl * (num_views ** 2) * num_frames, video_embeddings_cameraPose.shape[3]))
                     video_embeddings_cameraPose = self.pose_lin(video_embeddings_cameraPose)
-                    video_embeddings_cameraPose = video_embeddings_cameraPose.reshape((B_actl * (self.num_views ** 2), num_frames, video_embeddings_cameraPose.shape[1]))
+                    video_embeddings_cameraPose = video_embeddings_cameraPose.reshape((B_actl * (num_views ** 2), num_frames, video_embeddings_cameraPose.shape[1]))
             else:
                 raise NotImplementedError
 
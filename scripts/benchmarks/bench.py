@@ -0,0 +1,327 @@
+import os
+import sys
+import time
+import json
+import shlex
+import random
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+sys.path.insert(0, REPO_ROOT)
+
+import torch
+
+
+SUITES = ["models", "lemma_images", "video_decode", "train_dataset", "captioning_metrics"]
+
+# flags of train.py / train_lemma.py that change how train_dataset.__getitem__ loads a datapoint, timed one at a time
+DATASET_FLAG_COMBOS = [[],
+                       ["--dont-keyframeAware-decode"],
+                       ["--sharedMemory-uint8Frames"],]
+LEMMA_DATASET_FLAG_COMBOS = [[],
+                             ["--draftDecode-lemmaImages"],
+                             ["--lemmaImages-numThreads", "1"],
+                             ["--lemmaImages-cacheDir", "{tmp_dir}/lemma_cache"],
+                             ["--sharedMemory-uint8Frames"],]
+
+WORDS = ["c", "picks", "puts", "cuts", "stirs", "holds", "the", "a", "knife", "bowl", "pan", "onion", "board", "spoon",
+         "with", "on", "into", "from", "left", "right", "hand", "table", "water", "bike", "wheel", "tire", "ball"]
+
+
+def time_fn(fn, num_repeats, num_warmup=1):
+    for _ in range(num_warmup):
+        fn()
+    lst_times = []
+    for _ in range(num_repeats):
+        strt = time.perf_counter()
+        fn()
+        lst_times.append(time.perf_counter() - strt)
+    return lst_times
+
+
+def add_result(results, ky, lst_times, num_items=None, unit=None):
+    # throughput in num_items per second of the median time, if the timings are per batch of num_items
+    rslt = {"times": lst_times, "median": float(np.median(lst_times)), "min": float(np.min(lst_times))}
+    msg = f"{ky}: median {1000 * rslt['median']:.1f}ms, min {1000 * rslt['min']:.1f}ms"
+    if num_items is not None:
+        rslt["throughput"] = num_items / rslt["median"]
+        rslt["unit"] = unit
+        msg += f", {rslt['throughput']:.2f} {unit}"
+    results[ky] = rslt
+    print(msg)
+
+
+def bench_models(args, results):
+    from models import pol
+    from models.video_transformer_egovlp import EgoVLPv2
+
+    torch.set_num_threads(args.num_threads)
+    kwargs = {"recog_arc": "egovlp_v2",
+              "vidEncoder_ckptPath": None,
+              "num_frames": args.num_frames,
+              "all_views": ["aria", "1", "2", "3", "4"][:args.num_views],
+              "unfreeze_videoEncoder": True,
+              "linearLayer_dims": [1024],
+              "linearLayer_dropout": 0.,
+              "task_type": "classify_oneHot",}
+    B, V, T = args.batch_size, args.num_views, args.num_frames
+
+    torch.manual_seed(0)
+    frms = torch.rand((B, V, T, 224, 224, 3))
+    for mdl_nm, mdl, inpt in [("EgoVLPv2", EgoVLPv2(ckpt_path=None, num_frames=T, kwargs=kwargs), torch.rand((B * V, T, 3, 224, 224))),
+                              ("videoEncoder", pol.videoEncoder(kwargs), frms),
+                              ("pol_v1", pol.pol_v1(kwargs), torch.rand((B, V * 768))),
+                              ("pol_v1 transformer", pol.pol_v1(dict(kwargs, use_transformerPol=True)), torch.rand((B, V * 768))),]:
+        mdl.eval()
+        def fwd():
+            with torch.no_grad():
+                mdl(inpt)
+        add_result(results, f"models/{mdl_nm} forward", time_fn(fwd, args.num_repeats), B, "datapoints/s")
+
+        mdl.train()
+        def fwdNbwd():
+            mdl.zero_grad()
+            mdl(inpt).float().sum().backward()
+        add_result(results, f"models/{mdl_nm} forward+backward", time_fn(fwdNbwd, args.num_repeats), B, "datapoints/s")
+        del mdl
+
+
+def bench_lemmaImages(args, results):
+    from PIL import Image
+    from datasets.dataset import load_datapointImages_lemma, LemmaImageCache
+
+    width, height = [int(ele) for ele in args.lemmaImage_size.split("x")]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        rng = np.random.default_rng(0)
+        lst_imgSffxs = []
+        for img_idx in range(args.num_frames):
+            # smooth noise, so the JPEGs are about as compressible as camera frames
+            img = rng.integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8)
+            Image.fromarray(img).resize((width, height), Image.BILINEAR).save(f"{tmp_dir}/{img_idx:05d}.jpg", quality=90)
+            lst_imgSffxs.append(f"{img_idx:05d}.jpg")
+
+        for draft_decode in [True, False]:
+            for num_threads in [1, args.lemmaImages_numThreads]:
+                add_result(results,
+                           f"lemma_images/draft_decode={draft_decode} num_threads={num_threads}",
+                           time_fn(lambda: load_datapointImages_lemma(tmp_dir, lst_imgSffxs, args.frame_size, draft_decode=draft_decode,
+                                                                      num_threads=num_threads),
+                                   args.num_repeats),
+                           1, "clips/s")
+
+        # the warmup fills the cache
+        image_cache = LemmaImageCache(f"{tmp_dir}/cache", args.frame_size)
+        add_result(results,
+                   "lemma_images/cached",
+                   time_fn(lambda: load_datapointImages_lemma(tmp_dir, lst_imgSffxs, args.frame_size, image_cache=image_cache,
+                                                              num_threads=args.lemmaImages_numThreads),
+                           args.num_repeats),
+                   1, "clips/s")
+
+
+def bench_videoDecode(args, results):
+    from datasets.dataset import load_datapointVideo_egoExoNarrate
+
+    if args.clips_dir is None:
+        print("video_decode: skipped, needs --clips-dir")
+        return
+    assert os.path.isdir(args.clips_dir), print(args.clips_dir)
+
+    lst_clpPths = []
+    for dr, _, fl_nms in sorted(os.walk(args.clips_dir)):
+        lst_clpPths += [f"{dr}/{fl_nm}" for fl_nm in sorted(fl_nms) if fl_nm.endswith(".mp4")]
+    lst_clpPths = lst_clpPths[:args.max_clips]
+    assert len(lst_clpPths) > 0, print(args.clips_dir)
+
+    for keyframe_aware in [True, False]:
+        def load_clips():
+            for clp_pth in lst_clpPths:
+                load_datapointVideo_egoExoNarrate(clp_pth, n_frms=args.num_frames, height=args.frame_size, width=args.frame_size,
+                                                  keyframe_aware=keyframe_aware)
+        add_result(results, f"video_decode/keyframe_aware={keyframe_aware}", time_fn(load_clips, args.num_repeats),
+                   len(lst_clpPths), "clips/s")
+
+
+def bench_trainDataset(args, results):
+    if args.train_args is None:
+        print("train_dataset: skipped, needs --train-args")
+        return
+    train_args = shlex.split(args.train_args)
+
+    # imported here since the train scripts import tensorboard
+    from datasets.dataset import train_dataset
+    if "--isLemma-dataset" in train_args:
+        from train_lemma import get_parser
+        lst_flagCombos = LEMMA_DATASET_FLAG_COMBOS
+    else:
+        from train import get_parser
+        lst_flagCombos = DATASET_FLAG_COMBOS
+    if args.dataset_flagCombo is not None:
+        lst_flagCombos = [shlex.split(ele) for ele in args.dataset_flagCombo]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for flg_cmb in lst_flagCombos:
+            flg_cmb = [ele.format(tmp_dir=tmp_dir) for ele in flg_cmb]
+            dtst_args = get_parser().parse_args(train_args + flg_cmb)
+            random.seed(0)
+            np.random.seed(0)
+            torch.manual_seed(0)
+            dtst = train_dataset(dtst_args, **vars(dtst_args))
+
+            def get_samples():
+                for idx in range(args.num_samples):
+                    dtpnt = dtst[idx]
+                    if dtst.frames_ring is not None:
+                        # frees the slot, as SharedFramesLoader does
+                        dtst.frames_ring.get(dtpnt[0].reshape(1))
+            add_result(results, f"train_dataset/{' '.join(flg_cmb) if len(flg_cmb) > 0 else 'default'}",
+                       time_fn(get_samples, args.num_repeats), args.num_samples, "samples/s")
+            del dtst
+
+
+def bench_captioningMetrics(args, results):
+    sys.path.insert(0, os.path.join(REPO_ROOT, "scripts/ego_exo4d"))
+    try:
+        import run_captioningMetrics as rcm
+    except ImportError as e:
+        print(f"captioning_metrics: skipped, {e}")
+        return
+
+    rng = random.Random(0)
+    def get_caption():
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12)))
+
+    # per take: refs per segment, and per view a caption per segment
+    lst_tks = []
+    for _ in range(args.num_takes):
+        num_sgmnts = rng.randint(5, 30)
+        rfs = [[get_caption() for _ in range(rng.randint(1, 4))] for _ in range(num_sgmnts)]
+        lst_tks.append((rfs, [[get_caption() for _ in range(num_sgmnts)] for _ in rcm.VIEWS]))
+    num_cptns = sum(len(rfs) * len(lst_vwCptns) for rfs, lst_vwCptns in lst_tks)
+
+    def score_cider():
+        for rfs, lst_vwCptns in lst_tks:
+            cdr_scrr = rcm.CiderD(rfs)
+            for vw_cptns in lst_vwCptns:
+                cdr_scrr.compute_score(vw_cptns)
+    add_result(results, "captioning_metrics/cider", time_fn(score_cider, args.num_repeats), num_cptns, "captions/s")
+
+    mtr_scrr = rcm.MeteorBatched(num_processes=1)
+    def score_meteor():
+        for rfs, lst_vwCptns in lst_tks:
+            for vw_cptns in lst_vwCptns:
+                mtr_scrr.compute_score(rfs, vw_cptns)
+    try:
+        add_result(results, "captioning_metrics/meteor", time_fn(score_meteor, args.num_repeats), num_cptns, "captions/s")
+    except LookupError:
+        print("captioning_metrics/meteor: skipped, nltk data (e.g. wordnet) isn't downloaded")
+
+    num_sgmnts = sum(len(rfs) for rfs, _ in lst_tks)
+    np_rng = np.random.default_rng(0)
+    mtrcs_tbl = {"tbl": np.where(np_rng.random((num_sgmnts, len(rcm.VIEWS), len(rcm.METRICS))) < 0.1, np.nan,
+                                 np_rng.random((num_sgmnts, len(rcm.VIEWS), len(rcm.METRICS)))),
+                 "metrics": np.array(rcm.METRICS),}
+    prd_scrs = np_rng.random((num_sgmnts, len(rcm.VIEWS)))
+    add_result(results, "captioning_metrics/score_metricsTable", time_fn(lambda: rcm.score_metricsTable(mtrcs_tbl, prd_scrs), args.num_repeats),
+               num_sgmnts, "segments/s")
+
+    if args.metricsTable_filePath is not None:
+        # the evaluation of a checkpoint by run_evaluation.py w/ a prebuilt per-view metrics table
+        assert os.path.isfile(args.metricsTable_filePath), print(args.metricsTable_filePath)
+        assert (args.results_filePath is not None) and (args.testDatapoints_filePath is not None)
+        def evaluate():
+            mtrcs_tbl = rcm.load_metricsTable(args.metricsTable_filePath)
+            tkNm2strtNendTmstmp2bstPrdScrPrVw = rcm.format_predictedViewScores(rcm.pkl_ld(args.testDatapoints_filePath),
+                                                                               rcm.json_ld(args.results_filePath))
+            rcm.score_metricsTable(mtrcs_tbl, rcm.get_metricsTable_viewScores(mtrcs_tbl, tkNm2strtNendTmstmp2bstPrdScrPrVw))
+        add_result(results, "captioning_metrics/evaluate w/ metrics table", time_fn(evaluate, args.num_repeats))
+
+
+def get_meta(args):
+    def git(*cmd):
+        out = subprocess.run(["git"] + list(cmd), cwd=REPO_ROOT, capture_output=True, text=True)
+        return out.stdout.strip() if (out.returncode == 0) else None
+
+    return {"git_commit": git("rev-parse", "HEAD"),
+            "git_dirty": (git("status", "--porcelain", "--untracked-files=no") or "") != "",
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "torch": torch.__version__,
+            "num_threads": args.num_threads,
+            "args": vars(args),}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of the data and model pipeline on synthetic or small local data, "+\
+                                                 "dumped to json to track regressions across commits")
+    parser.add_argument("--suites", type=str, default=",".join(SUITES),
+                        help=f"Comma-separated suites from {SUITES}")
+    parser.add_argument("--num-repeats", type=int, default=3)
+    parser.add_argument("--num-threads", type=int, default=torch.get_num_threads(), help="torch threads of the models suite")
+
+    parser.add_argument("--batch-size", type=int, default=2)
+    parser.add_argument("--num-views", type=int, default=5)
+    parser.add_argument("--num-frames", type=int, default=8)
+    parser.add_argument("--frame-size", type=int, default=224)
+
+    parser.add_argument("--lemmaImage-size", type=str, default="1920x1080", help="WxH of the synthetic LEMMA JPEGs")
+    parser.add_argument("--lemmaImages-numThreads", type=int, default=4)
+
+    parser.add_argument("--clips-dir", type=str, default=None,
+                        help="Dir w/ datapoint clips for the video_decode suite, searched recursively")
+    parser.add_argument("--max-clips", type=int, default=20)
+
+    parser.add_argument("--train-args", type=str, default=None,
+                        help="Flags of train.py (or train_lemma.py w/ --isLemma-dataset) for the train_dataset suite, "+\
+                             "e.g. pointing at a small local copy of the datapoints and clips")
+    parser.add_argument("--dataset-flagCombo", type=str, action="append", default=None,
+                        help="Flags added to --train-args, one train_dataset timing per use of this flag "+\
+                             "(default: DATASET_FLAG_COMBOS / LEMMA_DATASET_FLAG_COMBOS)")
+    parser.add_argument("--num-samples", type=int, default=8, help="__getitem__ calls per timing")
+
+    parser.add_argument("--num-takes", type=int, default=50, help="Synthetic takes of the captioning_metrics suite")
+    parser.add_argument("--metricsTable-filePath", type=str, default=None,
+                        help="Optional metrics table of run_evaluation.py, to also time the evaluation of --results-filePath")
+    parser.add_argument("--results-filePath", type=str, default=None)
+    parser.add_argument("--testDatapoints-filePath", type=str, default=None)
+
+    parser.add_argument("--dump-path", type=str, default=None, help="Optional json dump of the timings")
+    parser.add_argument("--compare-path", type=str, default=None, help="Optional json dump of an earlier run to compare against")
+    args = parser.parse_args()
+
+    suites = args.suites.split(",")
+    # the policy has batch norms
+    assert args.batch_size > 1, print(args.batch_size)
+    for suite in suites:
+        assert suite in SUITES, print(suite, SUITES)
+
+    results = {}
+    for suite, bench_fn in [("models", bench_models),
+                            ("lemma_images", bench_lemmaImages),
+                            ("video_decode", bench_videoDecode),
+                            ("train_dataset", bench_trainDataset),
+                            ("captioning_metrics", bench_captioningMetrics),]:
+        if suite in suites:
+            bench_fn(args, results)
+
+    if args.compare_path is not None:
+        with open(args.compare_path, "r") as fi:
+            old_results = json.load(fi)["results"]
+        print(f"vs. {args.compare_path} (>1 is slower now):")
+        for ky, rslt in results.items():
+            if ky in old_results:
+                print(f"{ky}: {rslt['median'] / old_results[ky]['median']:.2f}x")
+
+    if args.dump_path is not None:
+        dump_dr = os.path.dirname(os.path.abspath(args.dump_path))
+        if not os.path.isdir(dump_dr):
+            os.makedirs(dump_dr)
+        with open(args.dump_path, "w") as fo:
+            json.dump({"meta": get_meta(args), "results": results}, fo, indent=4)
+
+
+if __name__ == "__main__":
+    main()
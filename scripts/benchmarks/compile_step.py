@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import json
+import argparse
+import numpy as np
+
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+sys.path.insert(0, REPO_ROOT)
+
+import torch
+import torch.nn.functional as F
+
+from models import pol
+from common.utils import compile_module
+
+
+def get_kwargs(args):
+    # the flags of train.py that the video encoder and the policy read, w/ a randomly initialized encoder
+    return {"recog_arc": "egovlp_v2",
+            "vidEncoder_ckptPath": None,
+            "num_frames": args.num_frames,
+            "all_views": ["aria", "1", "2", "3", "4"][:args.num_views],
+            "unfreeze_videoEncoder": True,
+            "use_transformerPol": args.use_transformerPol,
+            "linearLayer_dims": [1024],
+            "linearLayer_dropout": 0.,
+            "task_type": "classify_oneHot",}
+
+
+def time_trainSteps(args, device, compile_models):
+    torch.manual_seed(0)
+    kwargs = get_kwargs(args)
+    vid_encoder = pol.videoEncoder(kwargs).to(device)
+    model = pol.pol_v1(kwargs).to(device)
+    if compile_models:
+        compile_module(vid_encoder, mode=args.compile_mode)
+        compile_module(model, mode=args.compile_mode)
+    optimizer = torch.optim.AdamW(list(vid_encoder.parameters()) + list(model.parameters()), lr=1e-5)
+
+    frames = torch.rand((args.batch_size, args.num_views, args.num_frames, args.frame_size, args.frame_size, 3), device=device)
+    label = torch.randint(args.num_views, (args.batch_size,), device=device)
+
+    lst_times = []
+    for step_idx in range(args.num_warmupSteps + args.num_steps):
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        strt = time.perf_counter()
+        loss = F.cross_entropy(model(vid_encoder(frames)), label)
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        lst_times.append(time.perf_counter() - strt)
+
+    # the first warmup step includes the compilation
+    return {"first_step": lst_times[0], "steps": lst_times[args.num_warmupSteps:]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train step time of the video encoder + policy, eager vs. torch.compile")
+    parser.add_argument("--batch-size", type=int, default=2)
+    parser.add_argument("--num-views", type=int, default=5)
+    parser.add_argument("--num-frames", type=int, default=8)
+    parser.add_argument("--frame-size", type=int, default=224)
+    parser.add_argument("--use-transformerPol", action="store_true")
+    parser.add_argument("--num-warmupSteps", type=int, default=3)
+    parser.add_argument("--num-steps", type=int, default=10)
+    parser.add_argument("--compile-mode", type=str, default=None)
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--dump-path", type=str, default=None, help="Optional json dump of the timings")
+    args = parser.parse_args()
+
+    # the policy has batch norms
+    assert args.batch_size > 1, print(args.batch_size)
+    device = torch.device(args.device)
+
+    results = {}
+    for compile_models in [False, True]:
+        ky = "compiled" if compile_models else "eager"
+        results[ky] = time_trainSteps(args, device, compile_models)
+        print(f"{ky}: first step {results[ky]['first_step']:.2f}s, median step {np.median(results[ky]['steps']):.3f}s, "+\
+              f"min step {np.min(results[ky]['steps']):.3f}s")
+    print(f"speedup: {np.median(results['eager']['steps']) / np.median(results['compiled']['steps']):.2f}x")
+
+    if args.dump_path is not None:
+        with open(args.dump_path, "w") as fo:
+            json.dump(results, fo, indent=4)
+
+
+if __name__ == "__main__":
+    main()
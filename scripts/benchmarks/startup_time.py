@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import json
+import argparse
+import subprocess
+import numpy as np
+
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+
+MODULES = [
+    "common.dist_utils",
+    "datasets.dataset",
+    "models.pol",
+    "trainer",
+]
+
+IMPORT_SNIPPET = "import time; strt = time.perf_counter(); import {module}; print(time.perf_counter() - strt)"
+
+CKPTLOAD_SNIPPET = "import time, torch; strt = time.perf_counter(); "+\
+                   "ckpt = torch.load('{ckpt_path}', map_location='cpu', mmap={mmap}); "+\
+                   "print(time.perf_counter() - strt)"
+
+
+def time_inFreshInterpreter(snippet, num_repeats):
+    lst_times = []
+    for _ in range(num_repeats):
+        out = subprocess.run([sys.executable, "-c", snippet],
+                             cwd=REPO_ROOT,
+                             capture_output=True,
+                             text=True)
+        if out.returncode != 0:
+            print(out.stderr.strip().split("\n")[-1])
+            return None
+        lst_times.append(float(out.stdout.strip().split("\n")[-1]))
+    return lst_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time of the train / test entry points")
+    parser.add_argument("--num-repeats", type=int, default=5)
+    parser.add_argument("--ckpt-path", type=str, default=None,
+                        help="Optional checkpoint (e.g. pretrained_checkpoints/egovlpV2_model_best_egoExo30nov2024.pth) to time w/ and w/o mmap")
+    parser.add_argument("--dump-path", type=str, default=None, help="Optional json dump of the timings")
+    args = parser.parse_args()
+
+    results = {}
+    for module in MODULES:
+        lst_times = time_inFreshInterpreter(IMPORT_SNIPPET.format(module=module), args.num_repeats)
+        if lst_times is None:
+            print(f"import {module}: failed")
+            continue
+        results[f"import {module}"] = lst_times
+        print(f"import {module}: median {np.median(lst_times):.3f}s, min {np.min(lst_times):.3f}s")
+
+    if args.ckpt_path is not None:
+        assert os.path.isfile(args.ckpt_path), print(args.ckpt_path)
+        ckpt_path = os.path.abspath(args.ckpt_path)
+        for mmap in [False, True]:
+            lst_times = time_inFreshInterpreter(CKPTLOAD_SNIPPET.format(ckpt_path=ckpt_path, mmap=mmap), args.num_repeats)
+            if lst_times is None:
+                print(f"torch.load mmap={mmap}: failed")
+                continue
+            results[f"torch.load mmap={mmap}"] = lst_times
+            print(f"torch.load mmap={mmap}: median {np.median(lst_times):.3f}s, min {np.min(lst_times):.3f}s")
+
+    if args.dump_path is not None:
+        with open(args.dump_path, "w") as fo:
+            json.dump(results, fo, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import json
+import argparse
+import numpy as np
+
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+sys.path.insert(0, REPO_ROOT)
+
+from datasets.dataset import load_datapointVideo_egoExoNarrate, get_videoDecodeCosts
+
+
+# clip lengths (in frames) of the bins the timings are reported for
+LENGTH_BINS = [0, 16, 32, 64, 128, 256, 512]
+
+
+def get_uniformIndices(vlen, n_frms):
+    # get_batch on the padded uniform indices, as the datasets did before decode_videoFrames
+    indices = np.arange(0, vlen, vlen / min(n_frms, vlen)).astype(int).tolist()
+    return indices + ([indices[-1]] * (n_frms - len(indices)))
+
+
+def time_getBatch(video_path, n_frms, size):
+    import decord
+    from decord import VideoReader
+
+    decord.bridge.set_bridge("torch")
+
+    strt = time.perf_counter()
+    vrs = VideoReader(uri=video_path, height=size, width=size, num_threads=1)
+    vrs.get_batch(get_uniformIndices(len(vrs), n_frms))
+    return time.perf_counter() - strt
+
+
+def time_decodeVideoFrames(video_path, n_frms, size, keyframe_aware):
+    strt = time.perf_counter()
+    load_datapointVideo_egoExoNarrate(video_path, n_frms=n_frms, height=size, width=size, keyframe_aware=keyframe_aware)
+    return time.perf_counter() - strt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode time of the datapoint clips w/ get_batch vs. keyframe-aware decoding")
+    parser.add_argument("--clips-dir", type=str, required=True,
+                        help="Dir w/ the datapoint clips (e.g. --datapoint-videoClips-dir of train.py), searched recursively")
+    parser.add_argument("--num-frames", type=int, default=8)
+    parser.add_argument("--frame-size", type=int, default=224)
+    parser.add_argument("--max-clipsPerBin", type=int, default=20)
+    parser.add_argument("--num-repeats", type=int, default=3)
+    parser.add_argument("--dump-path", type=str, default=None, help="Optional json dump of the timings")
+    args = parser.parse_args()
+
+    from decord import VideoReader
+
+    assert os.path.isdir(args.clips_dir), print(args.clips_dir)
+
+    bn_2_clps = {}
+    for dr, _, fl_nms in sorted(os.walk(args.clips_dir)):
+        for fl_nm in sorted(fl_nms):
+            if not fl_nm.endswith(".mp4"):
+                continue
+            clp_pth = f"{dr}/{fl_nm}"
+            try:
+                vrs = VideoReader(uri=clp_pth, num_threads=1)
+            except:
+                continue
+            bn = int(np.searchsorted(LENGTH_BINS, len(vrs), side="right")) - 1
+            if len(bn_2_clps.get(bn, [])) < args.max_clipsPerBin:
+                bn_2_clps.setdefault(bn, []).append((clp_pth, len(vrs), sorted(vrs.get_key_indices())))
+            del vrs
+
+    results = {}
+    for bn in sorted(bn_2_clps):
+        bn_nm = f"{LENGTH_BINS[bn]}-{LENGTH_BINS[bn + 1]}" if (bn + 1 < len(LENGTH_BINS)) else f"{LENGTH_BINS[bn]}+"
+        bn_rslts = {"num_clips": len(bn_2_clps[bn]), "get_batch": [], "seek": [], "keyframe_aware": [], "sequential_fraction": 0.}
+        for clp_pth, vlen, key_idxs in bn_2_clps[bn]:
+            unq_idxs = sorted(set(get_uniformIndices(vlen, args.num_frames)))
+            if (len(unq_idxs) > 1) and (len(key_idxs) > 0) and (key_idxs[0] <= unq_idxs[0]):
+                seek_cst, seq_cst = get_videoDecodeCosts(unq_idxs, key_idxs)
+                bn_rslts["sequential_fraction"] += float(seq_cst < seek_cst) / len(bn_2_clps[bn])
+            for _ in range(args.num_repeats):
+                bn_rslts["get_batch"].append(time_getBatch(clp_pth, args.num_frames, args.frame_size))
+                bn_rslts["seek"].append(time_decodeVideoFrames(clp_pth, args.num_frames, args.frame_size, False))
+                bn_rslts["keyframe_aware"].append(time_decodeVideoFrames(clp_pth, args.num_frames, args.frame_size, True))
+        results[bn_nm] = bn_rslts
+
+        print(f"{bn_nm} frames ({bn_rslts['num_clips']} clips, {100 * bn_rslts['sequential_fraction']:.0f}% decoded sequentially): "+\
+              ", ".join([f"{ky} median {1000 * np.median(bn_rslts[ky]):.1f}ms" for ky in ["get_batch", "seek", "keyframe_aware"]])+\
+              f", speedup {np.median(bn_rslts['get_batch']) / np.median(bn_rslts['keyframe_aware']):.2f}x")
+
+    if args.dump_path is not None:
+        with open(args.dump_path, "w") as fo:
+            json.dump(results, fo, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,9 @@ from __future__ import division
 from __future__ import print_function
 import pdb
 
-import subprocess
-import threading
-import multiprocessing
 
 import sys, math, re
+import functools
 import copy
 from collections import defaultdict
 import math
@@ -17,6 +15,7 @@ from six.moves import cPickle
 import json
 import os
 import pickle
+import hashlib
 from tqdm import tqdm
 import numpy as np
 import pandas as pd
@@ -37,7 +36,9 @@ import collections
 from ast import literal_eval
 from spacy.symbols import NOUN, VERB
 
-import evaluate
+from nltk import word_tokenize
+from nltk.translate import meteor_score
+from concurrent.futures import ProcessPoolExecutor
 
 
 def ospif(file):
@@ -375,6 +376,57 @@ def extract_vo_from_sent(sent, compound_whitelist, noun_sense_dict, verb_sense_d
     return vo_tuples, {'verb_missing': len(verbs)==0}
 
 
+def get_textForParsing(narration_text):
+    narration_text = narration_text.lower()
+    narration_text = narration_text.replace('\n', '')
+
+    # only texts w/ more than 4 (nltk) tokens get verbs / nouns / noun chunks
+    return narration_text, len(nltk.word_tokenize(narration_text)) > 4
+
+
+def get_verbNnounSets_fromDoc(doc, 
+                              all_stopwords, 
+                              dct_nn2lbl=None, 
+                              dct_vrb2lbl=None):
+    unq_vrbs = set() 
+    unq_nns = set()
+    unq_nnChnks = set()
+
+    for word in doc:
+        if (word.pos_ == 'VERB'):
+            word_lemma = word.lemma_
+            if dct_vrb2lbl:
+                if word_lemma in dct_vrb2lbl:
+                    unq_vrbs.add(list(dct_vrb2lbl[word_lemma])[0])
+                else:
+                    unq_vrbs.add(word_lemma)
+            else:
+                unq_vrbs.add(word_lemma)
+        
+        if (word.pos_ == 'NOUN'):
+            word_lemma = word.lemma_
+            if dct_nn2lbl:
+                if word_lemma in dct_nn2lbl:
+                    unq_nns.add(list(dct_nn2lbl[word_lemma])[0])
+                else:
+                    unq_nns.add(word_lemma)
+            else:
+                unq_nns.add(word_lemma)
+    
+    for word in doc.noun_chunks:
+        word_lemma = word.lemma_
+        word_lemma = ' '.join([w for w in word_lemma.split() if w not in all_stopwords])
+        if dct_nn2lbl: 
+            if word_lemma in dct_nn2lbl:
+                unq_nnChnks.add(list(dct_nn2lbl[word_lemma])[0])
+            else:
+                unq_nnChnks.add(word_lemma)
+        else:
+            unq_nnChnks.add(word_lemma)
+
+    return unq_vrbs, unq_nns, unq_nnChnks
+
+
 def extract_verbNnoun_v1(narration_text,
                          nlp, 
                          all_stopwords, 
@@ -387,54 +439,17 @@ def extract_verbNnoun_v1(narration_text,
     assert dct_vrb2lbl
 
     clean_narration_text = clean(narration_text)
-    narration_text = narration_text.lower()
-    narration_text = narration_text.replace('\n', '')
-    
-    text = nltk.word_tokenize(narration_text)
-    tags = nltk.pos_tag(text)
-    del text
+    narration_text, is_parsed = get_textForParsing(narration_text)
     
     unq_vrbs = set() 
     unq_nns = set()
     unq_nnChnks = set()
-    if len(tags) > 4:
-        text = nlp(narration_text)
-        noun_list = list(text.noun_chunks)
-        
-        noun_vec = []
-        verb_vec = []
-    
-        for word in text:
-            if (word.pos_ == 'VERB'):
-                word_lemma = word.lemma_
-                if dct_vrb2lbl:
-                    if word_lemma in dct_vrb2lbl:
-                        unq_vrbs.add(list(dct_vrb2lbl[word_lemma])[0])
-                    else:
-                        unq_vrbs.add(word_lemma)
-                else:
-                    unq_vrbs.add(word_lemma)
-            
-            if (word.pos_ == 'NOUN'):
-                word_lemma = word.lemma_
-                if dct_nn2lbl:
-                    if word_lemma in dct_nn2lbl:
-                        unq_nns.add(list(dct_nn2lbl[word_lemma])[0])
-                    else:
-                        unq_nns.add(word_lemma)
-                else:
-                    unq_nns.add(word_lemma)
-        
-        for word in noun_list:
-            word_lemma = word.lemma_
-            word_lemma = ' '.join([w for w in word_lemma.split() if w not in all_stopwords])
-            if dct_nn2lbl: 
-                if word_lemma in dct_nn2lbl:
-                    unq_nnChnks.add(list(dct_nn2lbl[word_lemma])[0])
-                else:
-                    unq_nnChnks.add(word_lemma)
-            else:
-                unq_nnChnks.add(word_lemma)
+    if is_parsed:
+        unq_vrbs, unq_nns, unq_nnChnks =\
+            get_verbNnounSets_fromDoc(nlp(narration_text),
+                                      all_stopwords,
+                                      dct_nn2lbl=dct_nn2lbl,
+                                      dct_vrb2lbl=dct_vrb2lbl)
     
     text = nlp(clean_narration_text)
     if len(text) > 0:
@@ -477,6 +492,128 @@ def extract_verbNnoun_v1(narration_text,
     return unq_vrbs, unq_nns, unq_nnChnks, vo_vrb, vo_nn, vo_vn
 
 
+# ----------------------- PARSE CACHE ------------------------
+def get_textKey(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def get_fileHash(fp):
+    hasher = hashlib.sha1()
+    with open(fp, "rb") as fi:
+        for chunk in iter(lambda: fi.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def get_parseCache_configKey(spacy_lang_mod, dependency_fps):
+    # everything other than the text that the extracted verb / noun / noun chunk sets depend on. The model version is 
+    # read from the installed package, so the key can be made w/o loading the model
+    config = [spacy_lang_mod, spacy.__version__, spacy.util.get_package_version(spacy_lang_mod) or "", nltk.__version__] +\
+                [get_fileHash(fp) for fp in dependency_fps]
+    return get_textKey(json.dumps(config))[:16]
+
+
+class ParseCache(object):
+    """
+    Persistent text -> (unq_vrbs, unq_nns, unq_nnChnks) cache. Entries are keyed by the sha1 of the text and the cache 
+    file by the config key, so parses made w/ another spaCy model / version or other label dicts are never reused.
+    Also holds the per-view metrics of takes (keyed by the take's texts) w/ another fl_nm_prefix.
+    """
+    def __init__(self, cache_dr, config_key, fl_nm_prefix="spacyParses"):
+        if not ospid(cache_dr):
+            os.makedirs(cache_dr)
+        self.fp = f"{cache_dr}/{fl_nm_prefix}_{config_key}.pkl"
+        self.dct = pkl_ld(self.fp) if ospif(self.fp) else {}
+        self.new_dct = {}
+        self.num_new = 0
+
+    def __contains__(self, text):
+        return get_textKey(text) in self.dct
+
+    def __len__(self):
+        return len(self.dct)
+
+    def get(self, text):
+        return self.dct[get_textKey(text)]
+
+    def put(self, text, vrbsNnnsNnnChnks):
+        self.dct[get_textKey(text)] = vrbsNnnsNnnChnks
+        self.new_dct[get_textKey(text)] = vrbsNnnsNnnChnks
+        self.num_new += 1
+
+    def pop_new(self):
+        # entries put since the last call, for sending the parses of a worker process back to the main process
+        new_dct = self.new_dct
+        self.new_dct = {}
+        return new_dct
+
+    def update(self, new_dct):
+        self.dct.update(new_dct)
+        self.num_new += len(new_dct)
+
+    def dump(self):
+        if self.num_new == 0:
+            return
+        tmp_fp = f"{self.fp}.tmp_{os.getpid()}"
+        pkl_dmp(self.dct, tmp_fp)
+        os.replace(tmp_fp, self.fp)
+        self.num_new = 0
+
+
+def extract_verbNnounSets_cached(narration_text,
+                                 parse_cache,
+                                 nlp,
+                                 all_stopwords,
+                                 **kwargs):
+    if narration_text not in parse_cache:
+        unq_vrbs, unq_nns, unq_nnChnks, _, _, _ =\
+            extract_verbNnoun_v1(narration_text,
+                                 nlp,
+                                 all_stopwords,
+                                 **kwargs)
+        parse_cache.put(narration_text, (unq_vrbs, unq_nns, unq_nnChnks))
+    return parse_cache.get(narration_text)
+
+
+def parse_verbNnounSets_batched(narration_texts,
+                                parse_cache,
+                                nlp,
+                                all_stopwords,
+                                dct_nn2lbl=None,
+                                dct_vrb2lbl=None,
+                                batch_size=256,
+                                n_process=1):
+    """
+    Fills parse_cache for all of narration_texts that it doesn't hold yet: unique texts are collected first and then 
+    parsed in batches w/ nlp.pipe. Only the sets used for the IoU metrics are extracted, so the second (verb-object) 
+    parse of extract_verbNnoun_v1 is skipped.
+    """
+    lst_txtsToParse = []
+    lst_lwrTxtsToParse = []
+    for narration_text in dict.fromkeys(narration_texts):
+        if narration_text in parse_cache:
+            continue
+        lwr_txt, is_parsed = get_textForParsing(narration_text)
+        if is_parsed:
+            lst_txtsToParse.append(narration_text)
+            lst_lwrTxtsToParse.append(lwr_txt)
+        else:
+            parse_cache.put(narration_text, (set(), set(), set()))
+
+    if len(lst_txtsToParse) == 0:
+        return
+
+    # named entities aren't used by the verb / noun / noun chunk sets
+    disable = [pipe_nm for pipe_nm in ["ner"] if pipe_nm in nlp.pipe_names]
+    docs = nlp.pipe(lst_lwrTxtsToParse, batch_size=batch_size, n_process=n_process, disable=disable)
+    for narration_text, doc in tqdm(zip(lst_txtsToParse, docs), total=len(lst_txtsToParse), desc="parsing"):
+        parse_cache.put(narration_text,
+                        get_verbNnounSets_fromDoc(doc,
+                                                  all_stopwords,
+                                                  dct_nn2lbl=dct_nn2lbl,
+                                                  dct_vrb2lbl=dct_vrb2lbl))
+
+
 # ----------------------- BLEU ------------------------
 def precook(s, n=4, out=False):
     """Takes a string as input and returns an object that can be given to
@@ -1018,123 +1155,202 @@ class Cider:
         return "CIDEr"
 
 
+class CiderD(object):
+    """
+    Vectorized CIDEr-D over a fixed set of references (a list of lists of ref sentences, one list per segment).
+    N-grams are interned into integer ids and the document frequencies are computed once at construction, so the refs 
+    can be scored against any number of hypothesis sets (e.g. the captions of every view) w/o recomputing them.
+    compute_score(hyps) returns the same per-segment scores as Cider().compute_score(gts, res) w/ the same refs: the 
+    operations are applied in the same order as in CiderScorer, so the results match to the last bit.
+    """
+    def __init__(self, refs, n=4, sigma=6.0):
+        self.n = n
+        self.sigma = sigma
+
+        self.ngram2id = {}
+        self.lst_ngramOrders = []
+
+        assert len(refs) > 0
+        self.num_segments = len(refs)
+        self.num_refsPrSgmnt = np.array([len(sgmnt_refs) for sgmnt_refs in refs], dtype=np.int64)
+        assert np.all(self.num_refsPrSgmnt > 0)
+        self.refIdx2sgmntIdx = np.repeat(np.arange(self.num_segments), self.num_refsPrSgmnt)
+        self.num_refs = len(self.refIdx2sgmntIdx)
+
+        lst_refIdxs, lst_ngramIds, lst_cnts = [], [], []
+        self.ref_lens = np.zeros(self.num_refs)
+        ref_idx = 0
+        for sgmnt_refs in refs:
+            for ref in sgmnt_refs:
+                cnts = cider_precook(ref, self.n)
+                for ngram, cnt in cnts.items():
+                    lst_refIdxs.append(ref_idx)
+                    lst_ngramIds.append(self.get_ngramId(ngram))
+                    lst_cnts.append(cnt)
+                    if len(ngram) == 2:
+                        self.ref_lens[ref_idx] += cnt
+                ref_idx += 1
+        ref_refIdxs = np.array(lst_refIdxs, dtype=np.int64)
+        ref_ngramIds = np.array(lst_ngramIds, dtype=np.int64)
+        ref_cnts = np.array(lst_cnts, dtype=np.float64)
+
+        # number of segments whose refs contain an n-gram
+        sgmntNngram_keys = np.unique(self.refIdx2sgmntIdx[ref_refIdxs] * len(self.ngram2id) + ref_ngramIds)
+        self.document_frequency = np.bincount(sgmntNngram_keys % len(self.ngram2id), minlength=len(self.ngram2id)).astype(np.float64)
+        self.ref_len = np.log(float(self.num_segments))
+
+        ref_vals = ref_cnts * self.get_idfs(ref_ngramIds)
+        ref_ordrs = np.array(self.lst_ngramOrders, dtype=np.int64)[ref_ngramIds]
+        self.ref_norms = np.sqrt(np.bincount(ref_refIdxs * self.n + ref_ordrs, 
+                                             weights=self.get_squares(ref_vals), 
+                                             minlength=self.num_refs * self.n)).reshape((self.num_refs, self.n))
+
+        # sorted (ref idx, n-gram id) keys for looking up the ref tf-idf of hypothesis n-grams
+        self.max_numNgrams = len(self.ngram2id)
+        ref_keys = ref_refIdxs * self.max_numNgrams + ref_ngramIds
+        srt_idxs = np.argsort(ref_keys, kind="stable")
+        self.ref_keys = ref_keys[srt_idxs]
+        self.ref_vals = ref_vals[srt_idxs]
+
+    def get_ngramId(self, ngram):
+        if ngram not in self.ngram2id:
+            self.ngram2id[ngram] = len(self.ngram2id)
+            self.lst_ngramOrders.append(len(ngram) - 1)
+        return self.ngram2id[ngram]
+
+    def get_idfs(self, ngram_ids):
+        # hypothesis-only n-grams have a document frequency of 0
+        dfs = np.zeros(len(ngram_ids))
+        in_refs = ngram_ids < len(self.document_frequency)
+        dfs[in_refs] = self.document_frequency[ngram_ids[in_refs]]
+        idfs = np.zeros(len(ngram_ids))
+        for df in np.unique(dfs):
+            # scalar log, as in CiderScorer
+            idfs[dfs == df] = self.ref_len - np.log(max(1.0, float(df)))
+        return idfs
+
+    @staticmethod
+    def get_squares(vals):
+        # python pow, as in CiderScorer, which doesn't always round like x * x
+        return np.array([pow(val, 2) for val in vals.tolist()], dtype=np.float64)
+
+    def compute_score(self, hyps):
+        """
+        :param hyps: list of str : one hypothesis per segment, in the order of the refs
+        :return: mean score (float), per-segment scores (np.array)
+        """
+        assert len(hyps) == self.num_segments, print(len(hyps), self.num_segments)
+
+        lst_sgmntIdxs, lst_ngramIds, lst_cnts = [], [], []
+        hyp_lens = np.zeros(self.num_segments)
+        for sgmnt_idx, hyp in enumerate(hyps):
+            cnts = cider_precook(hyp, self.n)
+            for ngram, cnt in cnts.items():
+                lst_sgmntIdxs.append(sgmnt_idx)
+                # n-grams not seen in the refs are marked by -(order + 1)
+                lst_ngramIds.append(self.ngram2id.get(ngram, -len(ngram)))
+                lst_cnts.append(cnt)
+                if len(ngram) == 2:
+                    hyp_lens[sgmnt_idx] += cnt
+        hyp_sgmntIdxs = np.array(lst_sgmntIdxs, dtype=np.int64)
+        hyp_ngramIds = np.array(lst_ngramIds, dtype=np.int64)
+        hyp_cnts = np.array(lst_cnts, dtype=np.float64)
+
+        # unseen n-grams only count towards the hypothesis norms
+        is_unseen = hyp_ngramIds < 0
+        hyp_ordrs = np.zeros(len(hyp_ngramIds), dtype=np.int64)
+        hyp_ordrs[~is_unseen] = np.array(self.lst_ngramOrders, dtype=np.int64)[hyp_ngramIds[~is_unseen]]
+        hyp_ordrs[is_unseen] = -hyp_ngramIds[is_unseen] - 1
+        hyp_vals = hyp_cnts * self.get_idfs(np.where(is_unseen, self.max_numNgrams, hyp_ngramIds))
+        hyp_norms = np.sqrt(np.bincount(hyp_sgmntIdxs * self.n + hyp_ordrs,
+                                        weights=self.get_squares(hyp_vals),
+                                        minlength=self.num_segments * self.n)).reshape((self.num_segments, self.n))
+
+        # pair every seen hypothesis n-gram w/ every ref of its segment
+        hyp_seen = np.where(~is_unseen)[0]
+        sgmnt_refStrtIdxs = np.concatenate([[0], np.cumsum(self.num_refsPrSgmnt)[:-1]])
+        num_pairs = self.num_refsPrSgmnt[hyp_sgmntIdxs[hyp_seen]]
+        pair_hypIdxs = np.repeat(hyp_seen, num_pairs)
+        pair_refIdxs = np.repeat(sgmnt_refStrtIdxs[hyp_sgmntIdxs[hyp_seen]], num_pairs) +\
+                        (np.arange(len(pair_hypIdxs)) - np.repeat(np.cumsum(num_pairs) - num_pairs, num_pairs))
+
+        pair_keys = pair_refIdxs * self.max_numNgrams + hyp_ngramIds[pair_hypIdxs]
+        lkp_idxs = np.minimum(np.searchsorted(self.ref_keys, pair_keys), max(len(self.ref_keys) - 1, 0))
+        pair_refVals = np.where(self.ref_keys[lkp_idxs] == pair_keys, self.ref_vals[lkp_idxs], 0.)
+        pair_hypVals = hyp_vals[pair_hypIdxs]
+
+        # clipped dot products per (ref, n-gram order)
+        val = np.bincount(pair_refIdxs * self.n + hyp_ordrs[pair_hypIdxs],
+                          weights=np.minimum(pair_hypVals, pair_refVals) * pair_refVals,
+                          minlength=self.num_refs * self.n).astype(np.float64).reshape((self.num_refs, self.n))
+
+        hyp_normsPrRef = hyp_norms[self.refIdx2sgmntIdx]
+        is_nonZero = (hyp_normsPrRef != 0) & (self.ref_norms != 0)
+        val[is_nonZero] /= (hyp_normsPrRef[is_nonZero] * self.ref_norms[is_nonZero])
+
+        # length based gaussian penalty
+        deltas = hyp_lens[self.refIdx2sgmntIdx] - self.ref_lens
+        penalties = np.zeros(self.num_refs)
+        for delta in np.unique(deltas):
+            penalties[deltas == delta] = np.e**(-(float(delta)**2)/(2*self.sigma**2))
+        val *= penalties[:, None]
+
+        score = np.zeros((self.num_segments, self.n))
+        np.add.at(score, self.refIdx2sgmntIdx, val)
+        scores = np.mean(score, axis=1) / self.num_refsPrSgmnt
+
+        return np.mean(scores), scores
+
+    def method(self):
+        return "CIDEr-D"
+
+
 # ----------------------- METEOR ------------------------
-# Assumes meteor-1.5.jar is in the same directory as meteor.py.  Change as needed.
-METEOR_JAR = '../data/meteor-1.5.jar'
-# FILE = "./run_captioningMetrics.py"
-
-class Meteor:
-  def __init__(self):
-    self.meteor_cmd = ['java', '-jar', '-Xmx2G', METEOR_JAR, \
-        '-', '-', '-stdio', '-l', 'en', '-norm']
-    
-    self.meteor_p = subprocess.Popen(self.meteor_cmd, \
-        cwd="./",    # os.path.dirname(os.path.abspath(FILE)), \
-        stdin=subprocess.PIPE, \
-        stdout=subprocess.PIPE, \
-        stderr=subprocess.PIPE)
-    # Used to guarantee thread safety
-    self.lock = threading.Lock()
-
-  def compute_score(self, gts, res, vid_order=None):
-    # assert(gts.keys() == res.keys())
-    if vid_order is None:
-      vid_order = gts.keys()
-    scores = []
-
-    eval_line = 'EVAL'
-    self.lock.acquire()
-    for i in vid_order:
-      assert(len(res[i]) == 1)
-      stat = self._stat(res[i][0], gts[i])
-      eval_line += ' ||| {}'.format(stat)
-
-    self.meteor_p.stdin.write('{}\n'.format(eval_line).encode())
-    self.meteor_p.stdin.flush()
-    for i in range(0,len(vid_order)):
-      scores.append(float(self.meteor_p.stdout.readline().strip()))
-    score = float(self.meteor_p.stdout.readline().strip())
-    self.lock.release()
-
-    return score, scores
-
-  def method(self):
-    return "METEOR"
-
-  def _stat(self, hypothesis_str, reference_list):
-    # SCORE ||| reference 1 words ||| reference n words ||| hypothesis words
-    hypothesis_str = hypothesis_str.replace('|||','').replace('  ',' ')
-    score_line = ' ||| '.join(('SCORE', ' ||| '.join(reference_list), hypothesis_str))
-    self.meteor_p.stdin.write('{}\n'.format(score_line).encode())
-    self.meteor_p.stdin.flush()
-    return self.meteor_p.stdout.readline().decode().strip()
-
-  def _score(self, hypothesis_str, reference_list):
-    self.lock.acquire()
-    # SCORE ||| reference 1 words ||| reference n words ||| hypothesis words
-    hypothesis_str = hypothesis_str.replace('|||','').replace('  ',' ')
-    score_line = ' ||| '.join(('SCORE', ' ||| '.join(reference_list), hypothesis_str))
-    self.meteor_p.stdin.write('{}\n'.format(score_line))
-    self.meteor_p.stdin.flush()
-    stats = self.meteor_p.stdout.readline().strip()
-    eval_line = 'EVAL ||| {}'.format(stats)
-    # EVAL ||| stats 
-    self.meteor_p.stdin.write('{}\n'.format(eval_line))
-    self.meteor_p.stdin.flush()
-    score = float(self.meteor_p.stdout.readline().strip())
-    # bug fix: there are two values returned by the jar file, one average, and one all, so do it twice
-    # thanks for Andrej for pointing this out
-    score = float(self.meteor_p.stdout.readline().strip())
-    self.lock.release()
-    return score
- 
-  def __exit__(self):
-    self.lock.acquire()
-    self.meteor_p.stdin.close()
-    self.meteor_p.wait()
-    self.lock.release()
-
-
-def producer_fn(q, scorer, gts, res, vid_order):
-  _, ss = scorer.compute_score(gts, res, vid_order=vid_order)
-  vid_ss = {}
-  for vid, s in zip(vid_order, ss):
-    vid_ss[vid] = s
-  q.put(vid_ss)
-
-
-class MeteorMulti(object):
-  def __init__(self, num_process=4):
-    self.num_process = num_process
-    self.scorers = []
-    for i in xrange(num_process):
-      self.scorers.append(Meteor())
-
-  def compute_score(self, gts, res, vid_order=None):
-    if vid_order is None:
-      vid_order = gts.keys()
-    num_vid = len(vid_order)
-    num_split = min(self.num_process, num_vid)
-    split_idxs = np.linspace(0, num_vid, num_split+1).astype(np.int32)
-
-    q = Queue(num_split)
-    producers = []
-    for i in xrange(num_split):
-      sub_vid_order = vid_order[split_idxs[i]: split_idxs[i+1]]
-      sub_gts = {key: gts[key] for key in sub_vid_order}
-      sub_res = {key: res[key] for key in sub_vid_order}
-
-      producers.append(Process(target=producer_fn, 
-        args=(q, self.scorers[i], sub_gts, sub_res, sub_vid_order)))
-      producers[-1].start()
-
-    vid_score = {}
-    for i in xrange(num_split):
-      sub_vid_ss = q.get()
-      vid_score.update(sub_vid_ss)
-    scores = [vid_score[vid] for vid in vid_order]
-
-    return np.mean(scores), scores
+def meteor_scoreSegment(refsNpred, alpha=0.9, beta=3, gamma=0.5):
+    refs, pred = refsNpred
+    return meteor_score.meteor_score([word_tokenize(ref) for ref in refs],
+                                     word_tokenize(pred),
+                                     alpha=alpha,
+                                     beta=beta,
+                                     gamma=gamma)
+
+
+class MeteorBatched(object):
+    """
+    Per-segment METEOR for any number of segments from one call, optionally spread over a process pool.
+    Each segment's score is what evaluate.load('meteor').compute(references=[refs], predictions=[pred])['meteor'] 
+    returns (nltk's meteor_score on word_tokenize'd refs and prediction, w/ the same alpha / beta / gamma), 
+    w/o loading the metric from the hub or paying its per-call overhead.
+    """
+    def __init__(self, num_processes=1, chunksize=64, alpha=0.9, beta=3, gamma=0.5):
+        self.num_processes = num_processes
+        self.chunksize = chunksize
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+
+    def compute_score(self, gts, res):
+        """
+        :param gts: list of list of str : refs per segment
+        :param res: list of str : one prediction per segment
+        :return: mean score (float), per-segment scores (np.array)
+        """
+        assert len(gts) == len(res), print(len(gts), len(res))
+        if len(res) == 0:
+            return float('nan'), np.zeros(0)
+
+        scr_fn = functools.partial(meteor_scoreSegment, alpha=self.alpha, beta=self.beta, gamma=self.gamma)
+        if (self.num_processes > 1) and (len(res) > self.chunksize):
+            with ProcessPoolExecutor(max_workers=self.num_processes) as executor:
+                scores = list(executor.map(scr_fn, zip(gts, res), chunksize=self.chunksize))
+        else:
+            scores = [scr_fn(refsNpred) for refsNpred in zip(gts, res)]
+        scores = np.array(scores, dtype=np.float64)
+
+        return np.mean(scores), scores
+
+    def method(self):
+        return "METEOR"
 
 
 def second_max_val(arr):
@@ -1165,422 +1381,808 @@ PRED_RESULTS_SUBDIR = "egoExo4d_release"
 
 TK_NM_N_TMSTMP__FILTERER__FP = "captioner_inputData/test_filtered.pkl"
 
-target_tkNmNtmstmps_set = set()
-if TK_NM_N_TMSTMP__FILTERER__FP is not None:
-    assert ospif(TK_NM_N_TMSTMP__FILTERER__FP), print(TK_NM_N_TMSTMP__FILTERER__FP)
-    fltrd_tknmNtmstmp_dct = pkl_ld(TK_NM_N_TMSTMP__FILTERER__FP)
-    for k, v in fltrd_tknmNtmstmp_dct.items():
-        for k1 in v:
-            target_tkNmNtmstmps_set.add((k, k1))
-
 TK_NM__2__TMSTMP__2__LST_ATMC_DSCS___FP = "captioner_inputData/test.pkl"
-assert ospif(TK_NM__2__TMSTMP__2__LST_ATMC_DSCS___FP)
 
 PRED_RESULTS_ROOT_DR = f"../../runs" 
-assert ospid(PRED_RESULTS_ROOT_DR)
 
 PRED___TK_NM__2__STRT_N_END_TMSTMP__2__SCORES___FP = f"{PRED_RESULTS_ROOT_DR}/{PRED_RESULTS_SUBDIR}/take2startNendTimestamp2predScores_checkpoint-maxCaptioniningScore.pkl" 
-assert ospif(PRED___TK_NM__2__STRT_N_END_TMSTMP__2__SCORES___FP), print(PRED___TK_NM__2__STRT_N_END_TMSTMP__2__SCORES___FP)
 
 VRB2LBL_FP = f"../../data/captioningEval_miscData/verb2label.pkl"
-assert ospif(VRB2LBL_FP)
 
 NN2LBL_FP = f"../../data/captioningEval_miscData/noun2label.pkl"
-assert ospif(NN2LBL_FP)
 
 NOUNS_WHITELIST_CSV_PATH = f"../../data/captioningEval_miscData/compound_noun_whitelist.csv"
-assert ospif(NOUNS_WHITELIST_CSV_PATH)
 
 NOUNS_SENSE_DICT_CSV_PATH = f"../../data/captioningEval_miscData/noun_sense_list.csv"
-assert ospif(NOUNS_WHITELIST_CSV_PATH)
 
 VERBS_SENSE_DICT_CSV_PATH = f"../../data/captioningEval_miscData/verb_sense_list.csv"
-assert ospif(NOUNS_WHITELIST_CSV_PATH)
 
 SCORES_FP = "captioner_outputData/scores.pkl"
-assert ospif(SCORES_FP), print(SCORES_FP)
-
-tkNm2tmstmp2lstAtmcDscs =\
-    pkl_ld(TK_NM__2__TMSTMP__2__LST_ATMC_DSCS___FP)
-
-nlp = spacy.load(SPACY_LANG_MOD)
-all_stopwords = nlp.Defaults.stop_words
-
-dct_nn2lbl = pkl_ld(NN2LBL_FP)
-dct_vrb2lbl = pkl_ld(VRB2LBL_FP)
-
-noun_whitelist = pd.read_csv(NOUNS_WHITELIST_CSV_PATH, header=None).values
-verb_sense_dict = load_sense_dict(VERBS_SENSE_DICT_CSV_PATH)
-noun_sense_dict = load_sense_dict(NOUNS_SENSE_DICT_CSV_PATH)
-
-print("LOADING SCORERS")
-cdr_scrr = Cider()
-bl_scrr = Bleu(4)
-mtr_scrr = evaluate.load('meteor')
-print("DONE LOADING SCORERS")
-print("-" * 50)
-print("METRICS: ", METRICS)
-
-gt_tkNm_2_tmstmpNtxt = {}
-tkNm_2_cdrPrStpPrVw = {}
-tkNm_2_mtrPrStpPrVw = {}
-tkNm_2_vrbIouPrStpPrVw = {}
-tkNm_2_nnIouPrStpPrVw = {}
-tkNm_2_nnChnkIouPrStpPrVw = {}
-mtrc_2_tkNm_2_vlPrStpPrVw = {}
-vw_2_tkNm_2_tmstmpNtxt = {}
-
-for vw_idx, vw in enumerate(VIEWS):
-    np.random.seed(42)
-
-    vwRslts_fp = f"captioner_outputData/{vw}.json"
-    assert ospif(vwRslts_fp), print(vwRslts_fp)
-
-    tkNm_2_tmstmpNtxt = json_ld(vwRslts_fp)
-
-    if len(target_tkNmNtmstmps_set) > 0:
-        tkNm_2_tmstmpNtxt_tmp = {}
-
-        tmp_dct = pkl_ld(SCORES_FP)
-
-        for tk_nm in tkNm_2_tmstmpNtxt:
-            assert tk_nm in tmp_dct
-            assert len(tmp_dct[tk_nm]) == len(tkNm_2_tmstmpNtxt[tk_nm])
-            assert tk_nm not in tkNm_2_tmstmpNtxt_tmp
-            tkNm_2_tmstmpNtxt_tmp[tk_nm] = []
-            tmp_cnt = 0
-            for k in tmp_dct[tk_nm]:
-                assert float(k[0]) == float(tkNm_2_tmstmpNtxt[tk_nm][tmp_cnt][0]), print(float(k[0]), )
-                tmp_lst = [tkNm_2_tmstmpNtxt[tk_nm][tmp_cnt][0], tkNm_2_tmstmpNtxt[tk_nm][tmp_cnt][1], float(k[1]), float(k[2])]
-                tkNm_2_tmstmpNtxt_tmp[tk_nm].append(tmp_lst)
-                tmp_cnt += 1
-        tkNm_2_tmstmpNtxt = tkNm_2_tmstmpNtxt_tmp
-        tkNm_2_tmstmpNtxt_tmp2 = {}
-        tkNm2tmstmp2lstAtmcDscs_tmp = {}
-        for tk_nm, tmp_tmstmpNtxts in tkNm_2_tmstmpNtxt.items():
-            for tmp_ele in tmp_tmstmpNtxts:
-                if (tk_nm, (tmp_ele[0], tmp_ele[2], tmp_ele[3])) in target_tkNmNtmstmps_set:
-                    if tk_nm not in tkNm_2_tmstmpNtxt_tmp2:
-                        tkNm_2_tmstmpNtxt_tmp2[tk_nm] = []
-                    tkNm_2_tmstmpNtxt_tmp2[tk_nm].append(tmp_ele)
-
-                    assert tk_nm in  tkNm2tmstmp2lstAtmcDscs
-                    assert (tmp_ele[2], tmp_ele[3]) in tkNm2tmstmp2lstAtmcDscs[tk_nm]
-                    if tk_nm not in tkNm2tmstmp2lstAtmcDscs_tmp:
-                        tkNm2tmstmp2lstAtmcDscs_tmp[tk_nm] = {}
-                    tkNm2tmstmp2lstAtmcDscs_tmp[tk_nm][(tmp_ele[2], tmp_ele[3])] = tkNm2tmstmp2lstAtmcDscs[tk_nm][(tmp_ele[2], tmp_ele[3])]
-        tkNm_2_tmstmpNtxt = tkNm_2_tmstmpNtxt_tmp2
-        tkNm2tmstmp2lstAtmcDscs = tkNm2tmstmp2lstAtmcDscs_tmp
-
-    assert vw not in vw_2_tkNm_2_tmstmpNtxt
-    vw_2_tkNm_2_tmstmpNtxt[vw] = tkNm_2_tmstmpNtxt   
-
-    tkNm2strtNendTmstmp2bstPrdScrPrVw = pkl_ld(PRED___TK_NM__2__STRT_N_END_TMSTMP__2__SCORES___FP)
 
-    gt_tkNm_2_tmstmpNtxt = {}
-    for tk_nm, tmstmpNtxt in tqdm(tkNm_2_tmstmpNtxt.items()):
-        assert tk_nm not in gt_tkNm_2_tmstmpNtxt
-        gt_tkNm_2_tmstmpNtxt[tk_nm] = []
+PARSE_CACHE_DR = "captioner_outputData/parse_cache"
+SPACY_BATCH_SIZE = 256
+SPACY_N_PROCESS = 1
+METEOR_NUM_PROCESSES = 1
+# takes are scored in parallel by these many processes, each of which holds its own copy of the spaCy model
+TAKE_NUM_WORKERS = min(os.cpu_count() or 1, 8)
+# per-view metrics of the takes, which don't depend on the view selection model. Bump the version when the metrics change
+PER_VIEW_METRICS_CACHE_DR = "captioner_outputData/perViewMetrics_cache"
+PER_VIEW_METRICS_VERSION = 1
+# columnar copy of the gt and view captions written by run_columnarConversion.py
+COLUMNAR_DATA_DR = "captioner_columnarData"
 
-        assert tk_nm in tkNm2tmstmp2lstAtmcDscs
-        if tk_nm not in tkNm2strtNendTmstmp2bstPrdScrPrVw:
-            if tk_nm in gt_tkNm_2_tmstmpNtxt:
-                del gt_tkNm_2_tmstmpNtxt[tk_nm]
-                continue
 
-        if len(target_tkNmNtmstmps_set) > 0:
-            tkNm2strtNendTmstmp2bstPrdScrPrVw_tmp = {}
-            for tmp_tk_nm in tkNm2tmstmp2lstAtmcDscs:
-                for tmp_tmpstmp in tkNm2tmstmp2lstAtmcDscs[tmp_tk_nm]:
-                    assert tmp_tk_nm in tkNm2strtNendTmstmp2bstPrdScrPrVw
-                    assert tmp_tmpstmp in tkNm2strtNendTmstmp2bstPrdScrPrVw[tmp_tk_nm]
-                    if tmp_tk_nm not in tkNm2strtNendTmstmp2bstPrdScrPrVw_tmp:
-                        tkNm2strtNendTmstmp2bstPrdScrPrVw_tmp[tmp_tk_nm] = {}
-                    tkNm2strtNendTmstmp2bstPrdScrPrVw_tmp[tmp_tk_nm][tmp_tmpstmp] =\
-                        tkNm2strtNendTmstmp2bstPrdScrPrVw[tmp_tk_nm][tmp_tmpstmp]
-
-            tkNm2strtNendTmstmp2bstPrdScrPrVw = tkNm2strtNendTmstmp2bstPrdScrPrVw_tmp
-        else:
-            assert len(tmstmpNtxt) == len(tkNm2strtNendTmstmp2bstPrdScrPrVw[tk_nm]),\
-                print(tk_nm, len(tmstmpNtxt), len(tkNm2strtNendTmstmp2bstPrdScrPrVw[tk_nm]))
+# ----------------------- PER-TAKE METRICS ------------------------
+# spaCy model, label / sense dicts, parse cache and METEOR scorer of this process, set once by init_worker
+WORKER_STATE = {}
+
+
+def init_worker(parse_cache_configKey, spacy_n_process=1, meteor_num_processes=1):
+    nlp = spacy.load(SPACY_LANG_MOD)
+    WORKER_STATE["nlp"] = nlp
+    WORKER_STATE["all_stopwords"] = nlp.Defaults.stop_words
 
-        for i in range(len(tmstmpNtxt)):
-            ele_tmstmpNtxt = tmstmpNtxt[i]
+    WORKER_STATE["dct_nn2lbl"] = pkl_ld(NN2LBL_FP)
+    WORKER_STATE["dct_vrb2lbl"] = pkl_ld(VRB2LBL_FP)
 
-            ky = list(tkNm2tmstmp2lstAtmcDscs[tk_nm].keys())[i]
-            ky1 = tkNm2tmstmp2lstAtmcDscs[tk_nm][ky]['timestamp']
+    WORKER_STATE["noun_whitelist"] = pd.read_csv(NOUNS_WHITELIST_CSV_PATH, header=None).values
+    WORKER_STATE["verb_sense_dict"] = load_sense_dict(VERBS_SENSE_DICT_CSV_PATH)
+    WORKER_STATE["noun_sense_dict"] = load_sense_dict(NOUNS_SENSE_DICT_CSV_PATH)
 
-            if (len(ele_tmstmpNtxt) > 2) and (len(ele_tmstmpNtxt) != 4):
-                assert tkNm2tmstmp2lstAtmcDscs[tk_nm][ky]["startNend_clipName"][0] == ele_tmstmpNtxt[3][0]
-                assert tkNm2tmstmp2lstAtmcDscs[tk_nm][ky]["startNend_clipName"][1] == ele_tmstmpNtxt[3][1]
+    WORKER_STATE["parse_cache"] = ParseCache(PARSE_CACHE_DR, parse_cache_configKey)
+    WORKER_STATE["spacy_n_process"] = spacy_n_process
+    WORKER_STATE["mtr_scrr"] = MeteorBatched(num_processes=meteor_num_processes)
 
-                assert tkNm2tmstmp2lstAtmcDscs[tk_nm][ky]["startNend_frameIdx"][0] == ele_tmstmpNtxt[4][0]
-                assert tkNm2tmstmp2lstAtmcDscs[tk_nm][ky]["startNend_frameIdx"][1] == ele_tmstmpNtxt[4][1]
 
-                assert ky[0] == ele_tmstmpNtxt[5][0]
-                assert ky[1] == ele_tmstmpNtxt[5][1]
+def get_verbNnounSets_worker(narration_text):
+    assert isinstance(narration_text, str)
+    return extract_verbNnounSets_cached(narration_text,
+                                        WORKER_STATE["parse_cache"],
+                                        WORKER_STATE["nlp"],
+                                        WORKER_STATE["all_stopwords"],
+                                        dct_nn2lbl=WORKER_STATE["dct_nn2lbl"],
+                                        dct_vrb2lbl=WORKER_STATE["dct_vrb2lbl"],
+                                        compound_whitelist=WORKER_STATE["noun_whitelist"],
+                                        verb_sense_dict=WORKER_STATE["verb_sense_dict"],
+                                        noun_sense_dict=WORKER_STATE["noun_sense_dict"],)
 
-            gt_tkNm_2_tmstmpNtxt[tk_nm].append([ky1, []])
-            for ele2 in tkNm2tmstmp2lstAtmcDscs[tk_nm][ky]['text']:
-                assert isinstance(ele2, str)
-                gt_tkNm_2_tmstmpNtxt[tk_nm][-1][-1].append(ele2)
-            gt_tkNm_2_tmstmpNtxt[tk_nm][-1].append(ky)
 
-    tk_cnt = 0
-    for tk_nm, tmstmpNtxt2 in tqdm(tkNm_2_tmstmpNtxt.items()):
-        if tk_nm not in gt_tkNm_2_tmstmpNtxt:
+def compute_segmentIous(pred_text, gt_texts):
+    # max over the refs of the IoUs between the verb / noun / noun chunk sets of the prediction and a ref
+    unq_vrbs, unq_nns, unq_nnChnks = get_verbNnounSets_worker(pred_text)
+
+    lst_vrb_iou = []
+    lst_nn_iou = []
+    lst_nnChnk_iou = []
+    for gt_txt in gt_texts:
+        gt_unq_vrbs, gt_unq_nns, gt_unq_nnChnks = get_verbNnounSets_worker(gt_txt)
+
+        vrb_lnIntrsctn = len(unq_vrbs.intersection(gt_unq_vrbs))
+        vrb_lnUnn = max(len(unq_vrbs.union(gt_unq_vrbs)), 1)
+        lst_vrb_iou.append(vrb_lnIntrsctn / vrb_lnUnn)
+
+        nn_lnIntrsctn = len(unq_nns.intersection(gt_unq_nns))
+        nn_lnUnn = max(len(unq_nns.union(gt_unq_nns)), 1)
+        lst_nn_iou.append(nn_lnIntrsctn / nn_lnUnn)
+
+        nnChnk_lnIntrsctn = len(unq_nnChnks.intersection(gt_unq_nnChnks))
+        nnChnk_lnUnn = max(len(unq_nnChnks.union(gt_unq_nnChnks)), 1)
+        lst_nnChnk_iou.append(nnChnk_lnIntrsctn / nnChnk_lnUnn)
+
+    return float(np.max(lst_vrb_iou)), float(np.max(lst_nn_iou)), float(np.max(lst_nnChnk_iou))
+
+
+def compute_takeMetrics(tkNmNvwInpts):
+    """
+    All metrics of one take for all of its views. Only reads the state set by init_worker, so takes can be scored in 
+    any process and in any order. The metrics don't depend on the view selection model, the best-view masks are 
+    applied by merge_takeMetrics.
+    :param tkNmNvwInpts: take name, list of (view idx, predicted text per segment, gt texts per segment)
+    :return: take name, list of (view idx, metric name -> value per segment), parses that weren't in the parse cache
+    """
+    tk_nm, vwInpts = tkNmNvwInpts
+    parse_cache = WORKER_STATE["parse_cache"]
+
+    lst_txts = []
+    for _, prds, rfs in vwInpts:
+        lst_txts += prds
+        for ele in rfs:
+            lst_txts += ele
+    parse_verbNnounSets_batched(lst_txts,
+                                parse_cache,
+                                WORKER_STATE["nlp"],
+                                WORKER_STATE["all_stopwords"],
+                                dct_nn2lbl=WORKER_STATE["dct_nn2lbl"],
+                                dct_vrb2lbl=WORKER_STATE["dct_vrb2lbl"],
+                                batch_size=SPACY_BATCH_SIZE,
+                                n_process=WORKER_STATE["spacy_n_process"])
+
+    # CIDEr-D w/ the document frequencies of the take's segments, which are the same for all views
+    cdr_scrr = CiderD(vwInpts[0][2])
+    vwIdxNmtrc2vls = []
+    for vw_idx, prds, rfs in vwInpts:
+        assert len(prds) == len(rfs)
+        _, cdr_al = cdr_scrr.compute_score(prds)
+        _, mtr_al = WORKER_STATE["mtr_scrr"].compute_score(rfs, prds)
+        ious = [compute_segmentIous(prd, rf) for prd, rf in zip(prds, rfs)]
+
+        mtrc_2_vls = {"cider": list(cdr_al),
+                      "meteor": mtr_al.tolist(),
+                      "verb_iou": [ele[0] for ele in ious],
+                      "noun_iou": [ele[1] for ele in ious],
+                      "nounChunk_iou": [ele[2] for ele in ious],}
+        for mtrc_nm, vls in mtrc_2_vls.items():
+            assert len(vls) == len(prds)
+        vwIdxNmtrc2vls.append((vw_idx, mtrc_2_vls))
+
+    return tk_nm, vwIdxNmtrc2vls, parse_cache.pop_new()
+
+
+def get_takeMetricsKey(vwInpts):
+    # the per-view metrics of a take only depend on its predicted and gt texts
+    return get_textKey(json.dumps([[vw_idx, prds, rfs] for vw_idx, prds, rfs in vwInpts]))
+
+
+def get_perViewMetrics(tkNm_2_vwInpts, parse_cache_configKey, cache_dr=PER_VIEW_METRICS_CACHE_DR, num_workers=TAKE_NUM_WORKERS):
+    """
+    Per-view metrics of all takes. Takes whose metrics are in the cache at cache_dr aren't scored again, the rest are 
+    scored by a pool of num_workers processes that load spaCy and the dicts once each.
+    :return: take name -> list of (view idx, metric name -> value per segment)
+    """
+    mtrcs_cache = ParseCache(cache_dr,
+                             get_textKey(json.dumps([parse_cache_configKey, PER_VIEW_METRICS_VERSION]))[:16],
+                             fl_nm_prefix="perViewMetrics")
+    tkNm_2_tkKy = {tk_nm: get_takeMetricsKey(vwInpts) for tk_nm, vwInpts in tkNm_2_vwInpts.items()}
+    tkNm_2_vwInpts_toScore = {tk_nm: vwInpts for tk_nm, vwInpts in tkNm_2_vwInpts.items() 
+                              if tkNm_2_tkKy[tk_nm] not in mtrcs_cache}
+    print(f"PER-VIEW METRICS CACHE: {len(tkNm_2_vwInpts) - len(tkNm_2_vwInpts_toScore)} / {len(tkNm_2_vwInpts)} takes in {mtrcs_cache.fp}")
+
+    if len(tkNm_2_vwInpts_toScore) > 0:
+        # executor.map gives the results in take order, so the merged structures are the same for any number of workers
+        print(f"SCORING {len(tkNm_2_vwInpts_toScore)} TAKES W/ {num_workers} WORKER(S)")
+        if num_workers > 1:
+            parse_cache = ParseCache(PARSE_CACHE_DR, parse_cache_configKey)
+            executor = ProcessPoolExecutor(max_workers=num_workers,
+                                           initializer=init_worker,
+                                           initargs=(parse_cache_configKey, 1, 1))
+            tkRslts = executor.map(compute_takeMetrics, tkNm_2_vwInpts_toScore.items())
+        else:
+            init_worker(parse_cache_configKey, SPACY_N_PROCESS, METEOR_NUM_PROCESSES)
+            parse_cache = WORKER_STATE["parse_cache"]
+            executor = None
+            tkRslts = map(compute_takeMetrics, tkNm_2_vwInpts_toScore.items())
+        print(f"PARSE CACHE: {len(parse_cache)} cached texts in {parse_cache.fp}")
+
+        for tk_nm, vwIdxNmtrc2vls, new_parses in tqdm(tkRslts, total=len(tkNm_2_vwInpts_toScore)):
+            mtrcs_cache.put(tkNm_2_tkKy[tk_nm], vwIdxNmtrc2vls)
+            parse_cache.update(new_parses)
+
+        if executor is not None:
+            executor.shutdown()
+        parse_cache.dump()
+        mtrcs_cache.dump()
+
+    return {tk_nm: mtrcs_cache.get(tkNm_2_tkKy[tk_nm]) for tk_nm in tkNm_2_vwInpts}
+
+
+def merge_takeMetrics(mtrc_2_tkNm_2_vlPrStpPrVw, tk_nm, vwIdxNmtrc2vls, vwIdx_2_ntBstEx_idxs):
+    # views are appended in the order they were given to compute_takeMetrics, so merging the takes in order gives 
+    # the same structures as scoring them one after another. Segments for which a view isn't the best view get 
+    # float('-inf') for that view
+    for vw_idx, mtrc_2_vls in vwIdxNmtrc2vls:
+        for mtrc_nm, vls in mtrc_2_vls.items():
+            tkNm_2_vlPrStpPrVw = mtrc_2_tkNm_2_vlPrStpPrVw[mtrc_nm]
+            if tk_nm not in tkNm_2_vlPrStpPrVw:
+                tkNm_2_vlPrStpPrVw[tk_nm] = []
+            for stp_idx, vl in enumerate(vls):
+                if stp_idx >= len(tkNm_2_vlPrStpPrVw[tk_nm]):
+                    tkNm_2_vlPrStpPrVw[tk_nm].append([])
+                if stp_idx in vwIdx_2_ntBstEx_idxs[vw_idx]:
+                    tkNm_2_vlPrStpPrVw[tk_nm][stp_idx].append(float('-inf'))
+                else:
+                    tkNm_2_vlPrStpPrVw[tk_nm][stp_idx].append(vl)
+
+
+# ----------------------- PRE-JOIN ------------------------
+def format_predictedViewScores(dct_dtst, dct_rslts):
+    # test_index2logits_*.json (datapoint idx -> predicted view scores) to take -> (start, end) timestamps -> 
+    # predicted view scores, w/ the datapoints indexed in the order of the test dataset pickle
+    cnt = 0
+    for k, v in dct_dtst.items():
+        cnt += len(v)
+    assert cnt == len(dct_rslts), print(cnt, len(dct_rslts))
+
+    tkNm2strtNendTmstmp2bstPrdScrPrVw = {}
+    idx = 0
+    for k, v in dct_dtst.items():
+        assert k not in tkNm2strtNendTmstmp2bstPrdScrPrVw
+        tkNm2strtNendTmstmp2bstPrdScrPrVw[k] = {}
+        for k1 in v:
+            strt_tmstmp = k1[1]
+            end_tmstmp = k1[2]
+            assert str(idx) in dct_rslts
+
+            assert (strt_tmstmp, end_tmstmp) not in tkNm2strtNendTmstmp2bstPrdScrPrVw[k]
+            assert isinstance(dct_rslts[str(idx)], list)
+            assert isinstance(dct_rslts[str(idx)][0], float)
+            tkNm2strtNendTmstmp2bstPrdScrPrVw[k][(strt_tmstmp, end_tmstmp)] = dct_rslts[str(idx)]
+
+            idx += 1
+    return tkNm2strtNendTmstmp2bstPrdScrPrVw
+
+
+def get_takeArrays(tkNm2tmstmp2lstAtmcDscs):
+    """
+    Joins the gt once, for all views. Per take: the segment keys (start and end timestamps) in gt order and the row 
+    of each key, gt timestamps and gt texts
+    """
+    tkNm_2_arrs = {}
+    for tk_nm, tmstmp2lstAtmcDscs in tkNm2tmstmp2lstAtmcDscs.items():
+        sgmnt_kys = list(tmstmp2lstAtmcDscs.keys())
+        tkNm_2_arrs[tk_nm] = {"sgmnt_kys": sgmnt_kys,
+                              "ky_2_row": {ky: row for row, ky in enumerate(sgmnt_kys)},
+                              "tmstmps": np.array([tmstmp2lstAtmcDscs[ky]['timestamp'] for ky in sgmnt_kys]),
+                              "txts": [list(tmstmp2lstAtmcDscs[ky]['text']) for ky in sgmnt_kys],}
+    return tkNm_2_arrs
+
+
+def get_ntBstVwMasks(tkNm_2_arrs, tkNm2strtNendTmstmp2bstPrdScrPrVw):
+    """
+    Per take that has predictions, the mask of the views that aren't the argmax of a segment's predicted view scores 
+    (num_segments x num_views), w/ the rows of get_takeArrays
+    """
+    tkNm_2_ntBstVwMsk = {}
+    for tk_nm, tk_arrs in tkNm_2_arrs.items():
+        if tk_nm not in tkNm2strtNendTmstmp2bstPrdScrPrVw:
             continue
-        assert len(tmstmpNtxt2) == len(gt_tkNm_2_tmstmpNtxt[tk_nm])
-
-        for dummyEle_idx in range(len(gt_tkNm_2_tmstmpNtxt[tk_nm]) - 1):
-            if gt_tkNm_2_tmstmpNtxt[tk_nm][dummyEle_idx][0] > gt_tkNm_2_tmstmpNtxt[tk_nm][dummyEle_idx + 1][0]:
-                raise ValueError
-        srtd_gt_tmstmpNtxt = gt_tkNm_2_tmstmpNtxt[tk_nm]    
-
-        for dummyEle_idx in range(len(tmstmpNtxt2) - 1):
-            if tmstmpNtxt2[dummyEle_idx][0] > tmstmpNtxt2[dummyEle_idx + 1][0]:
-                raise ValueError
-        srtd_tmstmpNtxt = tmstmpNtxt2   
-
-        cdrNbl_prds = {}
-        cdrNbl_rfs = {}
-        mtr_prds = []
-        mtr_rfs = []
-
-        indvdl_mtrs = []
-        indvdl_vrb_ious = []
-        indvdl_nn_ious = []
-        indvdl_nnChnk_ious = []
-        bstExAnntn_cnt = 0
-        thsVw_ntBstEx_idxs = set()
-        for eleTmstmpNtxt_idx, ele_tmstmpNtxt2 in enumerate(srtd_gt_tmstmpNtxt):
-            assert eleTmstmpNtxt_idx < len(tkNm2strtNendTmstmp2bstPrdScrPrVw[tk_nm]), print(len(tkNm2strtNendTmstmp2bstPrdScrPrVw[tk_nm]),
-                                                                                            eleTmstmpNtxt_idx)
-            if list(tkNm2strtNendTmstmp2bstPrdScrPrVw[tk_nm].values())[eleTmstmpNtxt_idx][np.argmax(list(tkNm2strtNendTmstmp2bstPrdScrPrVw[tk_nm].values())[eleTmstmpNtxt_idx])] !=\
-                    list(tkNm2strtNendTmstmp2bstPrdScrPrVw[tk_nm].values())[eleTmstmpNtxt_idx][vw_idx]:
-                thsVw_ntBstEx_idxs.add(bstExAnntn_cnt)
-            
-            cdrNbl_prds[eleTmstmpNtxt_idx] = [srtd_tmstmpNtxt[eleTmstmpNtxt_idx][1]]
-            cdrNbl_rfs[eleTmstmpNtxt_idx] = srtd_gt_tmstmpNtxt[eleTmstmpNtxt_idx][1]
-
-            mtr_prds.append(srtd_tmstmpNtxt[eleTmstmpNtxt_idx][1])
-            mtr_rfs.append(srtd_gt_tmstmpNtxt[eleTmstmpNtxt_idx][1])
-
-            mtrIndv = mtr_scrr.compute(references=mtr_rfs[-1:], predictions=mtr_prds[-1:])['meteor']
-
-            indvdl_mtrs.append(mtrIndv)    
-
-            assert isinstance(srtd_tmstmpNtxt[eleTmstmpNtxt_idx][1], str)
-            unq_vrbs, unq_nns, unq_nnChnks, _, _, _ =\
-                extract_verbNnoun_v1(srtd_tmstmpNtxt[eleTmstmpNtxt_idx][1],
-                                     nlp,
-                                     all_stopwords,
-                                     dct_nn2lbl=dct_nn2lbl,
-                                     dct_vrb2lbl=dct_vrb2lbl,
-                                     compound_whitelist=noun_whitelist,
-                                     verb_sense_dict=verb_sense_dict,
-                                     noun_sense_dict=noun_sense_dict,)
-
-            lst_vrb_iou = []
-            lst_nn_iou = []
-            lst_nnChnk_iou = []
-            for gt_txt in srtd_gt_tmstmpNtxt[eleTmstmpNtxt_idx][1]:
-                assert isinstance(gt_txt, str)
-                gt_unq_vrbs, gt_unq_nns, gt_unq_nnChnks, _, _, _ =\
-                    extract_verbNnoun_v1(gt_txt,
-                                         nlp,
-                                         all_stopwords,
-                                         dct_nn2lbl=dct_nn2lbl,
-                                         dct_vrb2lbl=dct_vrb2lbl,
-                                         compound_whitelist=noun_whitelist,
-                                         verb_sense_dict=verb_sense_dict,
-                                         noun_sense_dict=noun_sense_dict,)
-
-                assert isinstance(unq_vrbs, set)
-                if len(unq_vrbs) > 0:
-                    assert isinstance(list(unq_vrbs)[0], str)
-
-                assert isinstance(unq_nns, set)
-                if len(unq_nns) > 0:
-                    assert isinstance(list(unq_nns)[0], str)
-
-                assert isinstance(unq_nnChnks, set)
-                if len(unq_nnChnks) > 0:
-                    assert isinstance(list(unq_nnChnks)[0], str)
-
-                assert isinstance(gt_unq_vrbs, set)
-                if len(gt_unq_vrbs) > 0:
-                    assert isinstance(list(gt_unq_vrbs)[0], str)
-
-                assert isinstance(gt_unq_nns, set)
-                if len(gt_unq_nns) > 0:
-                    assert isinstance(list(gt_unq_nns)[0], str)
-
-                assert isinstance(gt_unq_nnChnks, set)
-                if len(gt_unq_nnChnks) > 0:
-                    assert isinstance(list(gt_unq_nnChnks)[0], str)
-
-                vrb_lnIntrsctn = len(unq_vrbs.intersection(gt_unq_vrbs))
-                vrb_lnUnn = max(len(unq_vrbs.union(gt_unq_vrbs)), 1)
-                lst_vrb_iou.append(vrb_lnIntrsctn / vrb_lnUnn)
-
-                nn_lnIntrsctn = len(unq_nns.intersection(gt_unq_nns))
-                nn_lnUnn = max(len(unq_nns.union(gt_unq_nns)), 1)
-                lst_nn_iou.append(nn_lnIntrsctn / nn_lnUnn)
-
-                nnChnk_lnIntrsctn = len(unq_nnChnks.intersection(gt_unq_nnChnks))
-                nnChnk_lnUnn = max(len(unq_nnChnks.union(gt_unq_nnChnks)), 1)
-                lst_nnChnk_iou.append(nnChnk_lnIntrsctn / nnChnk_lnUnn)
-
-            indvdl_vrb_ious.append(np.max(lst_vrb_iou))
-            indvdl_nn_ious.append(np.max(lst_nn_iou))
-            indvdl_nnChnk_ious.append(np.max(lst_nnChnk_iou))
-
-        cdr, cdr_al =  cdr_scrr.compute_score(cdrNbl_rfs, cdrNbl_prds)
-        mtr_al = indvdl_mtrs
-
-        assert len(indvdl_mtrs) == len(cdr_al) == len(indvdl_vrb_ious) ==\
-                len(indvdl_nn_ious) == len(indvdl_nnChnk_ious) 
-        
-        if tk_nm not in tkNm_2_cdrPrStpPrVw:
-            tkNm_2_cdrPrStpPrVw[tk_nm] = []
-        for cdr_idx, cdr_vl in enumerate(cdr_al):
-            if cdr_idx >= len(tkNm_2_cdrPrStpPrVw[tk_nm]):
-                tkNm_2_cdrPrStpPrVw[tk_nm].append([])
-            if cdr_idx in thsVw_ntBstEx_idxs:
-                tkNm_2_cdrPrStpPrVw[tk_nm][cdr_idx].append(float('-inf'))
-            else:
-                tkNm_2_cdrPrStpPrVw[tk_nm][cdr_idx].append(cdr_vl)
 
-        if tk_nm not in tkNm_2_mtrPrStpPrVw:
-            tkNm_2_mtrPrStpPrVw[tk_nm] = []
-        for mtr_idx, mtr_vl in enumerate(mtr_al):
-            if mtr_idx >= len(tkNm_2_mtrPrStpPrVw[tk_nm]):
-                tkNm_2_mtrPrStpPrVw[tk_nm].append([])
+        for ky in tk_arrs["sgmnt_kys"]:
+            assert ky in tkNm2strtNendTmstmp2bstPrdScrPrVw[tk_nm], print(tk_nm, ky)
+        prd_scrs = np.array([tkNm2strtNendTmstmp2bstPrdScrPrVw[tk_nm][ky] for ky in tk_arrs["sgmnt_kys"]], dtype=np.float64)
+        if len(tk_arrs["sgmnt_kys"]) == 0:
+            prd_scrs = np.zeros((0, len(VIEWS)))
+        assert prd_scrs.ndim == 2, print(tk_nm, prd_scrs.shape)
 
-            if mtr_idx in thsVw_ntBstEx_idxs:
-                tkNm_2_mtrPrStpPrVw[tk_nm][mtr_idx].append(float('-inf'))
-            else:
-                assert mtr_vl != float('-inf')
-                tkNm_2_mtrPrStpPrVw[tk_nm][mtr_idx].append(mtr_vl)
+        bst_scrs = prd_scrs[np.arange(len(prd_scrs)), np.argmax(prd_scrs, axis=1)]
+        tkNm_2_ntBstVwMsk[tk_nm] = bst_scrs[:, np.newaxis] != prd_scrs
+    return tkNm_2_ntBstVwMsk
 
-        if tk_nm not in tkNm_2_vrbIouPrStpPrVw:
-            tkNm_2_vrbIouPrStpPrVw[tk_nm] = []
 
-            assert tk_nm not in tkNm_2_nnIouPrStpPrVw
-            tkNm_2_nnIouPrStpPrVw[tk_nm] = []
+def get_ntBstEx_idxs(ntBstVw_msk):
+    """
+    Segments of a view that get float('-inf') for it in merge_takeMetrics, from the view's column of the not-best-view 
+    mask in the view's segment order. As in the original per-view loop, whose index was a counter that was never 
+    incremented: only segment 0, if the view isn't the best view for any of the take's segments
+    """
+    return {0} if ntBstVw_msk.any() else set()
+
+
+def filter_viewResults(tkNm_2_tmstmpNtxt, tkNm_2_tmstmpScrs, target_tkNmNtmstmps_set):
+    # adds the start and end timestamps of the segments to the view's results and keeps the target segments
+    tkNm_2_tmstmpNtxt_fltrd = {}
+    for tk_nm, tmstmpNtxt in tkNm_2_tmstmpNtxt.items():
+        assert tk_nm in tkNm_2_tmstmpScrs
+        assert len(tkNm_2_tmstmpScrs[tk_nm]) == len(tmstmpNtxt)
+        for k, ele in zip(tkNm_2_tmstmpScrs[tk_nm], tmstmpNtxt):
+            assert float(k[0]) == float(ele[0]), print(float(k[0]), )
+            tmp_ele = [ele[0], ele[1], float(k[1]), float(k[2])]
+            if (tk_nm, (tmp_ele[0], tmp_ele[2], tmp_ele[3])) in target_tkNmNtmstmps_set:
+                if tk_nm not in tkNm_2_tmstmpNtxt_fltrd:
+                    tkNm_2_tmstmpNtxt_fltrd[tk_nm] = []
+                tkNm_2_tmstmpNtxt_fltrd[tk_nm].append(tmp_ele)
+    return tkNm_2_tmstmpNtxt_fltrd
+
+
+def load_viewInputs_pickles():
+    """
+    Joins the captions of all views w/ the gt. Nothing here depends on the view selection model.
+    :return: take name -> list of (view idx, predicted text per segment, gt texts per segment), 
+             take name -> view idx -> rows of the take's pre-joined arrays for the view's segments, 
+             pre-joined arrays per take, view -> take name -> captions, take name -> gt of the last view
+    """
+    target_tkNmNtmstmps_set = set()
+    if TK_NM_N_TMSTMP__FILTERER__FP is not None:
+        assert ospif(TK_NM_N_TMSTMP__FILTERER__FP), print(TK_NM_N_TMSTMP__FILTERER__FP)
+        fltrd_tknmNtmstmp_dct = pkl_ld(TK_NM_N_TMSTMP__FILTERER__FP)
+        for k, v in fltrd_tknmNtmstmp_dct.items():
+            for k1 in v:
+                target_tkNmNtmstmps_set.add((k, k1))
 
-            assert tk_nm not in tkNm_2_nnChnkIouPrStpPrVw
-            tkNm_2_nnChnkIouPrStpPrVw[tk_nm] = []
+    assert ospif(TK_NM__2__TMSTMP__2__LST_ATMC_DSCS___FP)
+    assert ospif(SCORES_FP), print(SCORES_FP)
 
-        for vrbIou_idx, vrbIou_vl in enumerate(indvdl_vrb_ious):
-            if vrbIou_idx >= len(tkNm_2_vrbIouPrStpPrVw[tk_nm]):
-                tkNm_2_vrbIouPrStpPrVw[tk_nm].append([])
+    tkNm2tmstmp2lstAtmcDscs =\
+        pkl_ld(TK_NM__2__TMSTMP__2__LST_ATMC_DSCS___FP)
+    tkNm_2_tmstmpScrs = pkl_ld(SCORES_FP) if (len(target_tkNmNtmstmps_set) > 0) else None
 
-            if vrbIou_idx in thsVw_ntBstEx_idxs:
-                tkNm_2_vrbIouPrStpPrVw[tk_nm][vrbIou_idx].append(float('-inf'))
-            else:
-                tkNm_2_vrbIouPrStpPrVw[tk_nm][vrbIou_idx].append(float(vrbIou_vl))
+    # gt is the same for all views, so it's joined once
+    tkNm_2_arrs = get_takeArrays(tkNm2tmstmp2lstAtmcDscs)
 
-        for nnIou_idx, nnIou_vl in enumerate(indvdl_nn_ious):
-            if nnIou_idx >= len(tkNm_2_nnIouPrStpPrVw[tk_nm]):
-                tkNm_2_nnIouPrStpPrVw[tk_nm].append([])
+    gt_tkNm_2_tmstmpNtxt = {}
+    vw_2_tkNm_2_tmstmpNtxt = {}
+    tkNm_2_vwInpts = {}
+    tkNm_2_vwIdx2rows = {}
+    for vw_idx, vw in enumerate(VIEWS):
+        vwRslts_fp = f"captioner_outputData/{vw}.json"
+        assert ospif(vwRslts_fp), print(vwRslts_fp)
 
-            if nnIou_idx in thsVw_ntBstEx_idxs:
-                tkNm_2_nnIouPrStpPrVw[tk_nm][nnIou_idx].append(float('-inf'))
-            else:
-                tkNm_2_nnIouPrStpPrVw[tk_nm][nnIou_idx].append(float(nnIou_vl))
+        tkNm_2_tmstmpNtxt = json_ld(vwRslts_fp)
+
+        if len(target_tkNmNtmstmps_set) > 0:
+            tkNm_2_tmstmpNtxt = filter_viewResults(tkNm_2_tmstmpNtxt, tkNm_2_tmstmpScrs, target_tkNmNtmstmps_set)
 
-        for nnChnkIou_idx, nnChnkIou_vl in enumerate(indvdl_nnChnk_ious):
-            if nnChnkIou_idx >= len(tkNm_2_nnChnkIouPrStpPrVw[tk_nm]):
-                tkNm_2_nnChnkIouPrStpPrVw[tk_nm].append([])
+        assert vw not in vw_2_tkNm_2_tmstmpNtxt
+        vw_2_tkNm_2_tmstmpNtxt[vw] = tkNm_2_tmstmpNtxt   
 
-            if nnChnkIou_idx in thsVw_ntBstEx_idxs:
-                tkNm_2_nnChnkIouPrStpPrVw[tk_nm][nnChnkIou_idx].append(float('-inf'))
+        gt_tkNm_2_tmstmpNtxt = {}
+        for tk_nm, tmstmpNtxt in tqdm(tkNm_2_tmstmpNtxt.items()):
+            assert tk_nm in tkNm_2_arrs
+            tk_arrs = tkNm_2_arrs[tk_nm]
+
+            if len(target_tkNmNtmstmps_set) > 0:
+                rows = []
+                for ele_tmstmpNtxt in tmstmpNtxt:
+                    assert (ele_tmstmpNtxt[2], ele_tmstmpNtxt[3]) in tk_arrs["ky_2_row"]
+                    rows.append(tk_arrs["ky_2_row"][(ele_tmstmpNtxt[2], ele_tmstmpNtxt[3])])
             else:
-                assert float(nnChnkIou_vl) != float('-inf')
-                tkNm_2_nnChnkIouPrStpPrVw[tk_nm][nnChnkIou_idx].append(float(nnChnkIou_vl))
-
-        tk_cnt +=1 
-        # if tk_cnt == 2:    # 1, 2, 5, 15
-        #     break
-
-mtrc_2_tkNm_2_vlPrStpPrVw["cider"] = tkNm_2_cdrPrStpPrVw
-mtrc_2_tkNm_2_vlPrStpPrVw["meteor"] = tkNm_2_mtrPrStpPrVw
-mtrc_2_tkNm_2_vlPrStpPrVw["verb_iou"] = tkNm_2_vrbIouPrStpPrVw
-mtrc_2_tkNm_2_vlPrStpPrVw["noun_iou"] = tkNm_2_nnIouPrStpPrVw
-mtrc_2_tkNm_2_vlPrStpPrVw["nounChunk_iou"] = tkNm_2_nnChnkIouPrStpPrVw
-
-for mtrc_nm in METRICS:
-    np.random.seed(42)
-    assert mtrc_nm in ["cider", "meteor", "verb_iou", "noun_iou", "nounChunk_iou",]
-
-    assert mtrc_nm in mtrc_2_tkNm_2_vlPrStpPrVw
-    tkNm_2_vlPrStpPrVw = mtrc_2_tkNm_2_vlPrStpPrVw[mtrc_nm]
-
-    lst_mtrc_bstVwCnt = []
-    lst_mtrc_bstVwPrct = []
-    mtrc_bst = []
-    mtrc_dlBstN2ndBstVw_abs = []
-    mtrc_dlBstN2ndBstVw_rlMxMtrcCrrStp = []
-    lst_bstMtrcNtkNmNstpIdxNbstVwNprdTxtNgtTxtNscndBstMtrcNscndBstVwNscndBstPrdTxt = []
-    for tk_nm, mtrcPrStpPrVw in tkNm_2_vlPrStpPrVw.items():
-        lst_mtrc_bstVwCnt.append([0] * len(VIEWS))
-        mtrc_bst.append([])
-        mtrc_dlBstN2ndBstVw_abs.append([])
-        mtrc_dlBstN2ndBstVw_rlMxMtrcCrrStp.append([])
+                assert len(tmstmpNtxt) == len(tk_arrs["sgmnt_kys"]),\
+                    print(tk_nm, len(tmstmpNtxt), len(tk_arrs["sgmnt_kys"]))
+                rows = list(range(len(tmstmpNtxt)))
+
+                for ele_tmstmpNtxt, ky in zip(tmstmpNtxt, tk_arrs["sgmnt_kys"]):
+                    if (len(ele_tmstmpNtxt) > 2) and (len(ele_tmstmpNtxt) != 4):
+                        assert tkNm2tmstmp2lstAtmcDscs[tk_nm][ky]["startNend_clipName"][0] == ele_tmstmpNtxt[3][0]
+                        assert tkNm2tmstmp2lstAtmcDscs[tk_nm][ky]["startNend_clipName"][1] == ele_tmstmpNtxt[3][1]
+
+                        assert tkNm2tmstmp2lstAtmcDscs[tk_nm][ky]["startNend_frameIdx"][0] == ele_tmstmpNtxt[4][0]
+                        assert tkNm2tmstmp2lstAtmcDscs[tk_nm][ky]["startNend_frameIdx"][1] == ele_tmstmpNtxt[4][1]
+
+                        assert ky[0] == ele_tmstmpNtxt[5][0]
+                        assert ky[1] == ele_tmstmpNtxt[5][1]
+
+            gt_tkNm_2_tmstmpNtxt[tk_nm] = [[tk_arrs["tmstmps"][row], tk_arrs["txts"][row], tk_arrs["sgmnt_kys"][row]] 
+                                           for row in rows]
+
+            for dummyEle_idx in range(len(gt_tkNm_2_tmstmpNtxt[tk_nm]) - 1):
+                if gt_tkNm_2_tmstmpNtxt[tk_nm][dummyEle_idx][0] > gt_tkNm_2_tmstmpNtxt[tk_nm][dummyEle_idx + 1][0]:
+                    raise ValueError
+
+            for dummyEle_idx in range(len(tmstmpNtxt) - 1):
+                if tmstmpNtxt[dummyEle_idx][0] > tmstmpNtxt[dummyEle_idx + 1][0]:
+                    raise ValueError
+
+            for ele_tmstmpNtxt in tmstmpNtxt:
+                assert isinstance(ele_tmstmpNtxt[1], str)
+
+            if tk_nm not in tkNm_2_vwInpts:
+                tkNm_2_vwInpts[tk_nm] = []
+                tkNm_2_vwIdx2rows[tk_nm] = {}
+            tkNm_2_vwInpts[tk_nm].append((vw_idx,
+                                          [ele[1] for ele in tmstmpNtxt],
+                                          [ele[1] for ele in gt_tkNm_2_tmstmpNtxt[tk_nm]]))
+            tkNm_2_vwIdx2rows[tk_nm][vw_idx] = rows
+
+    return tkNm_2_vwInpts, tkNm_2_vwIdx2rows, tkNm_2_arrs, vw_2_tkNm_2_tmstmpNtxt, gt_tkNm_2_tmstmpNtxt
+
+
+def load_viewInputs():
+    # columnar copy of the inputs if it's there and up to date w/ the pickles / jsons, else the pickles / jsons
+    if is_columnarData_upToDate(COLUMNAR_DATA_DR):
+        return load_viewInputs_columnar(COLUMNAR_DATA_DR)
+    if ospid(COLUMNAR_DATA_DR):
+        print(f"{COLUMNAR_DATA_DR} is stale, loading the pickles. Rerun run_columnarConversion.py to update it")
+    return load_viewInputs_pickles()
+
+
+# ----------------------- COLUMNAR DATA ------------------------
+class TextColumn(object):
+    """
+    Strings stored as one utf-8 byte array and the offset of each string in it, so the column can be memory-mapped
+    """
+    def __init__(self, txt_bytes, offsets):
+        self.txt_bytes = txt_bytes
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        return self.txt_bytes[self.offsets[idx]: self.offsets[idx + 1]].tobytes().decode("utf-8")
+
+    def tolist(self):
+        offsets = self.offsets.tolist()
+        txt_bytes = self.txt_bytes.tobytes()
+        return [txt_bytes[offsets[idx]: offsets[idx + 1]].decode("utf-8") for idx in range(len(offsets) - 1)]
+
+
+def get_textColumnArrays(txts):
+    lst_bytes = [txt.encode("utf-8") for txt in txts]
+    offsets = np.zeros(len(lst_bytes) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(ele) for ele in lst_bytes])
+    return np.frombuffer(b"".join(lst_bytes), dtype=np.uint8), offsets
+
+
+def get_columnarData_sources():
+    srcs = [TK_NM__2__TMSTMP__2__LST_ATMC_DSCS___FP, SCORES_FP] + [f"captioner_outputData/{vw}.json" for vw in VIEWS]
+    if TK_NM_N_TMSTMP__FILTERER__FP is not None:
+        srcs.append(TK_NM_N_TMSTMP__FILTERER__FP)
+    # size and modification time of each source, to tell if the columnar copy is stale
+    return {fp: [os.stat(fp).st_size, os.stat(fp).st_mtime_ns] if ospif(fp) else None for fp in srcs}
+
+
+def is_columnarData_upToDate(dr):
+    if not ospif(f"{dr}/meta.json"):
+        return False
+    meta = json_ld(f"{dr}/meta.json")
+    return (meta["views"] == VIEWS) and (meta["filterer_fp"] == TK_NM_N_TMSTMP__FILTERER__FP) and\
+            (meta["sources"] == get_columnarData_sources())
+
+
+def convert_toColumnar(dr):
+    """
+    Writes the joined gt and view captions as flat .npy columns w/ explicit ids. Takes are ids into tk_nms and 
+    segments are ids into the sgmnt_* columns, which are grouped by take in gt order. Every view has the takes it 
+    captions (vw_{idx}_tkIds), w/ the segment id, timestamp and caption of each of its segments in view order, 
+    delimited by vw_{idx}_tkOffsets. The float timestamps are matched once here, by load_viewInputs_pickles.
+    """
+    tkNm_2_vwInpts, tkNm_2_vwIdx2rows, tkNm_2_arrs, vw_2_tkNm_2_tmstmpNtxt, _ = load_viewInputs_pickles()
+
+    tk_nms = list(tkNm_2_arrs.keys())
+    tkNm_2_id = {tk_nm: tk_id for tk_id, tk_nm in enumerate(tk_nms)}
+    tk_strtSgmntIds = np.zeros(len(tk_nms) + 1, dtype=np.int64)
+    tk_strtSgmntIds[1:] = np.cumsum([len(tkNm_2_arrs[tk_nm]["sgmnt_kys"]) for tk_nm in tk_nms])
+
+    gt_txts = []
+    gt_txtOffsets = [0]
+    for tk_nm in tk_nms:
+        for txts in tkNm_2_arrs[tk_nm]["txts"]:
+            gt_txts += txts
+            gt_txtOffsets.append(len(gt_txts))
+
+    cols = {}
+    cols["tk_nms_bytes"], cols["tk_nms_offsets"] = get_textColumnArrays(tk_nms)
+    cols["tk_strtSgmntIds"] = tk_strtSgmntIds
+    cols["sgmnt_kys"] = np.array([ky for tk_nm in tk_nms for ky in tkNm_2_arrs[tk_nm]["sgmnt_kys"]], 
+                                 dtype=np.float64).reshape(-1, 2)
+    cols["sgmnt_tmstmps"] = np.concatenate([tkNm_2_arrs[tk_nm]["tmstmps"] for tk_nm in tk_nms] + [np.zeros(0)])\
+                                .astype(np.float64)
+    cols["sgmnt_gtTxtOffsets"] = np.array(gt_txtOffsets, dtype=np.int64)
+    cols["gt_txts_bytes"], cols["gt_txts_offsets"] = get_textColumnArrays(gt_txts)
+
+    for vw_idx, vw in enumerate(VIEWS):
+        vw_tkIds = []
+        vw_tkOffsets = [0]
+        vw_sgmntIds = []
+        vw_tmstmps = []
+        vw_txts = []
+        for tk_nm, tmstmpNtxt in vw_2_tkNm_2_tmstmpNtxt[vw].items():
+            vw_tkIds.append(tkNm_2_id[tk_nm])
+            assert len(tkNm_2_vwIdx2rows[tk_nm][vw_idx]) == len(tmstmpNtxt)
+            vw_sgmntIds += [tk_strtSgmntIds[tkNm_2_id[tk_nm]] + row for row in tkNm_2_vwIdx2rows[tk_nm][vw_idx]]
+            vw_tmstmps += [float(ele[0]) for ele in tmstmpNtxt]
+            vw_txts += [ele[1] for ele in tmstmpNtxt]
+            vw_tkOffsets.append(len(vw_sgmntIds))
+        cols[f"vw_{vw_idx}_tkIds"] = np.array(vw_tkIds, dtype=np.int64)
+        cols[f"vw_{vw_idx}_tkOffsets"] = np.array(vw_tkOffsets, dtype=np.int64)
+        cols[f"vw_{vw_idx}_sgmntIds"] = np.array(vw_sgmntIds, dtype=np.int64)
+        cols[f"vw_{vw_idx}_tmstmps"] = np.array(vw_tmstmps, dtype=np.float64)
+        cols[f"vw_{vw_idx}_txts_bytes"], cols[f"vw_{vw_idx}_txts_offsets"] = get_textColumnArrays(vw_txts)
+
+    if not ospid(dr):
+        os.makedirs(dr)
+    for col_nm, col in cols.items():
+        np.save(f"{dr}/{col_nm}.npy", col)
+    # meta is written last, so an interrupted conversion is never taken as up to date
+    json_dmp({"views": VIEWS,
+              "filterer_fp": TK_NM_N_TMSTMP__FILTERER__FP,
+              "sources": get_columnarData_sources()}, 
+             f"{dr}/meta.json")
+
+
+def load_columnarData(dr):
+    # memory-mapped columns, w/ the text columns as TextColumn
+    cols = {}
+    for fl_nm in sorted(os.listdir(dr)):
+        if fl_nm.endswith(".npy"):
+            cols[fl_nm[:-len(".npy")]] = np.load(f"{dr}/{fl_nm}", mmap_mode="r")
+    for col_nm in [ele[:-len("_bytes")] for ele in cols if ele.endswith("_bytes")]:
+        cols[col_nm] = TextColumn(cols.pop(f"{col_nm}_bytes"), cols.pop(f"{col_nm}_offsets"))
+    return cols
+
+
+def load_viewInputs_columnar(dr):
+    # same as load_viewInputs_pickles, from the columns written by convert_toColumnar
+    cols = load_columnarData(dr)
+
+    tk_nms = cols["tk_nms"].tolist()
+    tk_strtSgmntIds = cols["tk_strtSgmntIds"].tolist()
+    sgmnt_kys = [tuple(ele) for ele in cols["sgmnt_kys"].tolist()]
+    sgmnt_tmstmps = np.asarray(cols["sgmnt_tmstmps"])
+    sgmnt_gtTxtOffsets = cols["sgmnt_gtTxtOffsets"].tolist()
+    gt_txts = cols["gt_txts"].tolist()
+
+    tkNm_2_arrs = {}
+    for tk_id, tk_nm in enumerate(tk_nms):
+        strt_id, end_id = tk_strtSgmntIds[tk_id], tk_strtSgmntIds[tk_id + 1]
+        tkNm_2_arrs[tk_nm] = {"sgmnt_kys": sgmnt_kys[strt_id: end_id],
+                              "ky_2_row": {ky: row for row, ky in enumerate(sgmnt_kys[strt_id: end_id])},
+                              "tmstmps": sgmnt_tmstmps[strt_id: end_id],
+                              "txts": [gt_txts[sgmnt_gtTxtOffsets[sgmnt_id]: sgmnt_gtTxtOffsets[sgmnt_id + 1]]
+                                       for sgmnt_id in range(strt_id, end_id)],}
+
+    gt_tkNm_2_tmstmpNtxt = {}
+    vw_2_tkNm_2_tmstmpNtxt = {}
+    tkNm_2_vwInpts = {}
+    tkNm_2_vwIdx2rows = {}
+    for vw_idx, vw in enumerate(VIEWS):
+        vw_tkOffsets = cols[f"vw_{vw_idx}_tkOffsets"].tolist()
+        vw_sgmntIds = cols[f"vw_{vw_idx}_sgmntIds"].tolist()
+        vw_tmstmps = cols[f"vw_{vw_idx}_tmstmps"].tolist()
+        vw_txts = cols[f"vw_{vw_idx}_txts"].tolist()
+
+        vw_2_tkNm_2_tmstmpNtxt[vw] = {}
+        gt_tkNm_2_tmstmpNtxt = {}
+        for tkIdx, tk_id in enumerate(cols[f"vw_{vw_idx}_tkIds"].tolist()):
+            tk_nm = tk_nms[tk_id]
+            tk_arrs = tkNm_2_arrs[tk_nm]
+            strt_idx, end_idx = vw_tkOffsets[tkIdx], vw_tkOffsets[tkIdx + 1]
+            rows = [sgmnt_id - tk_strtSgmntIds[tk_id] for sgmnt_id in vw_sgmntIds[strt_idx: end_idx]]
+
+            vw_2_tkNm_2_tmstmpNtxt[vw][tk_nm] = [[tmstmp, txt] for tmstmp, txt in zip(vw_tmstmps[strt_idx: end_idx], 
+                                                                                      vw_txts[strt_idx: end_idx])]
+            gt_tkNm_2_tmstmpNtxt[tk_nm] = [[tk_arrs["tmstmps"][row], tk_arrs["txts"][row], tk_arrs["sgmnt_kys"][row]] 
+                                           for row in rows]
+
+            if tk_nm not in tkNm_2_vwInpts:
+                tkNm_2_vwInpts[tk_nm] = []
+                tkNm_2_vwIdx2rows[tk_nm] = {}
+            tkNm_2_vwInpts[tk_nm].append((vw_idx,
+                                          vw_txts[strt_idx: end_idx],
+                                          [ele[1] for ele in gt_tkNm_2_tmstmpNtxt[tk_nm]]))
+            tkNm_2_vwIdx2rows[tk_nm][vw_idx] = rows
+
+    return tkNm_2_vwInpts, tkNm_2_vwIdx2rows, tkNm_2_arrs, vw_2_tkNm_2_tmstmpNtxt, gt_tkNm_2_tmstmpNtxt
+
+
+# ----------------------- BEST-VIEW SELECTION ------------------------
+def get_bestViewOutputs(mtrc_2_tkNm_2_vlPrStpPrVw, vw_2_tkNm_2_tmstmpNtxt, gt_tkNm_2_tmstmpNtxt):
+    # per metric, (metric of the best view, take name) per segment
+    mtrc_2_outputs = {}
+    for mtrc_nm in METRICS:
+        np.random.seed(42)
+        assert mtrc_nm in ["cider", "meteor", "verb_iou", "noun_iou", "nounChunk_iou",]
+
+        assert mtrc_nm in mtrc_2_tkNm_2_vlPrStpPrVw
+        tkNm_2_vlPrStpPrVw = mtrc_2_tkNm_2_vlPrStpPrVw[mtrc_nm]
+
+        lst_mtrc_bstVwCnt = []
+        lst_mtrc_bstVwPrct = []
+        mtrc_bst = []
+        mtrc_dlBstN2ndBstVw_abs = []
+        mtrc_dlBstN2ndBstVw_rlMxMtrcCrrStp = []
+        lst_bstMtrcNtkNmNstpIdxNbstVwNprdTxtNgtTxtNscndBstMtrcNscndBstVwNscndBstPrdTxt = []
+        for tk_nm, mtrcPrStpPrVw in tkNm_2_vlPrStpPrVw.items():
+            lst_mtrc_bstVwCnt.append([0] * len(VIEWS))
+            mtrc_bst.append([])
+            mtrc_dlBstN2ndBstVw_abs.append([])
+            mtrc_dlBstN2ndBstVw_rlMxMtrcCrrStp.append([])
         
-        for stp_idx, mtrc_prVw in enumerate(mtrcPrStpPrVw):
-            srtd_mtrc_prVw_idxs = np.argsort(mtrc_prVw)[::-1]
-            srtd_mtrc_prVw = np.array(mtrc_prVw)[srtd_mtrc_prVw_idxs]
+            for stp_idx, mtrc_prVw in enumerate(mtrcPrStpPrVw):
+                srtd_mtrc_prVw_idxs = np.argsort(mtrc_prVw)[::-1]
+                srtd_mtrc_prVw = np.array(mtrc_prVw)[srtd_mtrc_prVw_idxs]
 
-            bstVw_idxs = []
-            scndBstVw_idx = None
-            for vw_idx2 in srtd_mtrc_prVw_idxs:
-                if mtrc_prVw[vw_idx2] != float('-inf'):
-                    bstVw_idxs.append(vw_idx2)
+                bstVw_idxs = []
+                scndBstVw_idx = None
+                for vw_idx2 in srtd_mtrc_prVw_idxs:
+                    if mtrc_prVw[vw_idx2] != float('-inf'):
+                        bstVw_idxs.append(vw_idx2)
 
-            """ old code """
-            # assert len(bstVw_idxs) > 0,\
-            #     print(len(bstVw_idxs), tk_nm, mtrc_nm, stp_idx, mtrc_prVw, mtrcPrStpPrVw)
-            """ new code """
-            if len(bstVw_idxs) == 0:
-                bstVw_idxs = list(range(len(VIEWS)))
+                """ old code """
+                # assert len(bstVw_idxs) > 0,\
+                #     print(len(bstVw_idxs), tk_nm, mtrc_nm, stp_idx, mtrc_prVw, mtrcPrStpPrVw)
+                """ new code """
+                if len(bstVw_idxs) == 0:
+                    bstVw_idxs = list(range(len(VIEWS)))
 
-            if scndBstVw_idx is None:
-                scndBstVw_idx = bstVw_idxs[0]
+                if scndBstVw_idx is None:
+                    scndBstVw_idx = bstVw_idxs[0]
 
-            bstVw_idx = np.random.choice(bstVw_idxs)
+                bstVw_idx = np.random.choice(bstVw_idxs)
 
-            lst_mtrc_bstVwCnt[-1][bstVw_idx] += 1
+                lst_mtrc_bstVwCnt[-1][bstVw_idx] += 1
 
 
-            mtrc_bst[-1].append(srtd_mtrc_prVw[0])
+                mtrc_bst[-1].append(srtd_mtrc_prVw[0])
             
-            mtrc_dlBstN2ndBstVw_abs[-1].append(mtrc_prVw[bstVw_idx] - mtrc_prVw[scndBstVw_idx])
-            mtrc_dlBstN2ndBstVw_rlMxMtrcCrrStp[-1].append((mtrc_prVw[bstVw_idx] - mtrc_prVw[scndBstVw_idx])/ max(mtrc_prVw[scndBstVw_idx], 1e-19) * 100)
+                mtrc_dlBstN2ndBstVw_abs[-1].append(mtrc_prVw[bstVw_idx] - mtrc_prVw[scndBstVw_idx])
+                mtrc_dlBstN2ndBstVw_rlMxMtrcCrrStp[-1].append((mtrc_prVw[bstVw_idx] - mtrc_prVw[scndBstVw_idx])/ max(mtrc_prVw[scndBstVw_idx], 1e-19) * 100)
 
-            assert VIEWS[bstVw_idx] in vw_2_tkNm_2_tmstmpNtxt
-            assert tk_nm in vw_2_tkNm_2_tmstmpNtxt[VIEWS[bstVw_idx]]
-            assert stp_idx < len(vw_2_tkNm_2_tmstmpNtxt[VIEWS[bstVw_idx]][tk_nm])
-            assert isinstance(vw_2_tkNm_2_tmstmpNtxt[VIEWS[bstVw_idx]][tk_nm][stp_idx][1], str) 
+                assert VIEWS[bstVw_idx] in vw_2_tkNm_2_tmstmpNtxt
+                assert tk_nm in vw_2_tkNm_2_tmstmpNtxt[VIEWS[bstVw_idx]]
+                assert stp_idx < len(vw_2_tkNm_2_tmstmpNtxt[VIEWS[bstVw_idx]][tk_nm])
+                assert isinstance(vw_2_tkNm_2_tmstmpNtxt[VIEWS[bstVw_idx]][tk_nm][stp_idx][1], str) 
 
-            assert tk_nm in gt_tkNm_2_tmstmpNtxt
-            assert stp_idx < len(gt_tkNm_2_tmstmpNtxt[tk_nm])
+                assert tk_nm in gt_tkNm_2_tmstmpNtxt
+                assert stp_idx < len(gt_tkNm_2_tmstmpNtxt[tk_nm])
             
-            assert scndBstVw_idx is not None, print(scndBstVw_idx)
-            lst_bstMtrcNtkNmNstpIdxNbstVwNprdTxtNgtTxtNscndBstMtrcNscndBstVwNscndBstPrdTxt.append(
-                (
-                 srtd_mtrc_prVw[0], 
-                 tk_nm,
-                 )
-            )
+                assert scndBstVw_idx is not None, print(scndBstVw_idx)
+                lst_bstMtrcNtkNmNstpIdxNbstVwNprdTxtNgtTxtNscndBstMtrcNscndBstVwNscndBstPrdTxt.append(
+                    (
+                     srtd_mtrc_prVw[0], 
+                     tk_nm,
+                     )
+                )
 
-        lst_mtrc_bstVwPrct.append((np.array(lst_mtrc_bstVwCnt[-1]) / max(np.sum(lst_mtrc_bstVwCnt[-1]), 1e-19)) * 100)
+            lst_mtrc_bstVwPrct.append((np.array(lst_mtrc_bstVwCnt[-1]) / max(np.sum(lst_mtrc_bstVwCnt[-1]), 1e-19)) * 100)
+
+        mtrc_2_outputs[mtrc_nm] = lst_bstMtrcNtkNmNstpIdxNbstVwNprdTxtNgtTxtNscndBstMtrcNscndBstVwNscndBstPrdTxt
+    return mtrc_2_outputs
+
+
+def get_captioningScore(outputs):
+    # mean over the segments that have a best view
+    lst_alMtrcs = [ele[0] for ele in outputs if ele[0] != float('-inf')]
+    return float(np.mean(lst_alMtrcs) * 100)
+
+
+# ----------------------- METRICS TABLE ------------------------
+def build_metricsTable(num_workers=TAKE_NUM_WORKERS, cache_dr=PER_VIEW_METRICS_CACHE_DR):
+    """
+    Dense table of the per-view metrics, which don't depend on the view selection model. Segments are the (take, 
+    segment) pairs that are in at least one view, ordered by take and then by gt order.
+    :return: dict w/ "tbl": metric values (num_segments x num_views x num_metrics, nan where a view has no caption 
+             for the segment), "tk_nms": take name per segment, "sgmnt_kys": start and end timestamps per segment 
+             (num_segments x 2), "views", "metrics"
+    """
+    tkNm_2_vwInpts, tkNm_2_vwIdx2rows, tkNm_2_arrs, _, _ = load_viewInputs()
+
+    parse_cache_configKey = get_parseCache_configKey(SPACY_LANG_MOD,
+                                                     [NN2LBL_FP, VRB2LBL_FP, NOUNS_WHITELIST_CSV_PATH, 
+                                                      NOUNS_SENSE_DICT_CSV_PATH, VERBS_SENSE_DICT_CSV_PATH])
+    tkNm_2_vwIdxNmtrc2vls = get_perViewMetrics(tkNm_2_vwInpts, 
+                                               parse_cache_configKey, 
+                                               cache_dr=cache_dr, 
+                                               num_workers=num_workers)
+
+    tk_nms = []
+    sgmnt_kys = []
+    tkNmNrow_2_sgmntIdx = {}
+    for tk_nm, vwIdx2rows in tkNm_2_vwIdx2rows.items():
+        for row in sorted(set(itertools.chain(*vwIdx2rows.values()))):
+            tkNmNrow_2_sgmntIdx[(tk_nm, row)] = len(tk_nms)
+            tk_nms.append(tk_nm)
+            sgmnt_kys.append(tkNm_2_arrs[tk_nm]["sgmnt_kys"][row])
+
+    tbl = np.full((len(tk_nms), len(VIEWS), len(METRICS)), np.nan, dtype=np.float64)
+    for tk_nm, vwIdxNmtrc2vls in tkNm_2_vwIdxNmtrc2vls.items():
+        for vw_idx, mtrc_2_vls in vwIdxNmtrc2vls:
+            sgmnt_idxs = [tkNmNrow_2_sgmntIdx[(tk_nm, row)] for row in tkNm_2_vwIdx2rows[tk_nm][vw_idx]]
+            for mtrc_idx, mtrc_nm in enumerate(METRICS):
+                assert len(mtrc_2_vls[mtrc_nm]) == len(sgmnt_idxs)
+                tbl[sgmnt_idxs, vw_idx, mtrc_idx] = mtrc_2_vls[mtrc_nm]
+
+    return {"tbl": tbl,
+            "tk_nms": np.array(tk_nms),
+            "sgmnt_kys": np.array(sgmnt_kys, dtype=np.float64).reshape(-1, 2),
+            "views": np.array(VIEWS),
+            "metrics": np.array(METRICS),}
+
+
+def dump_metricsTable(mtrcs_tbl, fp):
+    tmp_fp = f"{fp}.tmp_{os.getpid()}.npz"
+    np.savez(tmp_fp, **mtrcs_tbl)
+    os.replace(tmp_fp, fp)
+
+
+def load_metricsTable(fp):
+    with np.load(fp) as fi:
+        return {k: fi[k] for k in fi.files}
+
+
+def get_metricsTable_viewScores(mtrcs_tbl, tkNm2strtNendTmstmp2bstPrdScrPrVw):
+    # predicted view scores in the segment order of the table (num_segments x num_views), nan for segments w/o predictions
+    prd_scrs = np.full(mtrcs_tbl["tbl"].shape[:2], np.nan, dtype=np.float64)
+    for sgmnt_idx, (tk_nm, sgmnt_ky) in enumerate(zip(mtrcs_tbl["tk_nms"].tolist(), mtrcs_tbl["sgmnt_kys"].tolist())):
+        if tk_nm not in tkNm2strtNendTmstmp2bstPrdScrPrVw:
+            continue
+        assert tuple(sgmnt_ky) in tkNm2strtNendTmstmp2bstPrdScrPrVw[tk_nm], print(tk_nm, sgmnt_ky)
+        prd_scrs[sgmnt_idx] = tkNm2strtNendTmstmp2bstPrdScrPrVw[tk_nm][tuple(sgmnt_ky)]
+    return prd_scrs
+
+
+def score_metricsTable(mtrcs_tbl, prd_scrs):
+    """
+    Same scores as get_bestViewOutputs and get_captioningScore, as a gather and mean over the table: per segment the 
+    max metric over the views that aren't masked by get_ntBstEx_idxs, averaged over the segments where such a view 
+    has a caption
+    :param prd_scrs: predicted view scores (num_segments x num_views), nan rows for segments w/o predictions
+    :return: metric name -> score
+    """
+    tbl = mtrcs_tbl["tbl"]
+    assert prd_scrs.shape == tbl.shape[:2], print(prd_scrs.shape, tbl.shape)
+
+    has_prds = ~np.isnan(prd_scrs).any(axis=1)
+    prd_scrs = np.where(has_prds[:, np.newaxis], prd_scrs, 0.)
+    bst_scrs = prd_scrs[np.arange(len(prd_scrs)), np.argmax(prd_scrs, axis=1)]
+    has_cptns = ~np.isnan(tbl[:, :, 0])
+    is_ntBstVw = (bst_scrs[:, np.newaxis] != prd_scrs) & has_cptns
+
+    # get_ntBstEx_idxs per take and view: only the view's first segment of the take is masked
+    is_mskd = np.zeros_like(is_ntBstVw)
+    tk_nms = mtrcs_tbl["tk_nms"]
+    tk_strtIdxs = np.flatnonzero(np.r_[True, tk_nms[1:] != tk_nms[:-1]]) if (len(tk_nms) > 0) else np.zeros(0, dtype=np.int64)
+    for tk_strtIdx, tk_endIdx in zip(tk_strtIdxs, np.r_[tk_strtIdxs[1:], len(tk_nms)]):
+        vw_idxs = np.flatnonzero(is_ntBstVw[tk_strtIdx: tk_endIdx].any(axis=0))
+        is_mskd[tk_strtIdx + np.argmax(has_cptns[tk_strtIdx: tk_endIdx, vw_idxs], axis=0), vw_idxs] = True
+
+    bstVw_vls = np.where(~is_mskd[:, :, np.newaxis] & ~np.isnan(tbl), tbl, float('-inf')).max(axis=1)
+    is_vld = has_prds[:, np.newaxis] & (bstVw_vls != float('-inf'))
+    scrs = np.where(is_vld, bstVw_vls, 0.).sum(axis=0) / is_vld.sum(axis=0) * 100
+
+    return {str(mtrc_nm): float(scr) for mtrc_nm, scr in zip(mtrcs_tbl["metrics"].tolist(), scrs)}
+
+
+def evaluate_predictedViewScores(tkNm2strtNendTmstmp2bstPrdScrPrVw, 
+                                 dmp_dr_fp, 
+                                 num_workers=TAKE_NUM_WORKERS, 
+                                 cache_dr=PER_VIEW_METRICS_CACHE_DR):
+    """
+    Captioning metrics of the views picked by the predicted view scores. The per-view metrics are cached, so 
+    evaluating another checkpoint only redoes the best-view selection and aggregation.
+    :param tkNm2strtNendTmstmp2bstPrdScrPrVw: take -> (start, end) timestamps -> predicted view scores
+    :param dmp_dr_fp: dir for the per-segment outputs and the scores of all metrics
+    :return: metric name -> score
+    """
+    assert ospif(VRB2LBL_FP)
+    assert ospif(NN2LBL_FP)
+    assert ospif(NOUNS_WHITELIST_CSV_PATH)
+    assert ospif(NOUNS_SENSE_DICT_CSV_PATH)
+    assert ospif(VERBS_SENSE_DICT_CSV_PATH)
+
+    print("METRICS: ", METRICS)
+    tkNm_2_vwInpts, tkNm_2_vwIdx2rows, tkNm_2_arrs, vw_2_tkNm_2_tmstmpNtxt, gt_tkNm_2_tmstmpNtxt =\
+        load_viewInputs()
+
+    parse_cache_configKey = get_parseCache_configKey(SPACY_LANG_MOD,
+                                                     [NN2LBL_FP, VRB2LBL_FP, NOUNS_WHITELIST_CSV_PATH, 
+                                                      NOUNS_SENSE_DICT_CSV_PATH, VERBS_SENSE_DICT_CSV_PATH])
+    tkNm_2_vwIdxNmtrc2vls = get_perViewMetrics(tkNm_2_vwInpts, 
+                                               parse_cache_configKey, 
+                                               cache_dr=cache_dr, 
+                                               num_workers=num_workers)
+
+    tkNm_2_ntBstVwMsk = get_ntBstVwMasks(tkNm_2_arrs, tkNm2strtNendTmstmp2bstPrdScrPrVw)
+    mtrc_2_tkNm_2_vlPrStpPrVw = {mtrc_nm: {} for mtrc_nm in ["cider", "meteor", "verb_iou", "noun_iou", "nounChunk_iou",]}
+    for tk_nm, vwIdxNmtrc2vls in tkNm_2_vwIdxNmtrc2vls.items():
+        # takes w/o predicted view scores aren't evaluated
+        if tk_nm not in tkNm_2_ntBstVwMsk:
+            continue
+        vwIdx_2_ntBstEx_idxs = {vw_idx: get_ntBstEx_idxs(tkNm_2_ntBstVwMsk[tk_nm][rows, vw_idx])
+                                for vw_idx, rows in tkNm_2_vwIdx2rows[tk_nm].items()}
+        merge_takeMetrics(mtrc_2_tkNm_2_vlPrStpPrVw, tk_nm, vwIdxNmtrc2vls, vwIdx_2_ntBstEx_idxs)
+
+    mtrc_2_outputs = get_bestViewOutputs(mtrc_2_tkNm_2_vlPrStpPrVw, vw_2_tkNm_2_tmstmpNtxt, gt_tkNm_2_tmstmpNtxt)
 
-    dmp_dr_fp = f"{PRED_RESULTS_ROOT_DR}/{PRED_RESULTS_SUBDIR}/captioningMetrics_files" 
     if not ospid(dmp_dr_fp):
         os.makedirs(dmp_dr_fp)
 
-    json_dmp(lst_bstMtrcNtkNmNstpIdxNbstVwNprdTxtNgtTxtNscndBstMtrcNscndBstVwNscndBstPrdTxt, 
-             f"{dmp_dr_fp}/{mtrc_nm}_outputs.json") 
+    mtrc_2_scr = {}
+    for mtrc_nm, outputs in mtrc_2_outputs.items():
+        json_dmp(outputs, f"{dmp_dr_fp}/{mtrc_nm}_outputs.json")
+        mtrc_2_scr[mtrc_nm] = get_captioningScore(outputs)
+        print(f"{mtrc_nm}: ", mtrc_2_scr[mtrc_nm])
+    json_dmp(mtrc_2_scr, f"{dmp_dr_fp}/captioningScores.json")
+
+    return mtrc_2_scr
+
+
+def main():
+    assert ospid(PRED_RESULTS_ROOT_DR)
+    assert ospif(PRED___TK_NM__2__STRT_N_END_TMSTMP__2__SCORES___FP), print(PRED___TK_NM__2__STRT_N_END_TMSTMP__2__SCORES___FP)
+
+    evaluate_predictedViewScores(pkl_ld(PRED___TK_NM__2__STRT_N_END_TMSTMP__2__SCORES___FP),
+                                 f"{PRED_RESULTS_ROOT_DR}/{PRED_RESULTS_SUBDIR}/captioningMetrics_files")
+
+
+if __name__ == "__main__":
+    main()
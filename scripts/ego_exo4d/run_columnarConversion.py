@@ -0,0 +1,10 @@
+from run_captioningMetrics import convert_toColumnar, COLUMNAR_DATA_DR
+
+
+def main():
+    convert_toColumnar(COLUMNAR_DATA_DR)
+    print(f"Dumped columnar data to {COLUMNAR_DATA_DR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+import argparse
+
+from run_captioningMetrics import (ospif, ospid, pkl_ld, pkl_dmp, json_ld, json_dmp, format_predictedViewScores,
+                                   evaluate_predictedViewScores, build_metricsTable, dump_metricsTable, load_metricsTable,
+                                   get_metricsTable_viewScores, score_metricsTable, PER_VIEW_METRICS_CACHE_DR, 
+                                   TAKE_NUM_WORKERS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Captioning auto-metrics of the views picked by a Lang-View checkpoint on Ego-Exo4D")
+
+    parser.add_argument("--results-filePath", type=str, required=True,
+                        help="test_index2logits_*.json dumped by test.py")
+    parser.add_argument("--testDatapoints-filePath", type=str,
+                        default="../../data/ego_exo4d/labels/test.pkl",
+                        help="Path to file with the test datapoints the results were computed on")
+    parser.add_argument("--dump-dir", type=str, default=None,
+                        help="Dir for the outputs, defaults to captioningMetrics_files next to the results file")
+    parser.add_argument("--dump-predictedViewScores", action="store_true",
+                        help="Also dump take -> (start, end) timestamps -> predicted view scores to the dump dir")
+    parser.add_argument("--perViewMetrics-cacheDir", type=str, default=PER_VIEW_METRICS_CACHE_DR,
+                        help="Dir for the cached per-view metrics, which are shared by all checkpoints")
+    parser.add_argument("--metricsTable-filePath", type=str, default=None,
+                        help="Score w/ the dense per-view metrics table at this path (.npz), building it if missing. "+\
+                             "Only the scores are dumped, not the per-segment outputs")
+    parser.add_argument("--num-workers", type=int, default=TAKE_NUM_WORKERS,
+                        help="Number of processes that score the takes missing in the cache")
+
+    args = parser.parse_args()
+
+    assert ospif(args.results_filePath), print(args.results_filePath)
+    assert ospif(args.testDatapoints_filePath), print(args.testDatapoints_filePath)
+
+    dump_dir = args.dump_dir
+    if dump_dir is None:
+        dump_dir = os.path.join(os.path.dirname(os.path.abspath(args.results_filePath)), "captioningMetrics_files")
+    if not ospid(dump_dir):
+        os.makedirs(dump_dir)
+
+    tkNm2strtNendTmstmp2bstPrdScrPrVw = format_predictedViewScores(pkl_ld(args.testDatapoints_filePath),
+                                                                   json_ld(args.results_filePath))
+    if args.dump_predictedViewScores:
+        pkl_dmp(tkNm2strtNendTmstmp2bstPrdScrPrVw, f"{dump_dir}/take2startNendTimestamp2predScores.pkl")
+
+    if args.metricsTable_filePath is not None:
+        if not ospif(args.metricsTable_filePath):
+            dump_metricsTable(build_metricsTable(num_workers=args.num_workers, cache_dr=args.perViewMetrics_cacheDir),
+                              args.metricsTable_filePath)
+        mtrcs_tbl = load_metricsTable(args.metricsTable_filePath)
+        mtrc_2_scr = score_metricsTable(mtrcs_tbl, get_metricsTable_viewScores(mtrcs_tbl, tkNm2strtNendTmstmp2bstPrdScrPrVw))
+        for mtrc_nm, scr in mtrc_2_scr.items():
+            print(f"{mtrc_nm}: ", scr)
+        json_dmp(mtrc_2_scr, f"{dump_dir}/captioningScores.json")
+    else:
+        evaluate_predictedViewScores(tkNm2strtNendTmstmp2bstPrdScrPrVw,
+                                     dump_dir,
+                                     num_workers=args.num_workers,
+                                     cache_dr=args.perViewMetrics_cacheDir)
+    print(f"Dumped scores to {dump_dir}/captioningScores.json")
+
+
+if __name__ == "__main__":
+    main()
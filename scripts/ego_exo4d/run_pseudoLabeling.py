@@ -0,0 +1,129 @@
+import os
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+
+from run_captioningMetrics import (ospif, ospid, pkl_ld, pkl_dmp, json_ld, get_textKey, ParseCache, CiderD,
+                                   TAKE_NUM_WORKERS)
+
+
+PSEUDO_LABELS_VERSION = 2
+
+
+def get_takeCaptions(tk_nm, tmstmp2lstAtmcDscs, vw_2_tkNm_2_tmstmpNtxt):
+    # captions of all views for the take's segments in datapoint order, None if a view has no captions for the take
+    sgmnt_kys = list(tmstmp2lstAtmcDscs.keys())
+    lst_vwCptns = []
+    for vw, tkNm_2_tmstmpNtxt in vw_2_tkNm_2_tmstmpNtxt.items():
+        if tk_nm not in tkNm_2_tmstmpNtxt:
+            return None
+        tmstmpNtxt = tkNm_2_tmstmpNtxt[tk_nm]
+        assert len(tmstmpNtxt) == len(sgmnt_kys), print(vw, tk_nm, len(tmstmpNtxt), len(sgmnt_kys))
+        for ele_tmstmpNtxt, ky in zip(tmstmpNtxt, sgmnt_kys):
+            assert isinstance(ele_tmstmpNtxt[1], str)
+            if len(ele_tmstmpNtxt) > 5:
+                assert ky[0] == ele_tmstmpNtxt[5][0]
+                assert ky[1] == ele_tmstmpNtxt[5][1]
+        lst_vwCptns.append([ele[1] for ele in tmstmpNtxt])
+    return lst_vwCptns
+
+
+def score_take(rfsNlstVwCptns):
+    """
+    CIDEr of the given views' captions for every segment of a take against the segment's refs, w/ the document 
+    frequencies of the take's refs (as in run_captioningMetrics.py), so a view's scores don't depend on the other views
+    :return: scores per segment, per view
+    """
+    rfs, lst_vwCptns = rfsNlstVwCptns
+    cdr_scrr = CiderD(rfs)
+    return [cdr_scrr.compute_score(vw_cptns)[1].tolist() for vw_cptns in lst_vwCptns]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CIDEr pseudo-labels of the views' captions for training Lang-View")
+
+    parser.add_argument("--datapoints-filePath", type=str, required=True,
+                        help="Take -> (start, end) timestamps -> {'timestamp', 'text', 'startNend_clipName', "+\
+                             "'startNend_frameIdx'}, w/ the reference narrations in 'text'")
+    parser.add_argument("--captions-dir", type=str, required=True,
+                        help="Dir w/ one {view}.json of the captioner's outputs per view")
+    parser.add_argument("--views", type=str, default="ARIA,1,2,3,4",
+                        help="Views in the order of the scores")
+    parser.add_argument("--dump-filePath", type=str, required=True,
+                        help="Pseudo-labels in the format of data/labels/train/*.pkl")
+    parser.add_argument("--cache-dir", type=str, default="captioner_outputData/pseudoLabel_cache",
+                        help="Dir for the cached scores of takes, shared by all captioners")
+    parser.add_argument("--num-workers", type=int, default=TAKE_NUM_WORKERS,
+                        help="Number of processes that score the takes missing in the cache")
+
+    args = parser.parse_args()
+
+    assert ospif(args.datapoints_filePath), print(args.datapoints_filePath)
+    assert ospid(args.captions_dir), print(args.captions_dir)
+
+    views = args.views.split(",")
+    tkNm2tmstmp2lstAtmcDscs = pkl_ld(args.datapoints_filePath)
+    vw_2_tkNm_2_tmstmpNtxt = {}
+    for vw in views:
+        assert ospif(f"{args.captions_dir}/{vw}.json"), print(f"{args.captions_dir}/{vw}.json")
+        vw_2_tkNm_2_tmstmpNtxt[vw] = json_ld(f"{args.captions_dir}/{vw}.json")
+
+    # views of a take are cached by the take's refs and the view's captions, so new takes, or a new captioner of some 
+    # of the views, only score what's new
+    scrs_cache = ParseCache(args.cache_dir,
+                            get_textKey(str(PSEUDO_LABELS_VERSION))[:16],
+                            fl_nm_prefix="pseudoLabels")
+    tkNm_2_rfsNlstVwCptns = {}
+    tkNm_2_vwKys = {}
+    for tk_nm, tmstmp2lstAtmcDscs in tkNm2tmstmp2lstAtmcDscs.items():
+        if len(tmstmp2lstAtmcDscs) == 0:
+            continue
+        lst_vwCptns = get_takeCaptions(tk_nm, tmstmp2lstAtmcDscs, vw_2_tkNm_2_tmstmpNtxt)
+        if lst_vwCptns is None:
+            continue
+        rfs = [list(v['text']) for v in tmstmp2lstAtmcDscs.values()]
+        tkNm_2_rfsNlstVwCptns[tk_nm] = (rfs, lst_vwCptns)
+        tkNm_2_vwKys[tk_nm] = [get_textKey(json.dumps([rfs, vw_cptns])) for vw_cptns in lst_vwCptns]
+    tkNm_2_vwIdxsToScore = {tk_nm: [vw_idx for vw_idx, vw_ky in enumerate(vw_kys) if vw_ky not in scrs_cache]
+                            for tk_nm, vw_kys in tkNm_2_vwKys.items()}
+    tkNms_toScore = [tk_nm for tk_nm, vw_idxs in tkNm_2_vwIdxsToScore.items() if len(vw_idxs) > 0]
+    num_tkVws = sum([len(vw_kys) for vw_kys in tkNm_2_vwKys.values()])
+    num_tkVwsToScore = sum([len(vw_idxs) for vw_idxs in tkNm_2_vwIdxsToScore.values()])
+    print(f"PSEUDO-LABEL CACHE: {num_tkVws - num_tkVwsToScore} / {num_tkVws} views of takes in {scrs_cache.fp}")
+
+    if len(tkNms_toScore) > 0:
+        # the takes' views that aren't cached, scored together per take
+        rfsNlstVwCptns = [(tkNm_2_rfsNlstVwCptns[tk_nm][0], [tkNm_2_rfsNlstVwCptns[tk_nm][1][vw_idx] for vw_idx in tkNm_2_vwIdxsToScore[tk_nm]])
+                          for tk_nm in tkNms_toScore]
+        if args.num_workers > 1:
+            with ProcessPoolExecutor(max_workers=args.num_workers) as executor:
+                lst_tkScrs = list(tqdm(executor.map(score_take, rfsNlstVwCptns, chunksize=8), total=len(tkNms_toScore)))
+        else:
+            lst_tkScrs = [score_take(ele) for ele in tqdm(rfsNlstVwCptns)]
+        for tk_nm, lst_vwScrs in zip(tkNms_toScore, lst_tkScrs):
+            for vw_idx, vw_scrs in zip(tkNm_2_vwIdxsToScore[tk_nm], lst_vwScrs):
+                scrs_cache.put(tkNm_2_vwKys[tk_nm][vw_idx], vw_scrs)
+        scrs_cache.dump()
+
+    dmp_dct = {}
+    for tk_nm in tkNm_2_rfsNlstVwCptns:
+        # per view scores per segment -> per segment scores per view
+        tk_scrs = [list(sgmnt_scrs) for sgmnt_scrs in zip(*[scrs_cache.get(vw_ky) for vw_ky in tkNm_2_vwKys[tk_nm]])]
+        dmp_dct[tk_nm] = {}
+        for ky, sgmnt_scrs in zip(tkNm2tmstmp2lstAtmcDscs[tk_nm], tk_scrs):
+            v = tkNm2tmstmp2lstAtmcDscs[tk_nm][ky]
+            dmp_dct[tk_nm][(v['timestamp'], ky[0], ky[1])] = {'scores': sgmnt_scrs,
+                                                               'startNend_clipName': v['startNend_clipName'],
+                                                               'startNend_frameIdx': v['startNend_frameIdx'],
+                                                               'timestamp': v['timestamp'],}
+
+    dump_dr = os.path.dirname(os.path.abspath(args.dump_filePath))
+    if not ospid(dump_dr):
+        os.makedirs(dump_dr)
+    pkl_dmp(dmp_dct, args.dump_filePath)
+    print(f"Dumped pseudo-labels of {len(dmp_dct)} takes to {args.dump_filePath}")
+
+
+if __name__ == "__main__":
+    main()
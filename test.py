@@ -1,5 +1,6 @@
 from datasets.dataset import test_dataset
 from trainer import test
+from datasets.utils import SharedFramesLoader
 from common.dist_utils import *
 from common.utils import *
 
@@ -20,6 +21,8 @@ def main():
 	parser.add_argument("--run-dir", type=str, default="runs/DIRNAME", help="Run directory")
 	parser.add_argument("--checkpoint-fileName", type=str, default="valBestCkpt_maxCaptioningScore")
 	parser.add_argument("--data-parallel", action="store_true", help="Test w/ DataParallel")
+	parser.add_argument("--use-inferenceCkpt", action="store_true", help="Load the weights-only checkpoint, exporting it from the full checkpoint if missing or stale")
+	parser.add_argument("--inferenceCkpt-fp16", action="store_true", help="Store exported weights-only checkpoint in fp16")
 
 	parser.add_argument('--batch-size', type=int, default=64, help='Batch size')
 	parser.add_argument("--num-workers", type=int, default=4, help="Number of workers")
@@ -36,10 +39,20 @@ def main():
 	parser.add_argument("--task-type", type=str, default='classify_oneHot', help="Task type from ['classify_oneHot', 'match_dist',]")
 
 	parser.add_argument("--all-views", type=list_of_strs__or__str, default='aria,1,2,3,4', help="List of all views")
+	parser.add_argument("--allow-missingViews", action="store_true",
+						help="Mask out the views w/o inputs (cameras missing in a take) instead of failing on them")
 	parser.add_argument("--num-frames", type=int, default=8, help="Number of frames (default: 8)")
 	parser.add_argument("--frame-height", type=int, default=224, help="Frame height (default: 224)")
 	parser.add_argument("--frame-width", type=int, default=224, help="Frame width (default: 224)")
 	parser.add_argument("--dont-square-frames", action="store_true")
+	parser.add_argument("--dont-keyframeAware-decode", action="store_true",
+						help="Seek to every sampled frame instead of decoding a clip sequentially when that is cheaper")
+	parser.add_argument("--sharedMemory-uint8Frames", action="store_true",
+						help="Send uint8 frames from the dataloader workers through shared memory and normalize them on the device")
+	parser.add_argument("--compile", action="store_true",
+						help="torch.compile the video encoder and the policy")
+	parser.add_argument("--compile-mode", type=str, default=None,
+						help="Mode for torch.compile (e.g. 'reduce-overhead', 'max-autotune'), default if not set")
 
 	parser.add_argument('--unfreeze-videoEncoder', action="store_true")
 	parser.add_argument("--videoEncoder-dropout", type=float, default=0.)
@@ -87,6 +100,12 @@ def main():
 
 	parser.add_argument("--distributed", action="store_true", help="Run distributed")
 
+	parser.add_argument("--quantize-int8", action="store_true", help="Test on CPU w/ dynamically int8-quantized linear layers")
+	parser.add_argument("--quantize-calibDatapoints-filePath", type=none_or_str,
+						default="data/ego_exo4d/labels/val/videoLlama_cider_all3Agree.pkl",
+						help="Path to file with datapoints for checking int8 best-view agreement w/ fp32 ('None' to skip)")
+	parser.add_argument("--quantize-numCalibBatches", type=int, default=4)
+
 	args = parser.parse_args()
 	print(args)
 	print("-" * 80)
@@ -102,10 +121,25 @@ def main():
 											 num_workers=args.num_workers,	
 											 drop_last=False,
 											 )	
+	if args.sharedMemory_uint8Frames:
+		test_loader = SharedFramesLoader(test_loader)
+
+	calib_loader = None
+	if args.quantize_int8 and (args.quantize_calibDatapoints_filePath is not None):
+		calib_data = test_dataset(args, **dict(vars(args), testDatapoints_filePath=args.quantize_calibDatapoints_filePath))
+		calib_loader = torch.utils.data.DataLoader(calib_data,
+												   batch_size=args.batch_size,
+												   shuffle=False,
+												   num_workers=args.num_workers,
+												   drop_last=False,
+												   )
+		if args.sharedMemory_uint8Frames:
+			calib_loader = SharedFramesLoader(calib_loader)
 
 	assert os.path.isdir(args.run_dir)
 
 	test(test_loader,
+		calib_loader=calib_loader,
 		**vars(args))
 
 
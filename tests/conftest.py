@@ -0,0 +1,6 @@
+import os
+import sys
+
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, REPO_ROOT)
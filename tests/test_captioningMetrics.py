@@ -0,0 +1,131 @@
+import os
+import sys
+import contextlib
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@contextlib.contextmanager
+def hfDatasets_imports():
+    # the repo's datasets package (on sys.path for the other tests) shadows the huggingface datasets that evaluate imports
+    repo_mdls = {nm: mdl for nm, mdl in sys.modules.items() if (nm == "datasets") or nm.startswith("datasets.")}
+    for nm in repo_mdls:
+        del sys.modules[nm]
+    sys_path = list(sys.path)
+    sys.path[:] = [pth for pth in sys.path if os.path.abspath(pth or os.curdir) != REPO_ROOT]
+    try:
+        yield
+    finally:
+        sys.path[:] = sys_path
+        for nm in [nm for nm in sys.modules if (nm == "datasets") or nm.startswith("datasets.")]:
+            del sys.modules[nm]
+        sys.modules.update(repo_mdls)
+
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("nltk")
+pytest.importorskip("spacy")
+pytest.importorskip("pandas")
+with hfDatasets_imports():
+    evaluate = pytest.importorskip("evaluate")
+
+sys.path.insert(0, os.path.join(REPO_ROOT, "scripts/ego_exo4d"))
+import run_captioningMetrics
+
+
+# synthetic segments, w/ one and several refs, exact / partial / no overlap, repeated and out-of-order words
+GTS = [["C picks up the knife from the table."],
+       ["C cuts the onion on the board.", "C slices an onion with a knife."],
+       ["C stirs the pan with the spoon."],
+       ["C holds the bike wheel with the left hand.", "C spins the wheel.", "C checks the tire."],
+       ["C pours water into the bowl."],]
+RES = ["C picks up the knife from the table.",
+       "C cuts onion with a knife on the board.",
+       "the spoon stirs C the pan pan.",
+       "C holds the tire.",
+       "C throws the ball.",]
+
+
+def test_meteorBatched_matchesPerCaptionScorer():
+    try:
+        with hfDatasets_imports():
+            mtr_scrr = evaluate.load('meteor')
+    except Exception as e:
+        pytest.skip(f"evaluate's meteor metric can't be loaded: {e}")
+
+    # the per-caption calls the metrics pipeline made before MeteorBatched
+    lst_perCaptionScores = [mtr_scrr.compute(references=[refs], predictions=[pred])['meteor'] for refs, pred in zip(GTS, RES)]
+
+    for num_processes in [1, 2]:
+        mean_score, scores = run_captioningMetrics.MeteorBatched(num_processes=num_processes, chunksize=2).compute_score(GTS, RES)
+        assert scores.tolist() == lst_perCaptionScores
+        assert mean_score == pytest.approx(sum(lst_perCaptionScores) / len(lst_perCaptionScores))
+
+
+@pytest.mark.parametrize("res", [RES,
+                                 # a hypothesis w/o any n-gram, and one w/ only n-grams that aren't in the refs
+                                 RES[:3] + ["", "xyz uvw"],])
+def test_ciderD_matchesCider(res):
+    # the takes are scored separately, w/ the document frequencies of their own segments
+    for tk_sgmntIdxs in [list(range(len(GTS))), [0, 1], [2, 3, 4], [4]]:
+        gts = [GTS[sgmnt_idx] for sgmnt_idx in tk_sgmntIdxs]
+        hyps = [res[sgmnt_idx] for sgmnt_idx in tk_sgmntIdxs]
+
+        # the per-take calls the metrics pipeline made before CiderD
+        cdr_scr, cdr_scrs = run_captioningMetrics.Cider().compute_score({idx: refs for idx, refs in enumerate(gts)},
+                                                                          {idx: [hyp] for idx, hyp in enumerate(hyps)})
+        cdrD_scr, cdrD_scrs = run_captioningMetrics.CiderD(gts).compute_score(hyps)
+        assert cdrD_scrs.tolist() == np.array(cdr_scrs).tolist()
+        assert cdrD_scr == pytest.approx(cdr_scr)
+
+
+def get_syntheticViewInputs(seed):
+    """
+    Per-view metrics of 3 takes in the format of load_viewInputs and get_perViewMetrics, w/ values and predicted view 
+    scores from a few levels, so that views tie on both. The last view has no caption for the last segment of take 
+    "b" (merge_takeMetrics lines the views up by their segment order, so only trailing captions can be missing), and 
+    take "c" has no predicted view scores
+    """
+    rng = np.random.RandomState(seed)
+    views, metrics = run_captioningMetrics.VIEWS, run_captioningMetrics.METRICS
+    tkNm_2_numSgmnts = {"a": 4, "b": 3, "c": 2}
+
+    tkNm_2_vwInpts, tkNm_2_vwIdx2rows, tkNm_2_arrs, vw_2_tkNm_2_tmstmpNtxt, gt_tkNm_2_tmstmpNtxt = {}, {}, {}, {}, {}
+    tkNm_2_vwIdxNmtrc2vls, tkNm2strtNendTmstmp2bstPrdScrPrVw = {}, {}
+    for tk_nm, num_sgmnts in tkNm_2_numSgmnts.items():
+        sgmnt_kys = [(float(sgmnt_idx), float(sgmnt_idx + 1)) for sgmnt_idx in range(num_sgmnts)]
+        tkNm_2_arrs[tk_nm] = {"sgmnt_kys": sgmnt_kys, "ky_2_row": {ky: row for row, ky in enumerate(sgmnt_kys)}}
+        gt_tkNm_2_tmstmpNtxt[tk_nm] = [[ky[0], ["gt"], ky] for ky in sgmnt_kys]
+        tkNm_2_vwInpts[tk_nm], tkNm_2_vwIdx2rows[tk_nm], tkNm_2_vwIdxNmtrc2vls[tk_nm] = [], {}, []
+        for vw_idx, vw in enumerate(views):
+            rows = list(range(num_sgmnts - 1 if ((tk_nm == "b") and (vw_idx == len(views) - 1)) else num_sgmnts))
+            vw_2_tkNm_2_tmstmpNtxt.setdefault(vw, {})[tk_nm] = [[sgmnt_kys[row][0], f"{vw} caption"] for row in rows]
+            tkNm_2_vwInpts[tk_nm].append((vw_idx, [f"{vw} caption"] * len(rows), [["gt"]] * len(rows)))
+            tkNm_2_vwIdx2rows[tk_nm][vw_idx] = rows
+            tkNm_2_vwIdxNmtrc2vls[tk_nm].append((vw_idx, {mtrc_nm: rng.choice([0., 0.25, 0.5], size=len(rows)).tolist() 
+                                                          for mtrc_nm in metrics}))
+        if tk_nm != "c":
+            tkNm2strtNendTmstmp2bstPrdScrPrVw[tk_nm] = {ky: rng.choice([0.1, 0.2], size=len(views)).tolist() for ky in sgmnt_kys}
+
+    return (tkNm_2_vwInpts, tkNm_2_vwIdx2rows, tkNm_2_arrs, vw_2_tkNm_2_tmstmpNtxt, gt_tkNm_2_tmstmpNtxt),\
+            tkNm_2_vwIdxNmtrc2vls, tkNm2strtNendTmstmp2bstPrdScrPrVw
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_scoreMetricsTable_matchesBestViewOutputs(seed, tmp_path, monkeypatch):
+    viewInputs, tkNm_2_vwIdxNmtrc2vls, tkNm2strtNendTmstmp2bstPrdScrPrVw = get_syntheticViewInputs(seed)
+    # the per-view metrics and their inputs are given, w/o the files they're loaded from
+    monkeypatch.setattr(run_captioningMetrics, "load_viewInputs", lambda: viewInputs)
+    monkeypatch.setattr(run_captioningMetrics, "get_perViewMetrics", lambda *args, **kwargs: tkNm_2_vwIdxNmtrc2vls)
+    monkeypatch.setattr(run_captioningMetrics, "get_parseCache_configKey", lambda *args: "")
+    monkeypatch.setattr(run_captioningMetrics, "ospif", lambda fp: True)
+
+    # merge_takeMetrics -> get_bestViewOutputs -> get_captioningScore
+    mtrc_2_scr = run_captioningMetrics.evaluate_predictedViewScores(tkNm2strtNendTmstmp2bstPrdScrPrVw, str(tmp_path / "outputs"))
+
+    mtrcs_tbl = run_captioningMetrics.build_metricsTable()
+    assert np.isnan(mtrcs_tbl["tbl"]).sum() == len(run_captioningMetrics.METRICS)
+    prd_scrs = run_captioningMetrics.get_metricsTable_viewScores(mtrcs_tbl, tkNm2strtNendTmstmp2bstPrdScrPrVw)
+    assert run_captioningMetrics.score_metricsTable(mtrcs_tbl, prd_scrs) == pytest.approx(mtrc_2_scr, rel=1e-12)
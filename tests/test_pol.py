@@ -0,0 +1,145 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("timm")
+pytest.importorskip("einops")
+
+from models import pol
+from common.utils import quantize_linearLayers_int8
+
+
+ALL_VIEWS = ["aria", "1", "2", "3", "4"]
+
+
+def get_kwargs(**kwargs):
+    # the flags of train.py that pol_v1 reads
+    return dict({"recog_arc": "egovlp_v2",
+                 "num_frames": 8,
+                 "all_views": ALL_VIEWS,
+                 "use_transformerPol": True,
+                 "linearLayer_dims": [64],
+                 "linearLayer_dropout": 0.,
+                 "task_type": "classify_oneHot",},
+                **kwargs)
+
+
+def test_quantizeInt8_transformerPol_forward():
+    torch.manual_seed(0)
+    model = pol.pol_v1(get_kwargs()).eval()
+    model_int8 = quantize_linearLayers_int8(model)
+    feats = torch.rand((3, len(ALL_VIEWS) * 768))
+    with torch.no_grad():
+        out = model_int8(feats)
+    assert out.shape == (3, len(ALL_VIEWS))
+    # the classifier is quantized, the view transformer's FFNs aren't
+    assert not isinstance(model_int8.classifier[0], torch.nn.Linear)
+    assert type(model_int8.transformer_pol.layers[0].linear1) is torch.nn.Linear
+
+
+@pytest.mark.parametrize("addPE_transformerPol", [False, True])
+def test_transformerPol_repeatedForwards(addPE_transformerPol):
+    torch.manual_seed(0)
+    model = pol.pol_v1(get_kwargs(addPE_transformerPol=addPE_transformerPol))
+    for train_mode in [True, False]:
+        model.train(train_mode)
+        for batch_size in [4, 4, 2]:
+            feats = torch.rand((batch_size, len(ALL_VIEWS) * 768))
+            with torch.no_grad():
+                out = model(feats)
+            assert out.shape == (batch_size, len(ALL_VIEWS))
+            if addPE_transformerPol:
+                assert model.pos_embed.shape == (1, len(ALL_VIEWS), 768)
+    assert "pos_embed" not in model.state_dict()
+
+
+def test_transformerPol_loadsSeqFirstStateDict():
+    torch.manual_seed(0)
+    model = pol.pol_v1(get_kwargs(addPE_transformerPol=True)).eval()
+
+    # the view transformer of the checkpoints saved before batch_first
+    seqFirst_transformerPol = torch.nn.TransformerEncoder(torch.nn.TransformerEncoderLayer(d_model=768, nhead=8, dropout=0.),
+                                                          num_layers=2,
+                                                          enable_nested_tensor=False).eval()
+    state_dict = {k: v for k, v in model.state_dict().items() if not k.startswith("transformer_pol.")}
+    for k, v in seqFirst_transformerPol.state_dict().items():
+        state_dict["transformer_pol." + k] = v
+    model.load_state_dict(state_dict, strict=True)
+
+    feats = torch.rand((3, len(ALL_VIEWS) * 768))
+    with torch.no_grad():
+        out = model(feats)
+        seqFirst_feats = feats.reshape((3, len(ALL_VIEWS), 768)) + model.pos_embed
+        seqFirst_feats = seqFirst_transformerPol(seqFirst_feats.permute((1, 0, 2))).permute((1, 0, 2))
+        seqFirst_out = model.classifier(seqFirst_feats.reshape((3, -1)))
+    assert torch.allclose(out, seqFirst_out, atol=1e-5)
+
+
+def get_viewMask():
+    # the 2nd datapoint has all its views
+    return torch.tensor([[True, False, True, False, True],
+                         [True, True, True, True, True],
+                         [False, True, True, True, False]])
+
+
+@pytest.mark.parametrize("use_transformerPol", [False, True])
+def test_pol_viewMask(use_transformerPol):
+    torch.manual_seed(0)
+    model = pol.pol_v1(get_kwargs(use_transformerPol=use_transformerPol)).eval()
+    view_mask = get_viewMask()
+    feats = torch.rand((3, len(ALL_VIEWS), 768))
+    # the datasets' inputs of the missing views are zeros
+    feats = feats * view_mask.unsqueeze(-1)
+    with torch.no_grad():
+        out = model(feats.reshape((3, -1)))
+        out_allPresent = model(feats.reshape((3, -1)), view_mask=torch.ones_like(view_mask))
+        out_masked = model(feats.reshape((3, -1)), view_mask=view_mask)
+    assert torch.allclose(out, out_allPresent, atol=1e-5)
+    assert torch.all(out_masked[~view_mask] == pol.MASKED_VIEW_LOGIT)
+    assert torch.allclose(out_masked[1], out[1], atol=1e-5)
+
+    if use_transformerPol:
+        # the missing views are masked out of the attention, so their inputs don't matter
+        with torch.no_grad():
+            out_masked_otherInputs = model((feats + torch.rand_like(feats) * ~view_mask.unsqueeze(-1)).reshape((3, -1)),
+                                           view_mask=view_mask)
+        assert torch.allclose(out_masked, out_masked_otherInputs, atol=1e-5)
+
+
+@pytest.mark.parametrize("use_relativeCameraPoseLoss, relativeCameraPoseLoss_refType", [(False, "first_view"),
+                                                                                           (True, "first_view"),
+                                                                                           (True, "all_views"),])
+def test_videoEncoder_viewMask(use_relativeCameraPoseLoss, relativeCameraPoseLoss_refType):
+    torch.manual_seed(0)
+    # a 1-layer EgoVLPv2 w/o a checkpoint, in eval mode so that the batch norms don't depend on the other views
+    vid_encoder = pol.videoEncoder(get_kwargs(vidEncoder_ckptPath=None,
+                                              egovlpV2_depth=1,
+                                              use_relativeCameraPoseLoss=use_relativeCameraPoseLoss,
+                                              relativeCameraPoseLoss_refType=relativeCameraPoseLoss_refType,
+                                              relativeCameraPoseLoss_rotationInAngles=True,
+                                              relativeCameraPoseLoss_rotationAsClasses=True,
+                                              relativeCameraPoseLoss_coordsAsClasses=True,)).eval()
+    view_mask = get_viewMask()[[0, 1]]
+    frames = torch.rand((2, len(ALL_VIEWS), 8, 224, 224, 3))
+    with torch.no_grad():
+        outs = vid_encoder(frames)
+        outs_allPresent = vid_encoder(frames, view_mask=torch.ones_like(view_mask))
+        outs_masked = vid_encoder(frames, view_mask=view_mask)
+    if not use_relativeCameraPoseLoss:
+        outs, outs_allPresent, outs_masked = (outs,), (outs_allPresent,), (outs_masked,)
+
+    for out, out_allPresent in zip(outs, outs_allPresent):
+        assert torch.allclose(out, out_allPresent, atol=1e-5)
+
+    # the present views' features don't change, the missing views' are zeros
+    feats, feats_masked = outs[0].reshape((2, len(ALL_VIEWS), -1)), outs_masked[0].reshape((2, len(ALL_VIEWS), -1))
+    assert torch.allclose(feats_masked[view_mask], feats[view_mask], atol=1e-5)
+    assert torch.all(feats_masked[~view_mask] == 0)
+
+    if use_relativeCameraPoseLoss:
+        # as do the relative camera poses between two present views
+        if relativeCameraPoseLoss_refType == "all_views":
+            relCameraPose_mask = (view_mask.unsqueeze(2) & view_mask.unsqueeze(1)).reshape((2, -1))
+        else:
+            relCameraPose_mask = view_mask & view_mask[:, :1]
+        assert outs_masked[1].shape == outs[1].shape
+        assert torch.allclose(outs_masked[1][relCameraPose_mask], outs[1][relCameraPose_mask], atol=1e-4)
@@ -0,0 +1,31 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+pytest.importorskip("tqdm")
+
+from datasets.dataset import ValCache
+
+
+def test_valCache_namedInputs(tmp_path):
+    frames = np.random.randint(0, 256, size=(3, 2, 4, 8, 8, 3), dtype=np.uint8)
+    gt_relCameraPose = np.random.rand(3, 2, 4, 5).astype(np.float32)
+    has_relCameraPose = np.array([True, False, True])
+
+    val_cache = ValCache(str(tmp_path), {"num_samples": 3})
+    for strt_idx in [0, 2]:
+        rows = slice(strt_idx, strt_idx + 2)
+        val_cache.put(strt_idx, frames[rows], 3)
+        val_cache.put(strt_idx, gt_relCameraPose[rows], 3, name="gt_relCameraPose")
+        val_cache.put(strt_idx, has_relCameraPose[rows], 3, name="has_relCameraPose")
+        # the frames mark the cache as complete, once all inputs are in place
+        assert not val_cache.is_complete()
+    val_cache.finish()
+    assert val_cache.is_complete()
+
+    val_cache = ValCache(str(tmp_path), {"num_samples": 3})
+    assert val_cache.is_complete()
+    for idx in range(3):
+        assert torch.equal(val_cache.get(idx), torch.from_numpy(frames[idx]))
+        assert torch.equal(val_cache.get(idx, name="gt_relCameraPose"), torch.from_numpy(gt_relCameraPose[idx]))
+        assert bool(val_cache.get(idx, name="has_relCameraPose")) == has_relCameraPose[idx]
@@ -0,0 +1,229 @@
+import os
+import pickle
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+pytest.importorskip("tqdm")
+
+from datasets.dataset import select_viewScores, get_datapointViewMask, fill_missingViews, mask_missingViewScores
+
+
+def get_datapoint(take_name="take"):
+    return {"take_name": take_name,
+            "startNend_clipName": ("0", "1"),
+            "startNend_frameIdx": (10, 20),
+            "startNend_timestamp": (1.5, 1.0, 2.0),}
+
+
+@pytest.mark.parametrize("all_views, expected", [(["aria", "1", "2", "3", "4"], [0., 1., 2., 3., 4.]),
+                                                 (["1", "2", "3", "4"], [1., 2., 3., 4.]),
+                                                 (["aria", "3"], [0., 3.]),
+                                                 (["4", "aria", "2"], [4., 0., 2.]),
+                                                 (["fpv1", "master"], [0., 1., 2., 3., 4.]),])
+def test_selectViewScores(all_views, expected):
+    assert select_viewScores([0., 1., 2., 3., 4.], all_views) == expected
+
+
+def test_selectViewScores_multiPseudolabler():
+    scores = [[0., 1., 2., 3., 4.], [5., 6., 7., 8., 9.]]
+    assert select_viewScores(scores, ["aria", "2"]) == [[0., 2.], [5., 7.]]
+
+
+def test_datapointViewMask_datapointClips(tmp_path):
+    dtpnt = get_datapoint()
+    for vw in ["aria", "2"]:
+        os.makedirs(tmp_path / vw / "take")
+        (tmp_path / vw / "take" / "0_1__10_20__1.0_2.0.mp4").touch()
+
+    vw_msk = get_datapointViewMask(dtpnt, ["aria", "1", "2"], datapoint_videoClips_dir=str(tmp_path))
+    assert vw_msk.tolist() == [True, False, True]
+
+    with pytest.raises(AssertionError):
+        get_datapointViewMask(dtpnt, ["3", "4"], datapoint_videoClips_dir=str(tmp_path))
+
+
+def test_datapointViewMask_takeVideoFeats():
+    vw_msk = get_datapointViewMask(get_datapoint(), ["aria", "1", "2"], camId2featName={"aria": "a.pt", "2": "b.pt"})
+    assert vw_msk.tolist() == [True, False, True]
+
+
+def test_fillMissingViews():
+    frms = torch.ones((2, 3))
+    al_frms = fill_missingViews([None, frms, None], torch.zeros_like)
+    assert torch.equal(torch.stack(al_frms), torch.stack([torch.zeros_like(frms), frms, torch.zeros_like(frms)]))
+
+
+def test_maskMissingViewScores():
+    scores = [0.2, 0.9, 0.5]
+    # w/ every view present, the scores are returned as is
+    assert mask_missingViewScores(scores, np.array([True, True, True])) is scores
+
+    masked_scores = mask_missingViewScores(scores, np.array([True, False, True]))
+    assert np.argmax(masked_scores) == 2
+    assert np.isneginf(masked_scores[1])
+
+    masked_scores = mask_missingViewScores([scores, scores], np.array([True, False, True]))
+    assert np.isneginf(masked_scores[:, 1]).all()
+    assert torch.softmax(torch.tensor(masked_scores), dim=1)[:, 1].eq(0).all()
+
+
+
+def get_testDataset(tmp_path, labels={"scores": [0.1, 0.2, 0.9, 0.3, 0.4]}, present_views=["aria", "2"], **kwargs):
+    from datasets.dataset import test_dataset
+
+    os.makedirs(tmp_path)
+    dtpnts_fp = tmp_path / "datapoints.pkl"
+    with open(dtpnts_fp, "wb") as fo:
+        pickle.dump({"take": {(1.5, 1.0, 2.0): dict({"startNend_clipName": ("0", "1"),
+                                                     "startNend_frameIdx": (10, 20),
+                                                     "timestamp": 1.5,}, **labels)}}, fo)
+    for vw in present_views:
+        os.makedirs(tmp_path / vw / "take")
+        (tmp_path / vw / "take" / "0_1__10_20__1.0_2.0.mp4").touch()
+
+    return test_dataset(None, **dict({"batch_size": 1,
+                                      "all_views": ["aria", "1", "2"],
+                                      "num_frames": 8,
+                                      "frame_height": 224,
+                                      "frame_width": 224,
+                                      "testDatapoints_filePath": str(dtpnts_fp),
+                                      "recog_arc": "egovlp_v2",
+                                      "task_type": "classify_oneHot",
+                                      "use_datapointVideoClips": True,
+                                      "datapoint_videoClips_dir": str(tmp_path),}, **kwargs))
+
+
+def test_dataset_viewMasks_optIn(tmp_path):
+    pytest.importorskip("torchvision")
+
+    # views are only looked up (once, when the dataset is built) w/ --allow-missingViews
+    assert get_testDataset(tmp_path / "default").view_masks is None
+
+    dtst = get_testDataset(tmp_path / "allow_missingViews", allow_missingViews=True)
+    assert dtst.view_masks.tolist() == [[True, False, True]]
+    # the labels skip the missing views, the datapoint's scores are over all_views
+    assert dtst.lst_dtpnts[0]["scores"] == [0.1, 0.2, 0.9]
+
+
+def test_dataset_dropsMissingBestExoViews(tmp_path):
+    pytest.importorskip("torchvision")
+
+    kwargs = {"present_views": ["2", "3"],
+              "all_views": ["1", "2", "3"],
+              "task_type": "classify_multiHot_bestExoPred",
+              "allow_missingViews": True,}
+    dtst = get_testDataset(tmp_path / "some_missing", labels={"best_exo_views": ["1", "3"]}, **kwargs)
+    assert dtst.lst_dtpnts[0]["best_exo_views"] == ["3"]
+
+    with pytest.raises(AssertionError):
+        get_testDataset(tmp_path / "all_missing", labels={"best_exo_views": ["1"]}, **kwargs)
+
+
+def test_relCameraPoseMask():
+    pytest.importorskip("timm")
+    pytest.importorskip("einops")
+    from trainer import get_relCameraPoseMask, get_numRelCameraPoses
+
+    view_mask = torch.tensor([[True, False, True], [False, True, True], [True, True, True]])
+    has_relCameraPose = torch.tensor([True, True, False])
+    # each view relative to the first one, which is missing in the 2nd datapoint; the 3rd has no camera poses
+    assert get_relCameraPoseMask(view_mask, has_relCameraPose).tolist() == [[True, False, True],
+                                                                             [False, False, False],
+                                                                             [False, False, False]]
+    assert get_numRelCameraPoses(has_relCameraPose, view_mask) == 2
+    # each pair of views, in the (ref view, view) order of videoEncoder
+    assert get_relCameraPoseMask(view_mask, has_relCameraPose, "all_views").tolist() ==\
+                [[True, False, True, False, False, False, True, False, True],
+                 [False, False, False, False, True, True, False, True, True],
+                 [False] * 9]
+    assert get_numRelCameraPoses(has_relCameraPose, view_mask, "all_views") == 8
+    assert get_numRelCameraPoses(torch.ones(3, dtype=torch.bool), torch.ones((3, 3), dtype=torch.bool), "all_views") == 27
+
+
+def test_viewMaskedBceLoss():
+    pytest.importorskip("timm")
+    pytest.importorskip("einops")
+    import torch.nn.functional as F
+    from trainer import get_viewMaskedBceLoss
+
+    out = torch.tensor([[0.5, -1e4, 2.], [1., -1., 0.]])
+    label = torch.tensor([[1., 0., 0.], [0., 1., 0.]])
+    view_mask = torch.tensor([[True, False, True], [True, True, True]])
+    assert torch.allclose(get_viewMaskedBceLoss(out, label), F.binary_cross_entropy(torch.sigmoid(out), label))
+    # the mean over the 5 present views
+    loss = get_viewMaskedBceLoss(out, label, view_mask)
+    assert torch.allclose(loss, F.binary_cross_entropy(torch.sigmoid(out[view_mask]), label[view_mask]))
+    # the same as w/o a mask when every view is present
+    assert torch.allclose(get_viewMaskedBceLoss(out[1:], label[1:], view_mask[1:]),
+                          F.binary_cross_entropy(torch.sigmoid(out[1:]), label[1:]))
+
+
+def get_trainBatch(view_mask, num_frames=8):
+    # a train_dataset batch of the classify_oneHot task w/ the relative camera pose loss, the labels are present views
+    batch_size, num_views = view_mask.shape
+    frames = torch.rand((batch_size, num_views, num_frames, 224, 224, 3)) * view_mask[:, :, None, None, None, None]
+    label = torch.argmax(view_mask.float() * torch.rand(view_mask.shape), dim=1)
+    captioning_scores = torch.rand((batch_size, 1, num_views)).masked_fill(~view_mask.unsqueeze(1), -float("inf"))
+    gt_relCameraPose = torch.cat([torch.randint(0, 180, (batch_size, num_views, num_frames, 2)),
+                                  torch.randint(0, 180, (batch_size, num_views, num_frames, 3))], dim=-1).float()
+    return frames, view_mask, label, torch.nn.functional.one_hot(label, num_views).float(), captioning_scores,\
+            torch.ones((batch_size, num_views)), gt_relCameraPose, torch.ones(batch_size, dtype=torch.bool)
+
+
+def test_trainStep_mixedViewMasks(tmp_path, capsys):
+    pytest.importorskip("timm")
+    pytest.importorskip("einops")
+    import argparse
+    import re
+    import trainer
+
+    torch.manual_seed(0)
+    # one epoch of one batch where one take misses a view and the other has all of them
+    train_loader = [get_trainBatch(torch.tensor([[True, False, True], [True, True, True]]))]
+    val_loader = [get_trainBatch(torch.tensor([[False, True, True], [True, True, True]]))]
+    trainer.train_n_val(train_loader,
+                        val_loader,
+                        None,
+                        argparse.Namespace(distributed=False),
+                        **{"run_dir": str(tmp_path),
+                           "epochs": 1,
+                           "num_trainSamples": 2,
+                           "num_valSamples": 2,
+                           "batch_size": 2,
+                           "frame_height": 224,
+                           "frame_width": 224,
+                           "distributed": False,
+                           "data_parallel": False,
+                           "num_workers": 0,
+                           "task_type": "classify_oneHot",
+                           "recog_arc": "egovlp_v2",
+                           "vidEncoder_ckptPath": None,
+                           "num_frames": 8,
+                           "all_views": ["aria", "1", "2"],
+                           "egovlpV2_depth": 1,
+                           "unfreeze_videoEncoder": True,
+                           "use_transformerPol": True,
+                           "linearLayer_dims": [64],
+                           "linearLayer_dropout": 0.,
+                           "lr": 1e-4,
+                           "weight_decay": 0.,
+                           "trainDatapoints_filePath": "train.pkl",
+                           "valDatapoints_filePath": "val.pkl",
+                           "use_minMultiHotLoss": True,
+                           "use_relativeCameraPoseLoss": True,
+                           "maskOut_invalidRelativeCameraPoseLoss_inTraining": True,
+                           "relativeCameraPoseLoss_rotationInAngles": True,
+                           "relativeCameraPoseLoss_rotationAsClasses": True,
+                           "relativeCameraPoseLoss_coordsInAngles": True,
+                           "relativeCameraPoseLoss_coordsAsClasses": True,})
+
+    # a label or a pose pair on a missing view would give losses of the order of -MASKED_VIEW_LOGIT
+    out = capsys.readouterr().out
+    for split in ["Train", "Val"]:
+        losses = re.search(split + r": loss -- ([-\w.]+), loss_relCameraPose -- ([-\w.]+),", out).groups()
+        assert all(0 < float(loss) < 100 for loss in losses), print(split, losses)
+
+    ckpt = torch.load(tmp_path / "data" / "valLastCkpt.pth", map_location="cpu")
+    for state_dict in [ckpt["model"], ckpt["video_encoder"]]:
+        assert all(torch.isfinite(vl).all() for vl in state_dict.values() if vl.is_floating_point())
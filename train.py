@@ -1,5 +1,6 @@
 from datasets.dataset import train_dataset, val_dataset
 from trainer import train_n_val
+from datasets.utils import SharedFramesLoader
 from common.dist_utils import *
 from common.utils import *
 
@@ -14,18 +15,23 @@ import torch.distributed as dist
 from torch.utils.tensorboard import SummaryWriter
 
 
-def main():
-	warnings.filterwarnings("ignore")
-
+def get_parser():
 	parser = argparse.ArgumentParser(description = "Lang-View training on Ego-Exo4D")
 
 	parser.add_argument("--seed", dest="seed", type=int, default=0, help="Random seed value")
 	parser.add_argument("--run-dir", type=str, default="runs/DIRNAME", help="Run directory")
 	parser.add_argument("--data-parallel", action="store_true", help="Train w/ DataParallel")
 	parser.add_argument("--log-tb", action="store_true", help="Log tensorboard")
+	parser.add_argument("--save-inferenceCkpt", action="store_true", help="Also save weights-only copies of the best checkpoints")
+	parser.add_argument("--inferenceCkpt-fp16", action="store_true", help="Store weights-only checkpoints in fp16")
+	parser.add_argument("--async-ckptSaving", action="store_true", help="Write checkpoints on a background thread")
+	parser.add_argument("--ckpt-fsync", type=str, default="file", choices=["none", "file", "all"], help="Checkpoint fsync policy")
 
 	parser.add_argument("--epochs", type=int, default=5000, help='Number of epochs')
 	parser.add_argument('--batch-size', type=int, default=24, help='Batch size')
+	parser.add_argument("--microBatch-size", type=int, default=None,
+						help="Split every batch into micro-batches of this size (a divisor of --batch-size) and accumulate their gradients for one optimizer step. "+\
+							 "Changes the results: the policy's batch norms normalize w/ micro-batch statistics and update their running stats per micro-batch")
 	parser.add_argument("--num-workers", type=int, default=4, help="Number of workers")
 	parser.add_argument("--num-trainSamples", type=int, default=12000, help="Number of train samples per epoch")
 	parser.add_argument("--num-trainIterations", type=int, default=47, help="Number of distributed train iterations per epoch")
@@ -53,10 +59,34 @@ def main():
 	parser.add_argument("--randomize-trainViewOrder", action="store_true")
 
 	parser.add_argument("--all-views", type=list_of_strs__or__str, default='aria,1,2,3,4', help="List of all views")
+	parser.add_argument("--allow-missingViews", action="store_true",
+						help="Mask out the views w/o inputs (cameras missing in a take) instead of failing on them")
 	parser.add_argument("--num-frames", type=int, default=8, help="Number of frames (default: 8)")
 	parser.add_argument("--frame-height", type=int, default=224, help="Frame height (default: 224)")
 	parser.add_argument("--frame-width", type=int, default=224, help="Frame width (default: 224)")
 	parser.add_argument("--dont-square-frames", action="store_true")
+	parser.add_argument("--dont-keyframeAware-decode", action="store_true",
+						help="Seek to every sampled frame instead of decoding a clip sequentially when that is cheaper")
+	parser.add_argument("--sharedMemory-uint8Frames", action="store_true",
+						help="Send uint8 frames from the dataloader workers through shared memory and normalize them on the device")
+	parser.add_argument("--compile", action="store_true",
+						help="torch.compile the video encoder and the policy")
+	parser.add_argument("--compile-mode", type=str, default=None,
+						help="Mode for torch.compile (e.g. 'reduce-overhead', 'max-autotune'), default if not set")
+	parser.add_argument("--profile-stages", action="store_true",
+						help="Time the stages of the train loop, print their means and log their histograms to tensorboard every epoch")
+	parser.add_argument("--profile-syncCuda", action="store_true",
+						help="Synchronize CUDA between the profiled stages, so that they're charged w/ their kernels' time")
+	parser.add_argument("--profile-dir", type=str, default=None,
+						help="Dir for torch.profiler traces of the first train epoch (not traced if not set)")
+	parser.add_argument("--profile-schedule", type=list_of_ints, default="5,2,5",
+						help="Wait, warmup and active iterations of the torch.profiler schedule")
+	parser.add_argument("--dataWait-starvationThreshold", type=float, default=0.2,
+						help="Flag dataloader starvation when waiting for data is more than this fraction of the train time")
+	parser.add_argument("--valCache-dir", type=str, default=None,
+						help="Dir for a memory-mapped cache of the preprocessed val inputs, built before the first epoch (no caching if not set)")
+	parser.add_argument("--valCache-feats", action="store_true",
+						help="Cache the frozen video encoder's features of the val datapoints instead of their uint8 frames")
 	parser.add_argument("--frame-horizontalFlip", action="store_true",)
 	parser.add_argument("--frame-colorJitter", type=list_of_floats, default="0.0,0.0,0.0")
 
@@ -131,7 +161,17 @@ def main():
 	parser.add_argument("--dist-url", type=str, default="env://")
 	parser.add_argument("--world-size", type=int, default=1)
 
+	return parser
+
+
+def main():
+	warnings.filterwarnings("ignore")
+
+	parser = get_parser()
 	args = parser.parse_args()
+	if (args.microBatch_size is not None) and ((args.microBatch_size < 1) or (args.batch_size % args.microBatch_size != 0)):
+		# a smaller last micro-batch, e.g. of 1 datapoint, which the policy's batch norms can't normalize in training
+		parser.error(f"--batch-size {args.batch_size} must be a multiple of --microBatch-size {args.microBatch_size}")
 
 	seed = args.seed 
 	if args.distributed:
@@ -171,6 +211,10 @@ def main():
 												 drop_last=True,
 												 )	
 
+		if args.sharedMemory_uint8Frames:
+			train_loader = SharedFramesLoader(train_loader)
+			val_loader = SharedFramesLoader(val_loader)
+
 	if (not os.path.isdir(args.run_dir)) and is_main_process(args):
 		os.makedirs(args.run_dir)
 
@@ -3,13 +3,14 @@ from common.utils import *
 from common.dist_utils import *
 from common.logger import *
 from datasets.utils import *
+from datasets.dataset import ValCache
 
 import os
+import time
+import hashlib
 import numpy as np
 from tqdm import tqdm
 
-import cv2 as cv
-
 import torch
 import torch.distributed as dist
 from torch.utils.data import DataLoader, DistributedSampler
@@ -45,6 +46,13 @@ def train_n_val(train_loader,
 	num_samples = kwargs["num_trainSamples"]
 	num_valSamples = kwargs["num_valSamples"]
 	batch_size = kwargs["batch_size"]
+	micro_batch_size = kwargs["microBatch_size"] if ("microBatch_size" in kwargs) else None
+
+	profile_stages = kwargs["profile_stages"] if ("profile_stages" in kwargs) else False
+	profile_syncCuda = kwargs["profile_syncCuda"] if ("profile_syncCuda" in kwargs) else False
+	profile_dir = kwargs["profile_dir"] if ("profile_dir" in kwargs) else None
+	profile_schedule = kwargs["profile_schedule"] if ("profile_schedule" in kwargs) else [5, 2, 5]
+	dataWait_starvationThreshold = kwargs["dataWait_starvationThreshold"] if ("dataWait_starvationThreshold" in kwargs) else 0.2
 
 	optimizer_type = kwargs["optimizer_type"] if ("optimizer_type" in kwargs) else "adam_w"
 	assert optimizer_type in ["adam_w", "adam"]
@@ -78,6 +86,12 @@ def train_n_val(train_loader,
 	task_type = kwargs['task_type']
 	recog_arc = kwargs["recog_arc"]
 	unfreeze_videoEncoder = kwargs["unfreeze_videoEncoder"] if ("unfreeze_videoEncoder" in kwargs) else False
+	compile_models = kwargs["compile"] if ("compile" in kwargs) else False
+	compile_mode = kwargs["compile_mode"] if ("compile_mode" in kwargs) else None
+	valCache_dir = kwargs["valCache_dir"] if ("valCache_dir" in kwargs) else None
+	valCache_feats = kwargs["valCache_feats"] if ("valCache_feats" in kwargs) else False
+	if valCache_feats:
+		assert (valCache_dir is not None) and (not unfreeze_videoEncoder)
 
 	assert task_type in ['classify_oneHot', 'match_dist', 'classify_oneHot_bestExoPred', 'classify_multiHot_bestExoPred']
 	task_isBestExoPred = task_type in ['classify_oneHot_bestExoPred', 'classify_multiHot_bestExoPred']
@@ -121,6 +135,7 @@ def train_n_val(train_loader,
 	maskOut_invalidRelativeCameraPoseLoss_inTraining = kwargs["maskOut_invalidRelativeCameraPoseLoss_inTraining"] if ("maskOut_invalidRelativeCameraPoseLoss_inTraining" in kwargs) else False
 	relativeCameraPoseLoss_lossType = kwargs["relativeCameraPoseLoss_lossType"] if ("relativeCameraPoseLoss_lossType" in kwargs) else 'l2'	
 	relativeCameraPoseLoss_lossWeight = kwargs["relativeCameraPoseLoss_lossWeight"] if ("relativeCameraPoseLoss_lossWeight" in kwargs) else 1.0
+	relativeCameraPoseLoss_refType = kwargs["relativeCameraPoseLoss_refType"] if ("relativeCameraPoseLoss_refType" in kwargs) else "first_view"
 	if use_relativeCameraPoseLoss:
 		assert unfreeze_videoEncoder and (recog_arc in ["egovlp_v2"])
 
@@ -153,6 +168,20 @@ def train_n_val(train_loader,
 		vid_encoder = pol.videoEncoder(kwargs)
 	model = pol.pol_v1(kwargs)
 
+	if (micro_batch_size is not None) and (micro_batch_size < batch_size):
+		lst_batchNormNms = [nm for module in [vid_encoder, model] for nm, sub_module in module.named_modules()
+							if isinstance(sub_module, nn.modules.batchnorm._BatchNorm)]
+		if len(lst_batchNormNms) > 0:
+			# accumulated gradients match an unsplit batch only w/o batch norms
+			print(f"WARNING: --microBatch-size {micro_batch_size} < --batch-size {batch_size} changes the results: "+\
+				  f"{len(lst_batchNormNms)} batch norm layers ({', '.join(lst_batchNormNms)}) normalize w/ micro-batch "+\
+				  "statistics and update their running stats once per micro-batch")
+
+	if compile_models:
+		warn_compileViewMasks(kwargs)
+		compile_module(vid_encoder, mode=compile_mode)
+		compile_module(model, mode=compile_mode)
+
 	if kwargs["distributed"]:
 		vid_encoder = vid_encoder.to(device)
 		model = model.to(device)
@@ -244,6 +273,17 @@ def train_n_val(train_loader,
 		else:
 			max_acc = min_loss
 
+	if valCache_dir is not None:
+		build_valCache(val_loader.dataset if hasattr(val_loader, "dataset") else val_loader,
+					   vid_encoder,
+					   device,
+					   valCache_dir,
+					   cache_feats=valCache_feats,
+					   batch_size=batch_size,
+					   num_workers=kwargs["num_workers"],
+					   input_frame_norm_type=recog_arc,
+					   args=args if kwargs["distributed"] else None)
+
 	if kwargs["distributed"]:
 		dist.barrier()
 
@@ -281,6 +321,11 @@ def train_n_val(train_loader,
 		    drop_last=False,
 		)
 
+		if train_loader.dataset.frames_ring is not None:
+			train_loader = SharedFramesLoader(train_loader)
+		if val_loader.dataset.frames_ring is not None:
+			val_loader = SharedFramesLoader(val_loader)
+
 		train_loader = PrefetchLoader(train_loader)
 		val_loader = PrefetchLoader(val_loader)
 
@@ -288,7 +333,31 @@ def train_n_val(train_loader,
 		val_loader = IterLoader(val_loader, use_distributed=True)
 
 
+	async_ckptSaving = kwargs["async_ckptSaving"] if ("async_ckptSaving" in kwargs) else False
+	async_ckptWriter = None
+	if async_ckptSaving and is_main_process(args):
+		async_ckptWriter = AsyncCheckpointWriter()
+
+	stage_timer = StageTimer(enabled=profile_stages, sync_cuda=profile_syncCuda)
+	profiler = None
+	if (profile_dir is not None) and is_main_process(args):
+		# traces of the first train epoch's iterations in the schedule, for tensorboard's profiler plugin
+		assert len(profile_schedule) == 3, print(profile_schedule)
+		profiler = torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU] +\
+														([torch.profiler.ProfilerActivity.CUDA] if device.type == "cuda" else []),
+										  schedule=torch.profiler.schedule(wait=profile_schedule[0],
+																		   warmup=profile_schedule[1],
+																		   active=profile_schedule[2],
+																		   repeat=1),
+										  on_trace_ready=torch.profiler.tensorboard_trace_handler(profile_dir),
+										  record_shapes=True)
+		profiler.start()
+
 	for epoch in range(start_epoch, num_epochs):
+		if async_ckptWriter is not None:
+			# raises if the previous epoch's checkpoint could not be written
+			async_ckptWriter.check()
+
 		print(f"Epoch {epoch + 1} out of {num_epochs} epochs")
 		if unfreeze_videoEncoder:
 			vid_encoder.train()
@@ -312,33 +381,35 @@ def train_n_val(train_loader,
 			for captioner_idx in range(len(train_captioningScores)):
 				metric_logger.add_meter(f"captioning_score_{captioner_idx + 1}", SmoothedValue(window_size=1, fmt="{value:.4f}", args=args))
 
-		for ele_idx, loader_ele in enumerate(tqdm(train_loader)):
+		optimizer.zero_grad()
+		for ele_idx, loader_ele, btch_loaderEle, is_lastMicroBatch in iter_microBatches(tqdm(train_loader), micro_batch_size):
 			if kwargs["distributed"]:
 				if ele_idx >= num_trainIters:
 					break
+			stage_timer.start_iteration()
 
 			if task_type in ["classify_oneHot", "match_dist", "classify_oneHot_bestExoPred"]:
 				if use_relativeCameraPoseLoss:
 					if egoVlpV2_vis2textSim_labler:
-						frames, label, label_multiHot, captioning_scores, captioning_scores_actual, class_wts, gt_relCameraPose, has_relCameraPose = loader_ele
+						frames, view_mask, label, label_multiHot, captioning_scores, captioning_scores_actual, class_wts, gt_relCameraPose, has_relCameraPose = loader_ele
 					else:
-						frames, label, label_multiHot, captioning_scores, class_wts, gt_relCameraPose, has_relCameraPose = loader_ele
+						frames, view_mask, label, label_multiHot, captioning_scores, class_wts, gt_relCameraPose, has_relCameraPose = loader_ele
 				else:
 					if egoVlpV2_vis2textSim_labler:
-						frames, label, label_multiHot, captioning_scores, captioning_scores_actual, class_wts = loader_ele
+						frames, view_mask, label, label_multiHot, captioning_scores, captioning_scores_actual, class_wts = loader_ele
 					else:
-						frames, label, label_multiHot, captioning_scores, class_wts = loader_ele
+						frames, view_mask, label, label_multiHot, captioning_scores, class_wts = loader_ele
 			else:
 				if use_relativeCameraPoseLoss:
 					if egoVlpV2_vis2textSim_labler:
-						frames, label, captioning_scores, captioning_scores_actual, class_wts, gt_relCameraPose, has_relCameraPose = loader_ele
+						frames, view_mask, label, captioning_scores, captioning_scores_actual, class_wts, gt_relCameraPose, has_relCameraPose = loader_ele
 					else:
-						frames, label, captioning_scores, class_wts, gt_relCameraPose, has_relCameraPose = loader_ele
+						frames, view_mask, label, captioning_scores, class_wts, gt_relCameraPose, has_relCameraPose = loader_ele
 				else:
 					if egoVlpV2_vis2textSim_labler:
-						frames, label, captioning_scores, captioning_scores_actual, class_wts = loader_ele
+						frames, view_mask, label, captioning_scores, captioning_scores_actual, class_wts = loader_ele
 					else:
-						frames, label, captioning_scores, class_wts = loader_ele
+						frames, view_mask, label, captioning_scores, class_wts = loader_ele
 
 			if kwargs["distributed"]:
 				frames = prepare_sample(frames, cuda_enabled=device.type=="cuda")
@@ -364,6 +435,11 @@ def train_n_val(train_loader,
 				if use_relativeCameraPoseLoss:
 					gt_relCameraPose = gt_relCameraPose.to(device)
 					has_relCameraPose = has_relCameraPose.to(device)
+			view_mask = get_viewMask(view_mask, device)
+
+			# uint8 frames (--sharedMemory-uint8Frames) are normalized here, or after color jitter if it's used
+			frames = prepare_frames(frames, input_frame_norm_type=recog_arc, normalize=(train_transforms_normalize is None))
+			stage_timer.lap("host_to_device")
 
 			if use_relativeCameraPoseLoss:
 				gt_relCameraPose_coords = None
@@ -396,16 +472,22 @@ def train_n_val(train_loader,
 				frames = train_transforms_normalize(frames)
 				frames = frames.reshape((frames.shape[0], bs, num_frames, -1, frames.shape[2], frames.shape[3]))	# -> 3, 4, 5, 8, 224, 224 
 				frames = frames.permute((1, 2, 3, 4, 5, 0))
+			stage_timer.lap("color_jitter")
+
+			# the gradients of all but a batch's last micro-batch are only accumulated, w/o the DDP all-reduce
+			noSync_ctxt = no_sync([] if is_lastMicroBatch else [vid_encoder, model])
 
 			if unfreeze_videoEncoder:
 				if use_relativeCameraPoseLoss:
-					feats, feats_relCameraPose = vid_encoder(frames)
+					feats, feats_relCameraPose = encode_views(vid_encoder, frames, view_mask=view_mask)
 				else:
-					feats = vid_encoder(frames)
+					feats = encode_views(vid_encoder, frames, view_mask=view_mask)
 			else:
 				with torch.no_grad():
-					feats = vid_encoder(frames).detach()
-			out = model(feats)
+					feats = encode_views(vid_encoder, frames, view_mask=view_mask).detach()
+			stage_timer.lap("encoder_forward")
+			out = model(feats, view_mask=view_mask)
+			stage_timer.lap("policy_forward")
 			if task_type in ["classify_oneHot", "classify_oneHot_bestExoPred"]:
 				if use_minMultiHotLoss or use_randMultiHotLoss:
 					for idx_label_multiHot, ele_label_multiHot in enumerate(label_multiHot):
@@ -445,7 +527,7 @@ def train_n_val(train_loader,
 
 					loss /= len(label_multiHot)
 				elif use_bceMultiHotLoss:
-					loss = F.binary_cross_entropy(torch.sigmoid(out), label_multiHot,)
+					loss = get_viewMaskedBceLoss(out, label_multiHot, view_mask)
 				elif use_klLoss:
 					captioning_scores_label = torch.mean(F.softmax(captioning_scores, dim=2), dim=1)
 					loss = F.kl_div(F.log_softmax(out, dim=1), captioning_scores_label, reduction='batchmean')
@@ -461,7 +543,7 @@ def train_n_val(train_loader,
 			elif task_type == "classify_multiHot_bestExoPred":
 				if balanceCLasses_inLoss:
 					raise NotImplementedError
-				loss = F.binary_cross_entropy(torch.sigmoid(out), label,)
+				loss = get_viewMaskedBceLoss(out, label, view_mask)
 
 			if use_relativeCameraPoseLoss:
 				if relativeCameraPoseLoss_rotationAsClasses:
@@ -523,16 +605,34 @@ def train_n_val(train_loader,
 				else:
 					raise ValueError
 
-				loss_relCameraPose = loss_relCameraPose.reshape((loss_relCameraPose.shape[0], -1)) * has_relCameraPose.unsqueeze(1)
-				loss_relCameraPose = torch.sum(loss_relCameraPose) / (max(torch.sum(has_relCameraPose).item(), 1) * loss_relCameraPose.shape[1])
-
-				total_loss = loss + relativeCameraPoseLoss_lossWeight * loss_relCameraPose
+				if view_mask is None:
+					loss_relCameraPose = loss_relCameraPose.reshape((loss_relCameraPose.shape[0], -1)) * has_relCameraPose.unsqueeze(1)
+					loss_relCameraPose = torch.sum(loss_relCameraPose) / (max(torch.sum(has_relCameraPose).item(), 1) * loss_relCameraPose.shape[1])
+				else:
+					relCameraPose_mask = get_relCameraPoseMask(view_mask, has_relCameraPose, relativeCameraPoseLoss_refType)
+					loss_relCameraPose = loss_relCameraPose.reshape((relCameraPose_mask.shape[0], relCameraPose_mask.shape[1], -1)) *\
+											relCameraPose_mask.unsqueeze(2)
+					loss_relCameraPose = torch.sum(loss_relCameraPose) /\
+											(max(torch.sum(relCameraPose_mask).item(), 1) * loss_relCameraPose.shape[2])
+
+			# the losses are means over the micro-batch, reweighted so that the micro-batches' gradients sum up to the
+			# gradients of the mean over the whole batch
+			loss_scale = len(label) / len(btch_loaderEle[0])
+			if use_relativeCameraPoseLoss:
+				loss_relCameraPose_scale = max(get_numRelCameraPoses(loader_ele[-1], loader_ele[1], relativeCameraPoseLoss_refType), 1) /\
+											max(get_numRelCameraPoses(btch_loaderEle[-1], btch_loaderEle[1], relativeCameraPoseLoss_refType), 1)
+				total_loss = loss * loss_scale + relativeCameraPoseLoss_lossWeight * loss_relCameraPose * loss_relCameraPose_scale
 			else:
-				total_loss = loss
+				total_loss = loss * loss_scale
+			stage_timer.lap("loss")
 
-			optimizer.zero_grad()
-			total_loss.backward()	
-			optimizer.step()
+			total_loss.backward()
+			noSync_ctxt.close()
+			stage_timer.lap("backward")
+			if is_lastMicroBatch:
+				optimizer.step()
+				optimizer.zero_grad()
+				stage_timer.lap("optimizer_step")
 
 			if task_type in ["classify_oneHot", "match_dist",]: 
 				if task_type in ["match_dist",]:
@@ -597,6 +697,26 @@ def train_n_val(train_loader,
 				train_numSamples += len(label)
 				if use_relativeCameraPoseLoss:
 					train_numSamples_relCameraPose += torch.sum(has_relCameraPose).item()
+			stage_timer.lap("metrics")
+			if profiler is not None:
+				# exporting the traces can take a while, which isn't data wait
+				profiler.step()
+				stage_timer.lap("profiler")
+			stage_timer.end_iteration()
+
+		if profiler is not None:
+			profiler.stop()
+			profiler = None
+
+		stage_2_msNfrac = stage_timer.summarize()
+		if profile_stages:
+			print("Train stages: " + ", ".join([f"{stage} -- {ms:.1f}ms ({100 * frac:.1f}%)" for stage, (ms, frac) in stage_2_msNfrac.items()]))
+		if stage_timer.is_starved(dataWait_starvationThreshold):
+			print(f"DATALOADER STARVATION: waiting for data is {100 * stage_2_msNfrac['data_wait'][1]:.1f}% of the train time "+\
+				  f"(> {100 * dataWait_starvationThreshold:.0f}%), consider more --num-workers or --sharedMemory-uint8Frames")
+		if profile_stages and (writer is not None) and (len(stage_2_msNfrac) > 0):
+			stage_timer.log_tensorboard(writer, epoch, prefix="Stages_train")
+		stage_timer.reset()
 
 		if kwargs["distributed"]:
 			metric_logger.synchronize_between_processes()
@@ -663,25 +783,25 @@ def train_n_val(train_loader,
 			if task_type in ["classify_oneHot", "match_dist", "classify_oneHot_bestExoPred"]:
 				if use_relativeCameraPoseLoss:	# use_relativeCameraPoseLoss / False
 					if egoVlpV2_vis2textSim_labler:
-						frames, label, label_multiHot, captioning_scores, captioning_scores_actual, class_wts, gt_relCameraPose, has_relCameraPose = loader_ele
+						frames, view_mask, label, label_multiHot, captioning_scores, captioning_scores_actual, class_wts, gt_relCameraPose, has_relCameraPose = loader_ele
 					else:
-						frames, label, label_multiHot, captioning_scores, class_wts, gt_relCameraPose, has_relCameraPose = loader_ele
+						frames, view_mask, label, label_multiHot, captioning_scores, class_wts, gt_relCameraPose, has_relCameraPose = loader_ele
 				else:
 					if egoVlpV2_vis2textSim_labler:
-						frames, label, label_multiHot, captioning_scores, captioning_scores_actual, class_wts = loader_ele
+						frames, view_mask, label, label_multiHot, captioning_scores, captioning_scores_actual, class_wts = loader_ele
 					else:
-						frames, label, label_multiHot, captioning_scores, class_wts = loader_ele
+						frames, view_mask, label, label_multiHot, captioning_scores, class_wts = loader_ele
 			else:
 				if use_relativeCameraPoseLoss:	# use_relativeCameraPoseLoss / False
 					if egoVlpV2_vis2textSim_labler:
-						frames, label, captioning_scores, captioning_scores_actual, class_wts, gt_relCameraPose, has_relCameraPose = loader_ele
+						frames, view_mask, label, captioning_scores, captioning_scores_actual, class_wts, gt_relCameraPose, has_relCameraPose = loader_ele
 					else:
-						frames, label, captioning_scores, class_wts, gt_relCameraPose, has_relCameraPose = loader_ele
+						frames, view_mask, label, captioning_scores, class_wts, gt_relCameraPose, has_relCameraPose = loader_ele
 				else:
 					if egoVlpV2_vis2textSim_labler:
-						frames, label, captioning_scores, captioning_scores_actual, class_wts = loader_ele
+						frames, view_mask, label, captioning_scores, captioning_scores_actual, class_wts = loader_ele
 					else:
-						frames, label, captioning_scores, class_wts = loader_ele
+						frames, view_mask, label, captioning_scores, class_wts = loader_ele
 
 			if kwargs["distributed"]:
 				frames = prepare_sample(frames, cuda_enabled=device.type=="cuda")
@@ -707,6 +827,9 @@ def train_n_val(train_loader,
 				captioning_scores =  captioning_scores.to(device)
 				if egoVlpV2_vis2textSim_labler:
 					captioning_scores_actual = captioning_scores_actual.to(device)
+			view_mask = get_viewMask(view_mask, device)
+
+			frames = prepare_frames(frames, input_frame_norm_type=recog_arc)
 
 			if use_relativeCameraPoseLoss:
 				gt_relCameraPose_coords = None
@@ -729,12 +852,15 @@ def train_n_val(train_loader,
 
 			with torch.no_grad():
 				if use_relativeCameraPoseLoss:
-					feats, feats_relCameraPose = vid_encoder(frames)
+					feats, feats_relCameraPose = encode_views(vid_encoder, frames, view_mask=view_mask)
 					feats_relCameraPose = feats_relCameraPose.detach()
+				elif valCache_feats:
+					# the val cache holds the frozen video encoder's features
+					feats = frames
 				else:
-					feats = vid_encoder(frames)
+					feats = encode_views(vid_encoder, frames, view_mask=view_mask)
 				feats = feats.detach()
-				out = model(feats)
+				out = model(feats, view_mask=view_mask)
 
 			if task_type in ["classify_oneHot", "classify_oneHot_bestExoPred"]:
 				if use_minMultiHotLoss or use_randMultiHotLoss:
@@ -759,7 +885,7 @@ def train_n_val(train_loader,
 
 					loss /= len(label_multiHot)
 				elif use_bceMultiHotLoss:
-					loss = F.binary_cross_entropy(torch.sigmoid(out), label_multiHot,)
+					loss = get_viewMaskedBceLoss(out, label_multiHot, view_mask)
 				elif use_klLoss:
 					captioning_scores_label = torch.mean(F.softmax(captioning_scores, dim=2), dim=1)
 					loss = F.kl_div(F.log_softmax(out, dim=1), captioning_scores_label, reduction='batchmean')
@@ -774,7 +900,7 @@ def train_n_val(train_loader,
 			elif task_type == "classify_multiHot_bestExoPred":
 				if balanceCLasses_inLoss:
 					raise NotImplementedError
-				loss = F.binary_cross_entropy(torch.sigmoid(out), label,)
+				loss = get_viewMaskedBceLoss(out, label, view_mask)
 
 			if use_relativeCameraPoseLoss:	# use_relativeCameraPoseLoss / False
 				if relativeCameraPoseLoss_rotationAsClasses:
@@ -827,8 +953,15 @@ def train_n_val(train_loader,
 				else:
 					raise ValueError
 
-				loss_relCameraPose = loss_relCameraPose.reshape((loss_relCameraPose.shape[0], -1)) * has_relCameraPose.unsqueeze(1)
-				loss_relCameraPose = torch.sum(loss_relCameraPose) / (max(torch.sum(has_relCameraPose).item(), 1) * loss_relCameraPose.shape[1])
+				if view_mask is None:
+					loss_relCameraPose = loss_relCameraPose.reshape((loss_relCameraPose.shape[0], -1)) * has_relCameraPose.unsqueeze(1)
+					loss_relCameraPose = torch.sum(loss_relCameraPose) / (max(torch.sum(has_relCameraPose).item(), 1) * loss_relCameraPose.shape[1])
+				else:
+					relCameraPose_mask = get_relCameraPoseMask(view_mask, has_relCameraPose, relativeCameraPoseLoss_refType)
+					loss_relCameraPose = loss_relCameraPose.reshape((relCameraPose_mask.shape[0], relCameraPose_mask.shape[1], -1)) *\
+											relCameraPose_mask.unsqueeze(2)
+					loss_relCameraPose = torch.sum(loss_relCameraPose) /\
+											(max(torch.sum(relCameraPose_mask).item(), 1) * loss_relCameraPose.shape[2])
 
 			if task_type in ["classify_oneHot", "match_dist",]:
 				if task_type in ["match_dist",]:
@@ -977,12 +1110,155 @@ def train_n_val(train_loader,
 							  is_bestLoss=is_bestLoss,
 							  best_captioningScores=max_captioningScores,
 							  is_bestCaptioningScores=is_bestCaptioningScores,
+							  async_writer=async_ckptWriter,
 							  )
 
 		print("-" * 80)
 
+	if async_ckptWriter is not None:
+		async_ckptWriter.close()
+
+
+def get_stateDict_key(module):
+	# content hash of a module's weights
+	hasher = hashlib.sha1()
+	for ky, vl in module.state_dict().items():
+		hasher.update(ky.encode("utf-8"))
+		hasher.update(vl.detach().cpu().contiguous().reshape(-1).view(torch.uint8).numpy().tobytes())
+	return hasher.hexdigest()
+
+
+def get_viewMask(view_mask, device):
+	# B x num_views view mask of a batch -> None when no view is missing, so the models take their unmasked paths
+	if bool(view_mask.all()):
+		return None
+	return view_mask.to(device)
+
+
+def warn_compileViewMasks(kwargs):
+	# see compile_module, the masked batches' shapes depend on their number of present views
+	if ("allow_missingViews" in kwargs) and kwargs["allow_missingViews"]:
+		print("WARNING: --compile w/ --allow-missingViews recompiles the video encoder for every new number of present "+\
+			  "views in a batch, and runs it eagerly once torch._dynamo's cache size limit is reached")
+
+
+def encode_views(vid_encoder, frames, view_mask=None):
+	# pre-extracted features skip the video encoder (nn.Identity), pol_v1 masks their missing views
+	if (view_mask is None) or isinstance(getattr(vid_encoder, "module", vid_encoder), nn.Identity):
+		return vid_encoder(frames)
+	return vid_encoder(frames, view_mask=view_mask)
+
+
+def get_viewMaskedBceLoss(out, label, view_mask=None):
+	# BCE averaged over the present views only
+	if view_mask is None:
+		return F.binary_cross_entropy(torch.sigmoid(out), label,)
+	loss = F.binary_cross_entropy(torch.sigmoid(out), label, reduction="none") * view_mask
+	return torch.sum(loss) / max(torch.sum(view_mask).item(), 1)
+
+
+def get_relCameraPoseMask(view_mask, has_relCameraPose, refType="first_view"):
+	"""
+	B x num_views view mask -> B x num_pose_predictions mask of the relative camera pose predictions (in videoEncoder's 
+	order) of the takes w/ camera poses between two present views: each view relative to the first one, or w/ all_views, 
+	each pair of views
+	"""
+	view_mask = view_mask.bool()
+	if refType == "all_views":
+		relCameraPose_mask = (view_mask.unsqueeze(2) & view_mask.unsqueeze(1)).reshape((view_mask.shape[0], -1))
+	else:
+		relCameraPose_mask = view_mask & view_mask[:, :1]
+	return relCameraPose_mask & has_relCameraPose.bool().unsqueeze(1)
+
+
+def get_numRelCameraPoses(has_relCameraPose, view_mask, refType="first_view"):
+	# number of relative camera pose predictions the pose loss averages over
+	return torch.sum(get_relCameraPoseMask(view_mask, has_relCameraPose, refType)).item()
+
+
+def build_valCache(val_data,
+				   vid_encoder,
+				   device,
+				   valCache_dir,
+				   cache_feats=False,
+				   batch_size=1,
+				   num_workers=0,
+				   input_frame_norm_type="egovlp_v2",
+				   args=None):
+	"""
+	Decodes the val datapoints once, in order, into a ValCache of their uint8 frames (or w/ cache_feats, the frozen video 
+	encoder's features) and relative camera pose labels, and points val_data to it. A complete cache for the same config 
+	is reused as is. When distributed (args is set), the main process builds the cache while the others wait.
+	"""
+	if isinstance(vid_encoder, (DDP, nn.DataParallel)):
+		vid_encoder = vid_encoder.module
+
+	val_cache = ValCache(valCache_dir, val_data.get_valCacheConfig(get_stateDict_key(vid_encoder) if cache_feats else None))
+	if (not val_cache.is_complete()) and ((args is None) or is_main_process(args)):
+		loader = DataLoader(val_data,
+							batch_size=batch_size,
+							shuffle=False,
+							num_workers=num_workers,
+							drop_last=False,)
+		if val_data.frames_ring is not None:
+			loader = SharedFramesLoader(loader)
+
+		strt_idx = 0
+		for loader_ele in tqdm(loader, desc="Val cache"):
+			frames = loader_ele[0]
+			if cache_feats:
+				with torch.no_grad():
+					frames = encode_views(vid_encoder,
+										  prepare_frames(frames.to(device), input_frame_norm_type=input_frame_norm_type),
+										  view_mask=get_viewMask(loader_ele[1], device)).detach().cpu()
+			val_cache.put(strt_idx, frames.numpy(), len(val_data))
+			if val_data.use_relativeCameraPoseLoss:
+				# gt_relCameraPose, has_relCameraPose, the last two inputs of a datapoint
+				val_cache.put(strt_idx, loader_ele[-2].numpy(), len(val_data), name="gt_relCameraPose")
+				val_cache.put(strt_idx, loader_ele[-1].numpy(), len(val_data), name="has_relCameraPose")
+			strt_idx += len(frames)
+		assert strt_idx == len(val_data), print(strt_idx, len(val_data))
+		val_cache.finish()
+		print(f"Val cache: {len(val_data)} datapoints in {val_cache.fp}")
+
+	if args is not None:
+		dist.barrier()
+	assert val_cache.is_complete(), print(val_cache.fp)
+
+	val_data.val_cache = val_cache
+
+
+def get_bestViewPicks(loader,
+					  vid_encoder,
+					  model,
+					  device,
+					  use_relativeCameraPoseLoss=False,
+					  num_batches=None,
+					  input_frame_norm_type="egovlp_v2"):
+	lst_picks = []
+	fwd_time = 0.
+	for ele_idx, loader_ele in enumerate(loader):
+		if (num_batches is not None) and (ele_idx >= num_batches):
+			break
+		frames = prepare_frames(loader_ele[0].to(device), input_frame_norm_type=input_frame_norm_type)
+		view_mask = get_viewMask(loader_ele[1], device)
+
+		strt_time = time.time()
+		with torch.no_grad():
+			if use_relativeCameraPoseLoss:
+				feats, _ = encode_views(vid_encoder, frames, view_mask=view_mask)
+			else:
+				feats = encode_views(vid_encoder, frames, view_mask=view_mask)
+			out = model(feats, view_mask=view_mask)
+		fwd_time += time.time() - strt_time
+
+		lst_picks.append(torch.argmax(out, dim=1).cpu())
+
+	return torch.cat(lst_picks), fwd_time
+
 
 def test(test_loader,
+		 calib_loader=None,
 		 **kwargs):
 	run_dir = kwargs["run_dir"]
 
@@ -990,10 +1266,28 @@ def test(test_loader,
 	assert os.path.isdir(ckpt_dir)
 
 	checkpoint_fileName = kwargs["checkpoint_fileName"] if ("checkpoint_fileName" in kwargs) else "valBestCkpt_maxCaptioningScore_captioner1"
-	assert os.path.isfile(os.path.join(run_dir, f"data/{checkpoint_fileName}.pth"))
-	loaded_ckpt = torch.load(os.path.join(run_dir,
-										  f"data/{checkpoint_fileName}.pth"),
-							 map_location="cpu")
+	use_inferenceCkpt = kwargs["use_inferenceCkpt"] if ("use_inferenceCkpt" in kwargs) else False
+	inferenceCkpt_fp16 = kwargs["inferenceCkpt_fp16"] if ("inferenceCkpt_fp16" in kwargs) else False
+	ckpt_fp = os.path.join(run_dir, f"data/{checkpoint_fileName}.pth")
+	loaded_ckpt = None
+	if use_inferenceCkpt:
+		inferenceCkpt_fp = get_inferenceCkpt_path(ckpt_fp)
+		loaded_ckpt = load_checkpoint_file(inferenceCkpt_fp) if os.path.isfile(inferenceCkpt_fp) else None
+		if os.path.isfile(ckpt_fp):
+			# re-exported when the full checkpoint has been rewritten since, e.g. by a later epoch or a resumed run
+			source_sha256 = get_checkpoint_sha256(ckpt_fp)
+			if (loaded_ckpt is None) or (loaded_ckpt.get("source_sha256", None) != source_sha256):
+				print(f"Exporting weights-only checkpoint to {inferenceCkpt_fp}")
+				save_checkpoint_contentAddressed(get_inferenceCkpt(load_checkpoint_file(ckpt_fp),
+																   fp16=inferenceCkpt_fp16,
+																   source_sha256=source_sha256),
+												 ckpt_dir,
+												 [inferenceCkpt_fp])
+				loaded_ckpt = None
+		ckpt_fp = inferenceCkpt_fp
+	assert os.path.isfile(ckpt_fp), print(ckpt_fp)
+	if loaded_ckpt is None:
+		loaded_ckpt = load_checkpoint_file(ckpt_fp)
 
 	isLemma_dataset = kwargs["isLemma_dataset"] if ("isLemma_dataset" in kwargs) else False
 
@@ -1012,6 +1306,8 @@ def test(test_loader,
 
 	task_type = kwargs['task_type']
 	unfreeze_videoEncoder = kwargs["unfreeze_videoEncoder"] if ("unfreeze_videoEncoder" in kwargs) else False
+	compile_models = kwargs["compile"] if ("compile" in kwargs) else False
+	compile_mode = kwargs["compile_mode"] if ("compile_mode" in kwargs) else None
 
 	assert task_type in ['classify_oneHot', 'match_dist', 'classify_oneHot_bestExoPred', 'classify_multiHot_bestExoPred']
 	task_isBestExoPred = task_type in ['classify_oneHot_bestExoPred', 'classify_multiHot_bestExoPred']
@@ -1032,6 +1328,12 @@ def test(test_loader,
 
 	use_relativeCameraPoseLoss = kwargs["use_relativeCameraPoseLoss"] if ("use_relativeCameraPoseLoss" in kwargs) else False	
 
+	quantize_int8 = kwargs["quantize_int8"] if ("quantize_int8" in kwargs) else False
+	quantize_numCalibBatches = kwargs["quantize_numCalibBatches"] if ("quantize_numCalibBatches" in kwargs) else 4
+	if quantize_int8:
+		# int8 kernels for dynamically quantized linears are CPU-only
+		device = torch.device("cpu")
+
 	assert recog_arc in ["egovlp_v2",]
 	if use_preExtractedFeats:
 		vid_encoder = nn.Identity()
@@ -1041,7 +1343,11 @@ def test(test_loader,
 
 	vid_encoder = vid_encoder.to(device)
 	model = model.to(device)
-	if kwargs["data_parallel"]:
+	if quantize_int8:
+		loaded_ckpt["model"] = state_dict_data_parallel_fix(loaded_ckpt["model"], model.state_dict())
+		if "video_encoder" in loaded_ckpt:
+			loaded_ckpt["video_encoder"] = state_dict_data_parallel_fix(loaded_ckpt["video_encoder"], vid_encoder.state_dict())
+	elif kwargs["data_parallel"]:
 		assert n_available_gpus > 0
 		print("Using", n_available_gpus, "GPUs!")
 		vid_encoder = nn.DataParallel(vid_encoder, device_ids=list(range(n_available_gpus)), output_device=0)
@@ -1056,6 +1362,38 @@ def test(test_loader,
 					  kwargs=kwargs,
 					  is_test=True)
 
+	if quantize_int8:
+		vid_encoder_fp32 = vid_encoder
+		model_fp32 = model
+		vid_encoder = quantize_linearLayers_int8(vid_encoder_fp32)
+		model = quantize_linearLayers_int8(model_fp32)
+
+		if (calib_loader is not None) and (quantize_numCalibBatches > 0):
+			picks_fp32, time_fp32 = get_bestViewPicks(calib_loader,
+													  vid_encoder_fp32,
+													  model_fp32,
+													  device,
+													  use_relativeCameraPoseLoss=use_relativeCameraPoseLoss,
+													  num_batches=quantize_numCalibBatches,
+													  input_frame_norm_type=recog_arc)
+			picks_int8, time_int8 = get_bestViewPicks(calib_loader,
+													  vid_encoder,
+													  model,
+													  device,
+													  use_relativeCameraPoseLoss=use_relativeCameraPoseLoss,
+													  num_batches=quantize_numCalibBatches,
+													  input_frame_norm_type=recog_arc)
+			agreement = float(torch.mean((picks_fp32 == picks_int8).float()))
+			print(f"INT8 calibration: {len(picks_fp32)} samples, best-view agreement w/ fp32 -- {agreement:.4f}, "+\
+				  f"fwd time fp32 -- {time_fp32:.2f}s, int8 -- {time_int8:.2f}s")
+		del vid_encoder_fp32, model_fp32
+
+	if compile_models:
+		# after quantization, which swaps the linear layers
+		warn_compileViewMasks(kwargs)
+		compile_module(vid_encoder, mode=compile_mode)
+		compile_module(model, mode=compile_mode)
+
 	test_loss = 0.
 	test_acc = 0.
 	test_numSamples = 0
@@ -1063,10 +1401,11 @@ def test(test_loader,
 	dumpVids_wAttentionMask_startSampleIdxThisBatch = 0
 	for ele_idx, loader_ele in enumerate(tqdm(test_loader)):
 		if task_type == "classify_oneHot_bestExoPred":
-			frames, label, indices, label_multiHot = loader_ele
+			frames, view_mask, label, indices, label_multiHot = loader_ele
 		else:
-			frames, label, indices = loader_ele
-		frames = frames.to(device)
+			frames, view_mask, label, indices = loader_ele
+		frames = prepare_frames(frames.to(device), input_frame_norm_type=recog_arc)
+		view_mask = get_viewMask(view_mask, device)
 		label = label.to(device)
 		indices = indices
 		if task_type == "classify_oneHot_bestExoPred":
@@ -1074,11 +1413,11 @@ def test(test_loader,
 
 		with torch.no_grad():
 			if use_relativeCameraPoseLoss:
-				feats, feats_pose = vid_encoder(frames)
+				feats, feats_pose = encode_views(vid_encoder, frames, view_mask=view_mask)
 			else:
-				feats = vid_encoder(frames)
+				feats = encode_views(vid_encoder, frames, view_mask=view_mask)
 			feats = feats.detach()
-			out = model(feats)
+			out = model(feats, view_mask=view_mask)
 
 		if task_type in ["classify_oneHot", "classify_oneHot_bestExoPred"]:
 			if len(label.shape) == 2: